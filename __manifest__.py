@@ -12,7 +12,7 @@ Features:
 - Result verification and report release
 - More portal functions and AI functions
 """,
-    "version": "19.0.2.0.24",
+    "version": "19.0.2.0.27",
     "category": "Healthcare",
     "author": "mamingxing",
     "website": "https://imytest.local",
@@ -25,6 +25,7 @@ Features:
         ],
         "web.assets_frontend": [
             "laboratory_management/static/src/scss/portal_cards.scss",
+            "laboratory_management/static/src/js/portal_ai_status.js",
         ],
     },
     "data": [
@@ -145,6 +146,7 @@ Features:
         "wizard/lab_custody_investigation_bulk_update_wizard_views.xml",
         "wizard/lab_result_import_wizard_views.xml",
         "wizard/lab_instrument_result_import_wizard_views.xml",
+        "wizard/lab_auto_verify_simulation_wizard_views.xml",
         "views/lab_interpretation_views.xml",
         "views/lab_optimization_suite_views.xml",
         "views/portal_templates.xml",
@@ -1,3 +1,4 @@
 from . import portal
 from . import interface_api
 from . import external_api
+from . import qc_chart
@@ -326,10 +326,13 @@ class LaboratoryExternalApi(http.Controller):
             ]
         return domain
 
-    def _sample_domain_for_endpoint(self, endpoint):
+    def _sample_domain_for_endpoint(self, endpoint, listing=False):
+        """Sample scope of an endpoint; ``listing`` adds the access table as a narrowing filter."""
         domain = [("company_id", "=", endpoint.external_company_id.id)]
         partner = endpoint.get_external_api_partner()
         if partner:
+            if listing:
+                domain.append(("portal_access_ids.partner_id", "=", partner.id))
             domain += [
                 "|",
                 ("request_id.requester_partner_id", "child_of", partner.id),
@@ -843,6 +846,52 @@ class LaboratoryExternalApi(http.Controller):
             return self._json_response({"ok": False, "error": "request_not_found"}, status=404)
         return self._json_response({"ok": True, "request": self._prepare_request_payload(rec)})
 
+    @http.route(
+        "/lab/api/v1/<string:endpoint_code>/samples",
+        type="http",
+        auth="public",
+        methods=["GET"],
+        csrf=False,
+    )
+    def external_sample_list(self, endpoint_code, after=None, limit=None, state=None, **kwargs):
+        endpoint, error = self._lookup_endpoint(endpoint_code)
+        if error:
+            return error
+        if not endpoint.external_allow_result_query:
+            return self._json_response({"ok": False, "error": "result_query_disabled"}, status=403)
+        try:
+            limit = min(max(int(limit or 50), 1), 200)
+        except ValueError:
+            return self._json_response({"ok": False, "error": "invalid_limit"}, status=400)
+        domain = self._sample_domain_for_endpoint(endpoint, listing=True)
+        if state:
+            domain.append(("state", "in", state.split(",")))
+        paging = request.env["lab.keyset.pagination"]
+        page_data = paging._keyset_search("lab.sample", domain, "id desc", limit, after=after)
+        if page_data is None:
+            return self._json_response({"ok": False, "error": "invalid_cursor"}, status=400)
+        samples, _previous_cursor, next_cursor = page_data
+        total, exact = paging._approximate_count("lab.sample", domain)
+        return self._json_response(
+            {
+                "ok": True,
+                "samples": [
+                    {
+                        "id": sample.id,
+                        "accession": sample.name,
+                        "barcode": sample.accession_barcode or "",
+                        "state": sample.state,
+                        "report_date": sample.report_date.isoformat() if sample.report_date else None,
+                        "request_no": sample.request_id.name if sample.request_id else "",
+                    }
+                    for sample in samples
+                ],
+                "next_cursor": next_cursor or None,
+                "total": total,
+                "total_is_estimate": not exact,
+            }
+        )
+
     @http.route(
         "/lab/api/v1/<string:endpoint_code>/samples/<string:accession>/results",
         type="http",
@@ -883,8 +932,8 @@ class LaboratoryExternalApi(http.Controller):
                         "binary_interpretation": line.binary_interpretation or "",
                         "state": line.state,
                         "unit": line.service_id.unit or "",
-                        "ref_min": line.service_id.ref_min,
-                        "ref_max": line.service_id.ref_max,
+                        "ref_min": line.ref_min,
+                        "ref_max": line.ref_max,
                     }
                     for line in sample.analysis_ids
                 ],
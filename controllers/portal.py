@@ -2,13 +2,16 @@ import csv
 import io
 import json
 import os
-import zipfile
+from urllib.parse import urlencode
 
 from odoo import _, fields, http
 from odoo.addons.portal.controllers.portal import CustomerPortal, pager as portal_pager
 from odoo.http import request
 from odoo.exceptions import ValidationError, UserError
 
+from ..models.lab_report_archive import iter_zip_stream
+from ..models.lab_sample_ai import AI_PORTAL_PRIORITY
+
 
 class LaboratoryPortal(CustomerPortal):
     PROFESSIONAL_PURCHASE_LINE_KEYS = ("1", "2", "3")
@@ -28,22 +31,64 @@ class LaboratoryPortal(CustomerPortal):
             lambda: request.env.user.partner_id.commercial_partner_id,
         )
 
-    def _sample_ids_for_current_user(self):
-        return self._cache_get_or_set(
-            "sample_ids",
-            lambda: request.env["lab.sample"].sudo().search(self._sample_domain_for_current_user()).ids,
-        )
-
-    def _portal_list_records(self, *, model_name, domain, sortings, sortby, url, page, step=20, url_args=None):
+    def _portal_list_records(
+        self, *, model_name, domain, sortings, sortby, url, page, step=20, url_args=None, after=None, before=None
+    ):
         sort_key = sortby if sortby in sortings else next(iter(sortings.keys()))
         sort_order = sortings[sort_key]["order"]
+        url_args = {"sortby": sort_key, **(url_args or {})}
         model = request.env[model_name].sudo()
-        total = model.search_count(domain)
-        pager = portal_pager(url=url, total=total, page=page, step=step, url_args={"sortby": sort_key, **(url_args or {})})
+        paging = request.env["lab.keyset.pagination"]
+        threshold = int(
+            request.env["ir.config_parameter"].sudo().get_param("laboratory_management.portal_keyset_threshold", "5000") or 0
+        )
+        if threshold:
+            total, exact = paging._approximate_count(model_name, domain, exact_below=threshold)
+        else:
+            total, exact = model.search_count(domain), True
+        # Large listings and cursor links are read by seeking from the page boundary instead of OFFSET.
+        if threshold and (after or before or not exact):
+            page_data = paging._keyset_search(model_name, domain, sort_order, step, after=after, before=before)
+            if page_data is not None:
+                records, previous_cursor, next_cursor = page_data
+                pager = self._keyset_pager(url, url_args, total, exact, previous_cursor, next_cursor)
+                return records, pager, sort_key
+        if not exact:
+            total = model.search_count(domain)
+        pager = portal_pager(url=url, total=total, page=page, step=step, url_args=url_args)
         records = model.search(domain, order=sort_order, limit=step, offset=pager["offset"])
         return records, pager, sort_key
 
+    def _keyset_pager(self, url, url_args, total, exact, previous_cursor, next_cursor):
+        """Pager values for ``portal.pager`` with previous/next cursor links only."""
+
+        def link(**cursor):
+            query = {key: value for key, value in dict(url_args, **cursor).items() if value not in (None, "")}
+            return "%s?%s" % (url, urlencode(query)) if query else url
+
+        num = 2 if previous_cursor else 1
+        current = {"url": link(), "num": num}
+        first = {"url": link(), "num": 1}
+        previous = {"url": link(before=previous_cursor), "num": 1} if previous_cursor else first
+        following = {"url": link(after=next_cursor), "num": num + 1} if next_cursor else current
+        return {
+            "page_count": num + (1 if next_cursor else 0),
+            "offset": 0,
+            "page": current,
+            "page_first": first,
+            "page_start": previous,
+            "page_previous": previous,
+            "page_next": following,
+            "page_end": following,
+            "page_last": following,
+            "pages": [],
+            "keyset": True,
+            "total": total,
+            "total_is_estimate": not exact,
+        }
+
     def _sample_domain_for_current_user(self):
+        """Authoritative sample scope, used for single records and downloads."""
         partner = self._current_commercial_partner()
         companies = request.env.companies.ids
         return [
@@ -53,17 +98,24 @@ class LaboratoryPortal(CustomerPortal):
             ("client_id", "child_of", partner.id),
         ]
 
-    def _batch_domain_for_current_user(self):
-        sample_ids = self._sample_ids_for_current_user()
-        if not sample_ids:
-            return [("id", "=", 0)]
-        return [("line_ids.sample_id", "in", sample_ids)]
+    def _sample_listing_domain_for_current_user(self):
+        """Sample scope for listings and counters.
+
+        The access table only narrows the candidate rows; the child_of scope
+        still decides, so a stale access row never exposes a sample.
+        """
+        partner = self._current_commercial_partner()
+        return [("portal_access_ids.partner_id", "=", partner.id)] + self._sample_domain_for_current_user()
 
-    def _investigation_domain_for_current_user(self):
-        sample_ids = self._sample_ids_for_current_user()
-        if not sample_ids:
-            return [("id", "=", 0)]
-        return ["|", ("sample_id", "in", sample_ids), ("batch_id.line_ids.sample_id", "in", sample_ids)]
+    def _batch_domain_for_current_user(self, sample_domain=None):
+        if sample_domain is None:
+            sample_domain = self._sample_domain_for_current_user()
+        return [("line_ids.sample_id", "any", sample_domain)]
+
+    def _investigation_domain_for_current_user(self, sample_domain=None):
+        if sample_domain is None:
+            sample_domain = self._sample_domain_for_current_user()
+        return ["|", ("sample_id", "any", sample_domain), ("batch_id.line_ids.sample_id", "any", sample_domain)]
 
     def _request_domain_for_current_user(self):
         partner = self._current_commercial_partner()
@@ -358,25 +410,68 @@ class LaboratoryPortal(CustomerPortal):
     def _prepare_home_portal_values(self, counters):
         values = super()._prepare_home_portal_values(counters)
         if "lab_sample_count" in counters:
-            values["lab_sample_count"] = request.env["lab.sample"].sudo().search_count(self._sample_domain_for_current_user())
+            values["lab_sample_count"] = self._portal_counts(
+                "lab.sample", self._sample_listing_domain_for_current_user(), self._sample_count_buckets()
+            )["all"]
         if "lab_custody_batch_count" in counters:
-            values["lab_custody_batch_count"] = request.env["lab.sample.custody.batch"].sudo().search_count(
-                self._batch_domain_for_current_user()
-            )
+            values["lab_custody_batch_count"] = self._portal_counts(
+                "lab.sample.custody.batch",
+                self._batch_domain_for_current_user(self._sample_listing_domain_for_current_user()),
+                {},
+            )["all"]
         if "lab_custody_investigation_count" in counters:
-            values["lab_custody_investigation_count"] = request.env["lab.custody.investigation"].sudo().search_count(
-                self._investigation_domain_for_current_user()
-            )
+            values["lab_custody_investigation_count"] = self._portal_counts(
+                "lab.custody.investigation",
+                self._investigation_domain_for_current_user(self._sample_listing_domain_for_current_user()),
+                {},
+            )["all"]
         if "lab_test_request_count" in counters:
-            values["lab_test_request_count"] = request.env["lab.test.request"].sudo().search_count(
-                self._request_domain_for_current_user()
-            )
+            values["lab_test_request_count"] = self._portal_counts(
+                "lab.test.request", self._request_domain_for_current_user(), self._request_count_buckets()
+            )["all"]
         if "lab_request_invoice_count" in counters:
-            values["lab_request_invoice_count"] = request.env["lab.request.invoice"].sudo().search_count(
-                self._request_invoice_domain_for_current_user()
-            )
+            values["lab_request_invoice_count"] = self._portal_counts(
+                "lab.request.invoice", self._request_invoice_domain_for_current_user(), self._invoice_count_buckets()
+            )["all"]
         return values
 
+    def _portal_counts(self, model_name, domain, buckets):
+        """Total and per-bucket counts of ``domain``, one query per model and short-lived cache."""
+        partner = self._current_commercial_partner()
+        cache_key = (tuple(request.env.companies.ids), tuple(buckets))
+        return self._cache_get_or_set(
+            ("counts", model_name),
+            lambda: request.env["lab.portal.counter"]._grouped_counts(
+                model_name, domain, buckets, partner_id=partner.id, cache_key=cache_key
+            ),
+        )
+
+    def _dashboard_counts(self, model_name, domain, buckets):
+        counts = self._portal_counts(model_name, domain, buckets)
+        return {key: counts[key] for key in buckets}
+
+    def _sample_count_buckets(self):
+        return {
+            "received": {"state": "received"},
+            "in_progress": {"state": "in_progress"},
+            "to_verify": {"state": "to_verify"},
+            "reported": {"state": "reported", "report_publication_state": "active"},
+        }
+
+    def _request_count_buckets(self):
+        return {
+            "draft": {"state": "draft"},
+            "pending": {"state": ("submitted", "triage", "quoted", "approved")},
+            "running": {"state": "in_progress"},
+            "completed": {"state": "completed"},
+        }
+
+    def _invoice_count_buckets(self):
+        return {
+            "open": {"state": ("issued", "partially_paid")},
+            "paid": {"state": "paid"},
+        }
+
     def _sample_filter_options(self):
         return {
             "all": {"label": _("All"), "domain": []},
@@ -430,33 +525,16 @@ class LaboratoryPortal(CustomerPortal):
         request_obj = request.env["lab.test.request"].sudo()
         invoice_obj = request.env["lab.request.invoice"].sudo()
 
-        sample_domain = self._sample_domain_for_current_user()
+        sample_domain = self._sample_listing_domain_for_current_user()
         request_domain = self._request_domain_for_current_user()
         invoice_domain = self._request_invoice_domain_for_current_user()
 
-        sample_state_domains = {
-            "received": sample_domain + [("state", "=", "received")],
-            "in_progress": sample_domain + [("state", "=", "in_progress")],
-            "to_verify": sample_domain + [("state", "=", "to_verify")],
-            "reported": sample_domain + [("state", "=", "reported"), ("report_publication_state", "=", "active")],
-        }
-        request_state_domains = {
-            "draft": request_domain + [("state", "=", "draft")],
-            "pending": request_domain + [("state", "in", ("submitted", "triage", "quoted", "approved"))],
-            "running": request_domain + [("state", "=", "in_progress")],
-            "completed": request_domain + [("state", "=", "completed")],
-        }
-        invoice_state_domains = {
-            "open": invoice_domain + [("state", "in", ("issued", "partially_paid"))],
-            "paid": invoice_domain + [("state", "=", "paid")],
-        }
-
         values = {
             "lab_portal_partner": partner,
             "lab_portal_is_professional": self._is_professional_partner(partner),
-            "lab_dashboard_samples": {key: sample_obj.search_count(domain) for key, domain in sample_state_domains.items()},
-            "lab_dashboard_requests": {key: request_obj.search_count(domain) for key, domain in request_state_domains.items()},
-            "lab_dashboard_invoices": {key: invoice_obj.search_count(domain) for key, domain in invoice_state_domains.items()},
+            "lab_dashboard_samples": self._dashboard_counts("lab.sample", sample_domain, self._sample_count_buckets()),
+            "lab_dashboard_requests": self._dashboard_counts("lab.test.request", request_domain, self._request_count_buckets()),
+            "lab_dashboard_invoices": self._dashboard_counts("lab.request.invoice", invoice_domain, self._invoice_count_buckets()),
             "lab_dashboard_recent_reports": sample_obj.search(
                 sample_domain + [("state", "=", "reported"), ("report_publication_state", "=", "active")],
                 order="report_date desc, id desc",
@@ -501,7 +579,7 @@ class LaboratoryPortal(CustomerPortal):
 
     @http.route(["/my/lab/samples", "/my/lab/samples/page/<int:page>"], type="http", auth="user", website=True)
     def portal_my_samples(self, page=1, sortby="date", filterby="all", q=None, date_from=None, date_to=None, **kwargs):
-        domain, filterby = self._apply_filter_domain(self._sample_domain_for_current_user(), self._sample_filter_options(), filterby)
+        domain, filterby = self._apply_filter_domain(self._sample_listing_domain_for_current_user(), self._sample_filter_options(), filterby)
         domain = self._apply_sample_search_domain(domain, q=q, date_from=date_from, date_to=date_to)
         sortings = {
             "date": {"label": _("Newest"), "order": "id desc"},
@@ -516,6 +594,8 @@ class LaboratoryPortal(CustomerPortal):
             sortby=sortby,
             url="/my/lab/samples",
             page=page,
+            after=kwargs.get("after"),
+            before=kwargs.get("before"),
             url_args={"filterby": filterby, "q": q or "", "date_from": date_from or "", "date_to": date_to or ""},
         )
 
@@ -605,21 +685,33 @@ class LaboratoryPortal(CustomerPortal):
         if not samples:
             return request.redirect("/my/lab/samples?zip_error=selection")
 
-        payload = io.BytesIO()
-        with zipfile.ZipFile(payload, "w", zipfile.ZIP_DEFLATED) as archive:
-            for sample in samples:
-                archive.writestr(f"{sample.name}.pdf", self._get_sample_pdf_content(sample))
+        if samples.filtered(lambda s: not s.report_pdf_attachment_id):
+            request.env["lab.report.archive"]._queue_for_user(samples)
+            return request.redirect("/my/lab/samples?zip_status=preparing")
+        return self._stream_report_zip(samples, "Lab-Reports-%s.zip" % fields.Date.today())
 
-        filename = "Lab-Reports-%s.zip" % fields.Date.today()
+    def _stream_report_zip(self, samples, filename):
+        entries = request.env["lab.report.archive"]._zip_entries(samples)
         return request.make_response(
-            payload.getvalue(),
+            iter_zip_stream(entries),
             headers=[
                 ("Content-Type", "application/zip"),
-                ("Content-Length", str(payload.tell())),
                 ("Content-Disposition", f'attachment; filename="{filename}"'),
             ],
         )
 
+    @http.route("/my/lab/samples/reports/zip/<int:archive_id>", type="http", auth="user", website=True)
+    def portal_sample_report_archive_download(self, archive_id, **kwargs):
+        archive = request.env["lab.report.archive"].sudo().browse(archive_id).exists()
+        if not archive or archive.user_id != request.env.user or archive.state != "ready":
+            return request.redirect("/my/lab/samples?zip_error=archive")
+        samples = request.env["lab.sample"].sudo().search(
+            self._sample_domain_for_current_user()
+            + [("id", "in", archive.sample_ids.ids), ("report_publication_state", "=", "active")],
+            order="id desc",
+        )
+        return self._stream_report_zip(samples, "Lab-Reports-%s.zip" % fields.Date.to_date(archive.ready_at))
+
     @http.route(
         "/my/lab/samples/<int:sample_id>/report/ai",
         type="http",
@@ -631,15 +723,25 @@ class LaboratoryPortal(CustomerPortal):
         sample = self._get_authorized_sample(sample_id)
         if not sample:
             return request.redirect("/my/lab/samples")
-        try:
-            sample.with_context(
-                ai_trigger_source="portal",
-                force_ai_regenerate=True,
-            ).action_generate_ai_interpretation()
-        except Exception:
-            pass
+        if sample.ai_review_state == "approved":
+            return request.redirect("/my/lab/samples/%s/report/h5?ai_status=locked" % sample_id)
+        # Generation runs in the queue worker; repeated clicks join the pending job.
+        sample.action_queue_ai_interpretation(force=True, trigger_source="portal", priority=AI_PORTAL_PRIORITY)
         return request.redirect("/my/lab/samples/%s/report/h5" % sample_id)
 
+    @http.route("/my/lab/samples/<int:sample_id>/report/ai/status", type="http", auth="user", methods=["GET"])
+    def portal_sample_report_ai_status(self, sample_id, **kwargs):
+        sample = self._get_authorized_sample(sample_id)
+        if not sample:
+            return request.make_json_response({"error": "not_found"}, status=404)
+        return request.make_json_response(
+            {
+                "state": sample.ai_interpretation_state,
+                "pending": sample.ai_interpretation_state in ("queued", "running"),
+                "visible": sample.ai_portal_visible,
+            }
+        )
+
     @http.route(
         "/my/lab/samples/<int:sample_id>/report/ack",
         type="http",
@@ -683,6 +785,8 @@ class LaboratoryPortal(CustomerPortal):
             sortby=sortby,
             url="/my/lab/requests",
             page=page,
+            after=kwargs.get("after"),
+            before=kwargs.get("before"),
             url_args={"filterby": filterby},
         )
 
@@ -1129,6 +1233,8 @@ class LaboratoryPortal(CustomerPortal):
             sortby=sortby,
             url="/my/lab/invoices",
             page=page,
+            after=kwargs.get("after"),
+            before=kwargs.get("before"),
             url_args={"filterby": filterby},
         )
 
@@ -1264,7 +1370,7 @@ class LaboratoryPortal(CustomerPortal):
 
     @http.route(["/my/lab/custody/batches", "/my/lab/custody/batches/page/<int:page>"], type="http", auth="user", website=True)
     def portal_my_custody_batches(self, page=1, sortby="date", **kwargs):
-        domain = self._batch_domain_for_current_user()
+        domain = self._batch_domain_for_current_user(self._sample_listing_domain_for_current_user())
         sortings = {
             "date": {"label": _("Newest"), "order": "id desc"},
             "name": {"label": _("Batch"), "order": "name asc"},
@@ -1278,6 +1384,8 @@ class LaboratoryPortal(CustomerPortal):
             sortby=sortby,
             url="/my/lab/custody/batches",
             page=page,
+            after=kwargs.get("after"),
+            before=kwargs.get("before"),
         )
 
         values = self._prepare_portal_layout_values()
@@ -1326,7 +1434,7 @@ class LaboratoryPortal(CustomerPortal):
         website=True,
     )
     def portal_my_custody_investigations(self, page=1, sortby="date", **kwargs):
-        domain = self._investigation_domain_for_current_user()
+        domain = self._investigation_domain_for_current_user(self._sample_listing_domain_for_current_user())
         sortings = {
             "date": {"label": _("Newest"), "order": "id desc"},
             "name": {"label": _("Investigation"), "order": "name asc"},
@@ -1341,6 +1449,8 @@ class LaboratoryPortal(CustomerPortal):
             sortby=sortby,
             url="/my/lab/custody/investigations",
             page=page,
+            after=kwargs.get("after"),
+            before=kwargs.get("before"),
         )
 
         values = self._prepare_portal_layout_values()
@@ -0,0 +1,26 @@
+from odoo import fields, http
+from odoo.http import request
+
+
+class LaboratoryQcChart(http.Controller):
+    @http.route("/lab/qc/levey_jennings", type="jsonrpc", auth="user", methods=["POST"])
+    def qc_levey_jennings(self, material_ids=None, service_id=None, date_from=None, date_to=None, max_points=500):
+        try:
+            material_ids = [int(x) for x in material_ids or []]
+            service_id = int(service_id) if service_id else False
+            max_points = int(max_points or 500)
+            date_from = fields.Datetime.to_datetime(date_from) if date_from else False
+            date_to = fields.Datetime.to_datetime(date_to) if date_to else False
+        except (TypeError, ValueError):
+            return {"ok": False, "error": "invalid_parameters"}
+        material_obj = request.env["lab.qc.material"]
+        if material_ids:
+            materials = material_obj.browse(material_ids).exists()
+        elif service_id:
+            materials = material_obj.search([("service_id", "=", service_id)])
+        else:
+            return {"ok": False, "error": "material_or_service_required"}
+        return {
+            "ok": True,
+            "series": materials.get_levey_jennings_data(date_from=date_from, date_to=date_to, max_points=max_points),
+        }
@@ -0,0 +1,20 @@
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    """Move inline AI prompt/response texts into the shared content store."""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    blobs = env["lab.ai.content.blob"]
+    blobs._move_column("lab_sample_ai_interpretation", "system_prompt", "system_prompt_blob_id")
+    blobs._move_column("lab_sample_ai_interpretation", "user_prompt", "user_prompt_blob_id")
+    blobs._move_column("lab_sample_ai_interpretation", "response_text", "response_blob_id")
+    blobs._move_column("lab_sample", "ai_interpretation_prompt", "ai_interpretation_prompt_blob_id")
+    for table, column in (
+        ("lab_sample_ai_interpretation", "system_prompt"),
+        ("lab_sample_ai_interpretation", "user_prompt"),
+        ("lab_sample_ai_interpretation", "response_text"),
+        ("lab_sample", "ai_interpretation_prompt"),
+    ):
+        cr.execute('ALTER TABLE "%s" DROP COLUMN IF EXISTS "%s"' % (table, column))
@@ -0,0 +1,11 @@
+def migrate(cr, version):
+    """Date existing results so auto-verification simulations can replay them."""
+    if not version:
+        return
+    cr.execute(
+        """
+        UPDATE lab_sample_analysis
+           SET result_date = write_date
+         WHERE result_date IS NULL AND state IN ('done', 'verified')
+        """
+    )
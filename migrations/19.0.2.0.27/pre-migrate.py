@@ -0,0 +1,17 @@
+from odoo.tools.sql import table_exists
+
+
+def migrate(cr, version):
+    """Drop duplicate service-wide QC status rows before their unique index is created."""
+    if not version or not table_exists(cr, "lab_qc_status"):
+        return
+    cr.execute(
+        """
+        DELETE FROM lab_qc_status stale
+         USING lab_qc_status kept
+         WHERE stale.instrument_id IS NULL
+           AND kept.instrument_id IS NULL
+           AND stale.service_id = kept.service_id
+           AND stale.id < kept.id
+        """
+    )
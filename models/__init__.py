@@ -1,7 +1,9 @@
 from . import lab_master_data
 from . import lab_result_unit
 from . import lab_service
+from . import lab_reference_interval
 from . import lab_activity_utils
+from . import lab_keyset_pagination
 from . import lab_review
 from . import lab_notification
 from . import lab_profile
@@ -14,12 +16,15 @@ from . import lab_dynamic_form
 from . import lab_request_billing
 from . import lab_ecommerce
 from . import lab_qc
+from . import lab_qc_status
 from . import lab_reagent
 from . import lab_instrument
 from . import lab_import_job
 from . import lab_governance_evidence
 from . import lab_capa
 from . import lab_sample
+from . import lab_portal_counter
+from . import lab_sample_portal_access
 from . import lab_plate
 from . import lab_pathology
 from . import lab_sop
@@ -39,6 +44,7 @@ from . import lab_workstation_governance
 from . import lab_sample_ai
 from . import lab_sample_review
 from . import lab_report_dispatch
+from . import lab_report_archive
 from . import lab_storage
 from . import lab_custody_batch
 from . import lab_custody_closure
@@ -59,3 +65,4 @@ from . import lab_company_scope
 from . import lab_control_center
 from . import lab_optimization_suite
 from . import lab_instrument_calibration
+from . import lab_auto_verify
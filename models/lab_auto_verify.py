@@ -0,0 +1,250 @@
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+
+MANUAL_REVIEW_REASON_SELECTION = [
+    ("auto_disabled", "Auto-Verification Disabled"),
+    ("critical", "Critical Result"),
+    ("out_of_range", "Out of Reference Range"),
+    ("qc_not_passed", "QC Not Passed"),
+    ("delta_fail", "Delta Check Failed"),
+    ("rule_hold", "Auto-Verification Rule Hold"),
+]
+
+QC_STATUS_ALLOWED = {
+    "pass": ("pass",),
+    "pass_warning": ("pass", "warning"),
+}
+
+
+def critical_bounds(critical_min, critical_max):
+    """Return the configured ``(low, high)`` critical limits, None for an unset side.
+
+    Float columns store an unset limit as 0.0, so a zero only counts as a
+    limit when the other side is above it (e.g. ``0 .. 6.5`` or ``-10 .. 0``).
+    """
+    if critical_min < critical_max:
+        return critical_min, critical_max
+    return critical_min or None, critical_max or None
+
+
+class AutoVerifyProgram:
+    """Auto-verification decision tree compiled once per service.
+
+    Results are evaluated as plain ``facts`` dictionaries (see
+    ``lab.sample.analysis._auto_verify_facts``) so the same program can be
+    applied to live results and to historical replays.
+    """
+
+    __slots__ = ("service_id", "enabled", "allow_out_of_range", "require_qc_pass", "rules")
+
+    def __init__(self, service_id, enabled, allow_out_of_range, require_qc_pass, rules):
+        self.service_id = service_id
+        self.enabled = enabled
+        self.allow_out_of_range = allow_out_of_range
+        self.require_qc_pass = require_qc_pass
+        self.rules = tuple(rules)
+
+    def _base_reason(self, facts):
+        if facts["is_critical"]:
+            return "critical"
+        if facts["delta_status"] == "fail":
+            return "delta_fail"
+        if facts["is_out_of_range"] and not self.allow_out_of_range:
+            return "out_of_range"
+        if self.require_qc_pass and facts["qc_status"] != "pass":
+            return "qc_not_passed"
+        return False
+
+    @staticmethod
+    def _rule_holds(rule, facts):
+        rule_type = rule[0]
+        value = facts["value"]
+        if rule_type == "range":
+            return value is not None and not (rule[1] <= value <= rule[2])
+        if rule_type == "delta":
+            return facts["delta_status"] in ("pass", "fail") and facts["delta_value"] > rule[1]
+        if rule_type == "critical":
+            if value is None:
+                return False
+            margin = rule[1]
+            low, high = facts["critical_min"], facts["critical_max"]
+            return (low is not None and value <= low + margin) or (high is not None and value >= high - margin)
+        if rule_type == "qc_status":
+            return facts["qc_status"] not in rule[1]
+        if rule_type == "flag_combination":
+            flags, binary, out_of_range = rule[1], rule[2], rule[3]
+            if flags and facts["result_flag"] not in flags:
+                return False
+            if binary and facts["binary_interpretation"] != binary:
+                return False
+            if out_of_range is not None and bool(facts["is_out_of_range"]) != out_of_range:
+                return False
+            return bool(flags or binary or out_of_range is not None)
+        return False
+
+    def evaluate(self, facts):
+        """Return ``(reason_code, manual)``; ``reason_code`` is False when auto-verifiable."""
+        return self.evaluate_batch([facts])[0]
+
+    def evaluate_batch(self, facts_list):
+        """Evaluate a batch column-wise: each stage only scans still-undecided rows."""
+        if not self.enabled:
+            return [("auto_disabled", False)] * len(facts_list)
+        decisions = [None] * len(facts_list)
+        pending = []
+        for idx, facts in enumerate(facts_list):
+            reason = self._base_reason(facts)
+            if reason:
+                decisions[idx] = (reason, True)
+            else:
+                pending.append(idx)
+        for rule in self.rules:
+            if not pending:
+                break
+            still_pending = []
+            for idx in pending:
+                if self._rule_holds(rule, facts_list[idx]):
+                    decisions[idx] = (rule[-1], True)
+                else:
+                    still_pending.append(idx)
+            pending = still_pending
+        for idx in pending:
+            decisions[idx] = (False, False)
+        return decisions
+
+
+class LabAutoVerifyRule(models.Model):
+    _name = "lab.auto.verify.rule"
+    _description = "Auto-Verification Rule"
+    _order = "service_id, sequence, id"
+
+    sequence = fields.Integer(default=10)
+    name = fields.Char(required=True)
+    service_id = fields.Many2one("lab.service", required=True, ondelete="cascade", index=True)
+    active = fields.Boolean(default=True)
+    stage = fields.Selection(
+        [("draft", "Draft (Simulation Only)"), ("active", "Active")],
+        default="draft",
+        required=True,
+        help="Draft rules are only used by the auto-verification simulation until activated.",
+    )
+    rule_type = fields.Selection(
+        [
+            ("range", "Auto-Verification Range"),
+            ("delta", "Delta Limit"),
+            ("critical", "Near-Critical Margin"),
+            ("qc_status", "QC Status"),
+            ("flag_combination", "Flag Combination"),
+        ],
+        required=True,
+        default="range",
+    )
+    range_min = fields.Float(help="Numeric results below this value are held for manual review.")
+    range_max = fields.Float(help="Numeric results above this value are held for manual review.")
+    delta_limit = fields.Float(
+        help="Hold when the evaluated delta value exceeds this limit (same unit as the service delta method)."
+    )
+    critical_margin = fields.Float(
+        help="Hold results within this distance of the service critical limits."
+    )
+    qc_allowed_status = fields.Selection(
+        [("pass", "Pass Only"), ("pass_warning", "Pass or Warning")],
+        default="pass",
+        string="Allowed QC Status",
+    )
+    match_result_flags = fields.Char(
+        string="Result Flags",
+        help="Comma separated result flags (normal, high, low) that must match.",
+    )
+    match_binary = fields.Selection(
+        [("positive", "Positive"), ("negative", "Negative")],
+        string="Binary Interpretation",
+    )
+    match_out_of_range = fields.Selection(
+        [("any", "Any"), ("yes", "Out of Range"), ("no", "Within Range")],
+        default="any",
+        string="Out-of-Range State",
+    )
+    reason_code = fields.Selection(
+        MANUAL_REVIEW_REASON_SELECTION,
+        default="rule_hold",
+        required=True,
+        string="Manual Review Reason",
+    )
+    note = fields.Text()
+
+    @api.constrains("rule_type", "range_min", "range_max", "delta_limit", "critical_margin", "match_result_flags")
+    def _check_rule_parameters(self):
+        valid_flags = {"normal", "high", "low"}
+        for rec in self:
+            if rec.rule_type == "range" and rec.range_max <= rec.range_min:
+                raise ValidationError(
+                    _("Auto-verification range rule %s needs both a min and a greater max.") % rec.name
+                )
+            if rec.rule_type == "delta" and rec.delta_limit <= 0:
+                raise ValidationError(_("Delta limit must be greater than zero."))
+            if rec.rule_type == "critical" and rec.critical_margin < 0:
+                raise ValidationError(_("Near-critical margin must be non-negative."))
+            if rec.rule_type == "flag_combination":
+                flags = rec._parse_result_flags()
+                if not flags.issubset(valid_flags):
+                    raise ValidationError(_("Unknown result flag(s): %s") % ", ".join(sorted(flags - valid_flags)))
+                if not flags and not rec.match_binary and rec.match_out_of_range == "any":
+                    raise ValidationError(_("Flag combination rule %s has no condition.") % rec.name)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.mapped("service_id")._bump_rule_revision()
+        return records
+
+    def write(self, vals):
+        services = self.mapped("service_id")
+        res = super().write(vals)
+        (services | self.mapped("service_id"))._bump_rule_revision()
+        return res
+
+    def unlink(self):
+        services = self.mapped("service_id")
+        res = super().unlink()
+        services.exists()._bump_rule_revision()
+        return res
+
+    def _parse_result_flags(self):
+        self.ensure_one()
+        return {x.strip().lower() for x in (self.match_result_flags or "").split(",") if x.strip()}
+
+    def _compile(self):
+        self.ensure_one()
+        if self.rule_type == "range":
+            return ("range", self.range_min, self.range_max, self.reason_code)
+        if self.rule_type == "delta":
+            return ("delta", self.delta_limit, self.reason_code)
+        if self.rule_type == "critical":
+            return ("critical", self.critical_margin, self.reason_code)
+        if self.rule_type == "qc_status":
+            return ("qc_status", QC_STATUS_ALLOWED[self.qc_allowed_status or "pass"], self.reason_code)
+        out_of_range = {"yes": True, "no": False}.get(self.match_out_of_range)
+        return (
+            "flag_combination",
+            frozenset(self._parse_result_flags()),
+            self.match_binary or False,
+            out_of_range,
+            self.reason_code,
+        )
+
+    @api.model
+    def _build_program(self, service, rules):
+        return AutoVerifyProgram(
+            service.id,
+            enabled=bool(service.auto_verify_enabled),
+            allow_out_of_range=bool(service.auto_verify_allow_out_of_range),
+            require_qc_pass=bool(service.require_qc and service.auto_verify_require_qc_pass),
+            rules=[rule._compile() for rule in rules],
+        )
+
+    def action_activate(self):
+        self.write({"stage": "active"})
+
+    def action_set_draft(self):
+        self.write({"stage": "draft"})
@@ -555,12 +555,30 @@ class LabChangeControl(models.Model):
         return True
 
     @api.model
-    def _find_active_release_blocking_changes(self, *, company, services=None, report_template=None):
-        domain = [
-            ("company_id", "=", company.id),
+    def _release_blocking_domain(self, companies):
+        return [
+            ("company_id", "in", companies.ids),
             ("block_release", "=", True),
             ("state", "in", ("approval", "approved", "implementation", "validation")),
         ]
+
+    def _filter_release_blocking(self, *, company, services=None, report_template=None):
+        """Narrow prefetched blocking changes to one release, like ``_find_active_release_blocking_changes``."""
+        service_ids = set(services.ids) if services else set()
+        template_id = report_template.id if report_template else False
+        if not service_ids and not template_id:
+            return self.browse()
+        return self.filtered(
+            lambda c: c.company_id == company
+            and (
+                service_ids.intersection(c.service_ids.ids)
+                or (template_id and template_id in c.report_template_ids.ids)
+            )
+        )
+
+    @api.model
+    def _find_active_release_blocking_changes(self, *, company, services=None, report_template=None):
+        domain = self._release_blocking_domain(company)
         branches = []
         if services:
             branches.append([("service_ids", "in", services.ids)])
@@ -1,4 +1,24 @@
-from odoo import api, fields, models
+import base64
+import csv
+import io
+import logging
+import threading
+from itertools import islice
+
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError
+
+from .lab_instrument_parser import IMPORT_ENCODING_SELECTION, iter_import_rows
+
+_logger = logging.getLogger(__name__)
+
+IMPORT_ANALYSIS_STATES = ("pending", "assigned", "done", "rejected")
+IMPORT_REQUIRED_COLUMNS = {
+    "manual_csv": {"accession", "service_code", "result"},
+    "instrument_csv": {"accession", "instrument_code", "test_code", "result"},
+}
+# Runs after which a job that keeps crashing the worker is given up.
+IMPORT_MAX_ATTEMPTS = 3
 
 
 class LabImportJob(models.Model):
@@ -11,22 +31,51 @@ class LabImportJob(models.Model):
     import_type = fields.Selection(
         [
             ("manual_csv", "Manual CSV Result Import"),
-            ("instrument_csv", "Instrument CSV Result Import"),
+            ("instrument_csv", "Instrument Result Import"),
         ],
         required=True,
         tracking=True,
     )
     file_name = fields.Char()
+    file_data = fields.Binary(attachment=True, copy=False)
+    delimiter = fields.Char(default=",")
+    validate_only = fields.Boolean(
+        readonly=True,
+        help="Resolve and check every row without writing results. Apply the validated rows afterwards.",
+    )
+    validated_at = fields.Datetime(readonly=True)
+    applied_by_id = fields.Many2one(
+        "res.users", readonly=True, copy=False, help="User who confirmed applying the validated rows."
+    )
+    file_encoding = fields.Selection(IMPORT_ENCODING_SELECTION, default="utf-8-sig")
+    instrument_id = fields.Many2one(
+        "lab.instrument",
+        readonly=True,
+        help="When set, the file is read with this instrument's native file format.",
+    )
+    auto_mark_done = fields.Boolean(default=True)
     started_at = fields.Datetime(default=fields.Datetime.now, readonly=True)
     finished_at = fields.Datetime(readonly=True)
     status = fields.Selection(
-        [("running", "Running"), ("done", "Done"), ("failed", "Failed")],
+        [
+            ("queued", "Queued"),
+            ("running", "Running"),
+            ("validated", "Validated"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ],
         default="running",
         tracking=True,
     )
     total_rows = fields.Integer(default=0)
+    processed_rows = fields.Integer(default=0, readonly=True)
     success_rows = fields.Integer(default=0)
     failed_rows = fields.Integer(default=0)
+    attempt_count = fields.Integer(readonly=True, copy=False, help="Processing runs started for this job.")
+    company_id = fields.Many2one(
+        "res.company", required=True, readonly=True, index=True, default=lambda self: self.env.company
+    )
+    progress = fields.Float(compute="_compute_progress")
     note = fields.Text()
     line_ids = fields.One2many("lab.import.job.line", "job_id", string="Import Lines", readonly=True)
 
@@ -38,6 +87,495 @@ class LabImportJob(models.Model):
                 vals["name"] = seq_model.next_by_code("lab.import.job") or "New"
         return super().create(vals_list)
 
+    @api.depends("processed_rows", "total_rows", "status")
+    def _compute_progress(self):
+        for rec in self:
+            if rec.status == "done":
+                rec.progress = 100.0
+            elif rec.total_rows:
+                rec.progress = min(100.0, 100.0 * rec.processed_rows / rec.total_rows)
+            else:
+                rec.progress = 0.0
+
+    # ------------------------------------------------------------------
+    # Queueing
+    # ------------------------------------------------------------------
+    @api.model
+    def _enqueue_file_import(
+        self,
+        import_type,
+        file_data,
+        file_name,
+        delimiter,
+        auto_mark_done,
+        file_encoding="utf-8-sig",
+        instrument=False,
+        validate_only=False,
+    ):
+        job = self.create(
+            {
+                "import_type": import_type,
+                "file_name": file_name,
+                "file_data": file_data,
+                "delimiter": delimiter,
+                "file_encoding": file_encoding,
+                "instrument_id": instrument.id if instrument else False,
+                "auto_mark_done": auto_mark_done,
+                "validate_only": validate_only,
+                "status": "queued",
+                "note": _("Import queued."),
+            }
+        )
+        job._check_header()
+        job.total_rows = job._estimate_row_count()
+        job._trigger_processing()
+        return job
+
+    def _trigger_processing(self):
+        cron = self.env.ref("laboratory_management.ir_cron_lab_import_job_process", raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    def action_apply_validated(self):
+        """Queue the rows resolved by a validate-only run for applying."""
+        for rec in self:
+            if rec.status != "validated":
+                raise UserError(_("Only validated import jobs can be applied."))
+            if not rec.success_rows:
+                raise UserError(_("Import job %s has no valid rows to apply.") % rec.name)
+        self.write(
+            {
+                "validate_only": False,
+                "status": "queued",
+                "attempt_count": 0,
+                "applied_by_id": self.env.user.id,
+                "note": _("Applying validated rows."),
+            }
+        )
+        self._trigger_processing()
+        return True
+
+    @api.model
+    def _import_chunk_size(self):
+        value = self.env["ir.config_parameter"].sudo().get_param("laboratory_management.import_chunk_size", "1000")
+        try:
+            return max(int(value), 1)
+        except (TypeError, ValueError):
+            return 1000
+
+    @api.model
+    def _cron_process_import_jobs(self):
+        jobs = self.search([("status", "in", ("queued", "running")), ("file_data", "!=", False)], order="id asc", limit=5)
+        jobs._process_import()
+        return True
+
+    # ------------------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------------------
+    def _open_file_stream(self):
+        """Return a binary stream over the uploaded file without loading it into a string."""
+        self.ensure_one()
+        attachment = (
+            self.env["ir.attachment"]
+            .sudo()
+            .search(
+                [("res_model", "=", self._name), ("res_field", "=", "file_data"), ("res_id", "=", self.id)],
+                limit=1,
+            )
+        )
+        if attachment:
+            # Let the storage layer say where the bytes are; stream from disk when it can.
+            http_stream = attachment._to_http_stream()
+            if http_stream.type == "path":
+                return open(http_stream.path, "rb")  # noqa: SIM115
+            return io.BytesIO(http_stream.data if http_stream.type == "data" else attachment.raw or b"")
+        return io.BytesIO(base64.b64decode(self.file_data or b""))
+
+    def _estimate_row_count(self):
+        """Cheap byte-level row estimate used for progress only."""
+        self.ensure_one()
+        profile = self._import_profile()
+        if profile["parser"] == "xml":
+            marker = ("</%s>" % profile["record_tag"]).encode()
+            header_lines = 0
+        else:
+            marker = b"\n\x00" if profile["encoding"] == "utf-16" else b"\n"
+            header_lines = profile["header_lines_skip"] + (1 if profile["parser"] == "csv" else 0)
+        count = 0
+        last = b""
+        with self._open_file_stream() as stream:
+            for block in iter(lambda: stream.read(1 << 20), b""):
+                count += block.count(marker)
+                last = block
+        if profile["parser"] != "xml" and last.strip() and not last.rstrip(b"\x00").endswith(b"\n"):
+            count += 1
+        return max(count - header_lines, 0)
+
+    def _check_header(self):
+        """Fail fast on an unreadable file or missing columns before queueing."""
+        self.ensure_one()
+        try:
+            with self._open_file_stream() as stream:
+                next(self._iter_rows(stream), None)
+        except UnicodeDecodeError as exc:
+            raise UserError(self._decode_error_message()) from exc
+
+    def _decode_error_message(self):
+        encoding = self._import_profile()["encoding"]
+        labels = dict(IMPORT_ENCODING_SELECTION)
+        return _("File could not be decoded as %s.") % labels.get(encoding, encoding)
+
+    def _import_profile(self):
+        self.ensure_one()
+        if self.instrument_id:
+            profile = self.instrument_id._get_import_profile()
+        else:
+            profile = {
+                "parser": "csv",
+                "encoding": self.file_encoding or "utf-8-sig",
+                "delimiter": self.delimiter or ",",
+                "header_lines_skip": 0,
+                "column_map": {},
+            }
+        profile["required"] = IMPORT_REQUIRED_COLUMNS[self.import_type]
+        return profile
+
+    def _iter_rows(self, stream):
+        """Lazily yield ``(row_no, row)`` with normalized keys from a binary stream."""
+        self.ensure_one()
+        return iter_import_rows(stream, self._import_profile())
+
+    # ------------------------------------------------------------------
+    # Set-based resolution
+    # ------------------------------------------------------------------
+    def _service_lookup(self):
+        """Map the row code(s) to ``(service_id, service_code)`` once per job."""
+        self.ensure_one()
+        if self.import_type == "instrument_csv":
+            maps = self.env["lab.instrument.test.map"].search_read(
+                [("instrument_id.active", "=", True)],
+                ["instrument_id", "instrument_test_code", "service_id"],
+                order="id asc",
+            )
+            instruments = self.env["lab.instrument"].search_read([], ["code"], order="id asc")
+            codes = {inst["id"]: inst["code"] for inst in instruments}
+            services = (
+                self.env["lab.service"]
+                .with_context(active_test=False)
+                .search_read([("id", "in", [m["service_id"][0] for m in maps])], ["code", "name", "result_type"])
+            )
+            codes_by_service = {rec["id"]: rec["code"] for rec in services}
+            lookup = {}
+            for item in maps:
+                key = (codes.get(item["instrument_id"][0]), item["instrument_test_code"])
+                lookup.setdefault(key, (item["service_id"][0], codes_by_service.get(item["service_id"][0], "")))
+            return {
+                "instrument_codes": set(codes.values()),
+                "services": lookup,
+                "info": {rec["id"]: (rec["name"], rec["result_type"]) for rec in services},
+            }
+        services = (
+            self.env["lab.service"]
+            .with_context(active_test=False)
+            .search_read([("code", "!=", False)], ["code", "name", "result_type"], order="id asc")
+        )
+        lookup = {}
+        for service in services:
+            lookup.setdefault((service["code"] or "").upper(), (service["id"], service["code"]))
+        return {"services": lookup, "info": {rec["id"]: (rec["name"], rec["result_type"]) for rec in services}}
+
+    def _resolve_chunk(self, rows, service_lookup):
+        """Resolve a chunk of rows to analysis ids with one query per model.
+
+        Returns a list of dicts carrying the row, the resolved ``analysis_id`` and
+        ``service_code`` and an ``error`` message when the row cannot be applied.
+        """
+        self.ensure_one()
+        resolved = []
+        for row_no, row in rows:
+            item = {"row_no": row_no, "row": row, "analysis_id": False, "service_id": False, "service_code": "", "error": False}
+            if self.import_type == "instrument_csv":
+                if not row["accession"] or not row["instrument_code"] or not row["test_code"]:
+                    item["error"] = _("Missing accession, instrument_code, or test_code")
+                elif row["instrument_code"] not in service_lookup["instrument_codes"]:
+                    item["error"] = _("Instrument not found")
+                else:
+                    service = service_lookup["services"].get((row["instrument_code"], row["test_code"]))
+                    if not service:
+                        item["error"] = _("Mapping not found")
+                    else:
+                        item["service_id"], item["service_code"] = service
+            else:
+                item["service_code"] = row["service_code"]
+                if not row["accession"] or not row["service_code"]:
+                    item["error"] = _("Missing accession or service_code")
+                else:
+                    service = service_lookup["services"].get(row["service_code"])
+                    if not service:
+                        item["error"] = _("Analysis line not found for service code")
+                    else:
+                        item["service_id"] = service[0]
+            if not item["error"]:
+                item["error"] = self._check_row_result(row["result"], *service_lookup["info"][item["service_id"]])
+            resolved.append(item)
+
+        pending = [item for item in resolved if not item["error"]]
+        accessions = list({item["row"]["accession"] for item in pending})
+        sample_by_accession = {}
+        if accessions:
+            samples = self.env["lab.sample"].search_read(
+                ["|", ("name", "in", accessions), ("accession_barcode", "in", accessions)],
+                ["name", "accession_barcode"],
+                order="id asc",
+            )
+            for sample in samples:
+                sample_by_accession.setdefault(sample["name"], sample["id"])
+            for sample in samples:
+                if sample["accession_barcode"]:
+                    sample_by_accession.setdefault(sample["accession_barcode"], sample["id"])
+
+        sample_ids = list(set(sample_by_accession.values()))
+        service_ids = list({item["service_id"] for item in pending})
+        analysis_by_key = {}
+        if sample_ids and service_ids:
+            analyses = self.env["lab.sample.analysis"].search_read(
+                [
+                    ("sample_id", "in", sample_ids),
+                    ("service_id", "in", service_ids),
+                    ("state", "in", IMPORT_ANALYSIS_STATES),
+                ],
+                ["sample_id", "service_id"],
+                order="id desc",
+            )
+            for analysis in analyses:
+                analysis_by_key.setdefault((analysis["sample_id"][0], analysis["service_id"][0]), analysis["id"])
+
+        for item in pending:
+            sample_id = sample_by_accession.get(item["row"]["accession"])
+            if not sample_id:
+                item["error"] = _("Sample not found")
+                continue
+            analysis_id = analysis_by_key.get((sample_id, item["service_id"]))
+            if not analysis_id:
+                item["error"] = (
+                    _("Analysis line not found for mapped service")
+                    if self.import_type == "instrument_csv"
+                    else _("Analysis line not found for service code")
+                )
+                continue
+            item["analysis_id"] = analysis_id
+        return resolved
+
+    def _check_row_result(self, result, service_name, result_type):
+        if not result:
+            if self.auto_mark_done:
+                return _("Please input result value for %s") % service_name
+            return False
+        if result_type == "numeric":
+            try:
+                float(result)
+            except ValueError:
+                return _("Numeric result expected for service %s") % service_name
+        return False
+
+    # ------------------------------------------------------------------
+    # Applying
+    # ------------------------------------------------------------------
+    def _apply_resolved(self, resolved):
+        """Write results grouped by value and mark lines done in one pass.
+
+        Rows that resolve to the same analysis keep the last value, as a
+        row-by-row import would.
+        """
+        self.ensure_one()
+        analysis_model = self.env["lab.sample.analysis"]
+        values_by_analysis = {}
+        for item in resolved:
+            if not item["error"]:
+                values_by_analysis[item["analysis_id"]] = (item["row"]["result"], item["row"]["remark"])
+        grouped = {}
+        for analysis_id, values in values_by_analysis.items():
+            grouped.setdefault(values, []).append(analysis_id)
+        for (result, remark), analysis_ids in grouped.items():
+            analysis_model.browse(analysis_ids).write({"result_value": result, "result_note": remark})
+
+        errors = {}
+        if self.auto_mark_done and values_by_analysis:
+            analyses = analysis_model.browse(list(values_by_analysis))
+            to_done = analyses.filtered(lambda x: x.state in ("pending", "assigned", "rejected"))
+            try:
+                with self.env.cr.savepoint():
+                    to_done.action_mark_done()
+            except Exception:  # noqa: BLE001
+                for analysis in to_done:
+                    try:
+                        with self.env.cr.savepoint():
+                            analysis.action_mark_done()
+                    except Exception as err:  # noqa: BLE001
+                        errors[analysis.id] = str(err)
+        for item in resolved:
+            if not item["error"] and item["analysis_id"] in errors:
+                item["error"] = errors[item["analysis_id"]]
+        return resolved
+
+    def _line_vals(self, item):
+        row = item["row"]
+        if item["error"]:
+            status, message = "failed", item["error"]
+        elif self.validate_only:
+            status, message = "valid", "Validated"
+        else:
+            status, message = "success", "Imported"
+        return {
+            "job_id": self.id,
+            "row_no": item["row_no"],
+            "accession": row["accession"],
+            "instrument_code": row["instrument_code"] or False,
+            "test_code": row["test_code"] or False,
+            "service_code": item["service_code"],
+            "result_value": row["result"],
+            "remark": row["remark"] or False,
+            "analysis_id": item["analysis_id"] or False,
+            "status": status,
+            "message": message[:255],
+        }
+
+    def _apply_validated_lines(self, chunk_size):
+        """Apply rows a validate-only run already resolved, without repeating lookups.
+
+        Lines whose analysis left an importable state since validation fail
+        instead of being written.
+        """
+        self.ensure_one()
+        line_model = self.env["lab.import.job.line"]
+        while True:
+            lines = line_model.search([("job_id", "=", self.id), ("status", "=", "valid")], order="id asc", limit=chunk_size)
+            if not lines:
+                break
+            with self.env.cr.savepoint():
+                self._apply_validated_chunk(lines)
+            self._commit_chunk()
+
+    def _apply_validated_chunk(self, lines):
+        resolved = []
+        for line in lines:
+            item = {
+                "line": line,
+                "row": {"result": line.result_value or "", "remark": line.remark or ""},
+                "analysis_id": line.analysis_id.id,
+                "error": False,
+            }
+            if not line.analysis_id or line.analysis_id.state not in IMPORT_ANALYSIS_STATES:
+                item["error"] = _("Analysis line changed since validation")
+            resolved.append(item)
+        self._apply_resolved(resolved)
+        failed_items = [item for item in resolved if item["error"]]
+        for item in failed_items:
+            item["line"].write({"status": "failed", "message": item["error"][:255]})
+        lines.filtered(lambda x: x.status == "valid").write({"status": "success", "message": "Imported"})
+        failed = len(failed_items)
+        self.write({"success_rows": self.success_rows - failed, "failed_rows": self.failed_rows + failed})
+
+    def _as_import_user(self):
+        """Return the job in the environment it is processed in.
+
+        The cron runs as the superuser; lookups must follow the company rules
+        of the user who queued the job, and results, chatter and custody
+        entries must be attributed to that user. Validated rows are applied
+        as the user who confirmed them.
+        """
+        self.ensure_one()
+        user = self.applied_by_id if self.validated_at and self.applied_by_id else self.create_uid
+        return self.with_user(user).with_company(self.company_id)
+
+    def _commit_chunk(self):
+        if getattr(threading.current_thread(), "testing", False):
+            return
+        self.env.cr.commit()
+        self.env.invalidate_all()
+
+    def _process_import(self):
+        """Stream the file in chunks, resuming after the last committed chunk.
+
+        Every chunk runs in a savepoint, so a failing job is marked failed
+        and the next one still runs; a job that keeps killing the worker is
+        given up after ``IMPORT_MAX_ATTEMPTS`` runs.
+        """
+        chunk_size = self._import_chunk_size()
+        for job in self:
+            job = job._as_import_user()
+            if job.attempt_count >= IMPORT_MAX_ATTEMPTS:
+                job._fail_import(_("Import stopped after %s interrupted runs.") % job.attempt_count)
+                continue
+            job.write({"status": "running", "note": _("Import running."), "attempt_count": job.attempt_count + 1})
+            job._commit_chunk()
+            try:
+                if job.validated_at:
+                    job._apply_validated_lines(chunk_size)
+                else:
+                    job._import_file_chunks(chunk_size)
+            except (UserError, UnicodeDecodeError, csv.Error) as err:
+                job._fail_import(job._decode_error_message() if isinstance(err, UnicodeDecodeError) else str(err))
+                continue
+            except Exception as err:
+                _logger.exception("Import job %s failed", job.name)
+                job._fail_import(_("Unexpected error: %(type)s: %(error)s") % {"type": type(err).__name__, "error": err})
+                continue
+            job._finish_import()
+        return True
+
+    def _import_file_chunks(self, chunk_size):
+        self.ensure_one()
+        line_model = self.env["lab.import.job.line"]
+        with self.env.cr.savepoint():
+            service_lookup = self._service_lookup()
+        with self._open_file_stream() as stream:
+            rows = self._iter_rows(stream)
+            if self.processed_rows:
+                rows = islice(rows, self.processed_rows, None)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                with self.env.cr.savepoint():
+                    resolved = self._resolve_chunk(chunk, service_lookup)
+                    if not self.validate_only:
+                        self._apply_resolved(resolved)
+                    line_model.create([self._line_vals(item) for item in resolved])
+                    failed = len([1 for item in resolved if item["error"]])
+                    self.write(
+                        {
+                            "processed_rows": self.processed_rows + len(resolved),
+                            "success_rows": self.success_rows + len(resolved) - failed,
+                            "failed_rows": self.failed_rows + failed,
+                        }
+                    )
+                self._commit_chunk()
+
+    def _fail_import(self, message):
+        self.ensure_one()
+        self.write({"status": "failed", "finished_at": fields.Datetime.now(), "note": message})
+        self._commit_chunk()
+
+    def _finish_import(self):
+        self.ensure_one()
+        if self.validate_only:
+            vals = {
+                "status": "validated",
+                "validated_at": fields.Datetime.now(),
+                "note": _("Validation finished. Valid: %(u)s, Invalid: %(f)s")
+                % {"u": self.success_rows, "f": self.failed_rows},
+            }
+        else:
+            vals = {
+                "status": "done" if self.failed_rows == 0 else "failed",
+                "note": _("Import finished. Success: %(u)s, Failed: %(f)s")
+                % {"u": self.success_rows, "f": self.failed_rows},
+            }
+        vals.update({"total_rows": self.processed_rows, "finished_at": fields.Datetime.now()})
+        self.write(vals)
+        self._commit_chunk()
+
 
 class LabImportJobLine(models.Model):
     _name = "lab.import.job.line"
@@ -51,5 +589,7 @@ class LabImportJobLine(models.Model):
     test_code = fields.Char()
     service_code = fields.Char()
     result_value = fields.Char()
-    status = fields.Selection([( "success", "Success"), ("failed", "Failed")], required=True)
+    remark = fields.Char()
+    analysis_id = fields.Many2one("lab.sample.analysis", ondelete="set null", readonly=True)
+    status = fields.Selection([("valid", "Valid"), ("success", "Success"), ("failed", "Failed")], required=True)
     message = fields.Char()
@@ -1,4 +1,13 @@
-from odoo import fields, models
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+
+from .lab_instrument_parser import (
+    IMPORT_DELIMITER_SELECTION,
+    IMPORT_ENCODING_SELECTION,
+    IMPORT_ROW_KEYS,
+    parse_mapping_text,
+    parser_selection,
+)
 
 
 class LabInstrument(models.Model):
@@ -22,6 +31,68 @@ class LabInstrument(models.Model):
     active = fields.Boolean(default=True)
     mapping_ids = fields.One2many("lab.instrument.test.map", "instrument_id", string="Test Mapping")
 
+    import_parser = fields.Selection(
+        selection=lambda self: parser_selection(),
+        string="Result File Format",
+        default="csv",
+        required=True,
+    )
+    import_encoding = fields.Selection(IMPORT_ENCODING_SELECTION, string="File Encoding", default="utf-8-sig", required=True)
+    import_delimiter = fields.Selection(IMPORT_DELIMITER_SELECTION, string="Delimiter", default=",")
+    import_quotechar = fields.Char(string="Quote Character", default='"', size=1)
+    import_header_lines_skip = fields.Integer(
+        string="Skip Leading Lines",
+        default=0,
+        help="Banner lines the analyzer writes before the header (delimited) or before the first record (fixed-width).",
+    )
+    import_column_map = fields.Text(
+        string="Column Mapping",
+        help="One mapping per line as field=source, e.g. accession=SampleID. "
+        "Fields: accession, test_code, result, remark. For XML use a child tag or @attribute as source.",
+    )
+    import_layout = fields.Text(
+        string="Fixed-Width Layout",
+        help="One field per line as field=start,width with a zero-based start, e.g. accession=0,12.",
+    )
+    import_record_tag = fields.Char(string="XML Record Tag", default="result")
+
+    @api.constrains("import_column_map", "import_layout")
+    def _check_import_profile(self):
+        for rec in self:
+            for key, _source in parse_mapping_text(rec.import_column_map):
+                if key not in IMPORT_ROW_KEYS:
+                    raise ValidationError(_("Unknown import field in column mapping: %s") % key)
+            rec._parse_import_layout()
+
+    def _parse_import_layout(self):
+        self.ensure_one()
+        layout = []
+        for key, spec in parse_mapping_text(self.import_layout):
+            try:
+                start, width = (int(part) for part in spec.split(","))
+            except ValueError as exc:
+                raise ValidationError(_("Fixed-width layout line for %s must be start,width.") % key) from exc
+            if key not in IMPORT_ROW_KEYS or start < 0 or width <= 0:
+                raise ValidationError(_("Invalid fixed-width layout entry: %s") % key)
+            layout.append((key, start, width))
+        return layout
+
+    def _get_import_profile(self):
+        """Describe how to read this analyzer's native result files."""
+        self.ensure_one()
+        return {
+            "parser": self.import_parser or "csv",
+            "encoding": self.import_encoding or "utf-8-sig",
+            "xml_encoding": None if (self.import_encoding or "utf-8-sig") == "utf-8-sig" else self.import_encoding,
+            "delimiter": self.import_delimiter or ",",
+            "quotechar": self.import_quotechar or '"',
+            "header_lines_skip": max(self.import_header_lines_skip, 0),
+            "column_map": dict(parse_mapping_text(self.import_column_map)),
+            "layout": self._parse_import_layout(),
+            "record_tag": (self.import_record_tag or "result").strip(),
+            "instrument_code": self.code,
+        }
+
 
 class LabInstrumentTestMap(models.Model):
     _name = "lab.instrument.test.map"
@@ -0,0 +1,149 @@
+"""Native instrument result file parsers.
+
+Every parser takes a binary stream and an import profile (see
+``lab.instrument._get_import_profile``) and lazily yields ``(row_no, row)``
+tuples whose keys are ``IMPORT_ROW_KEYS``, so the import job pipeline does
+not care which analyzer produced the file.
+"""
+
+import csv
+import io
+
+from lxml import etree
+
+from odoo import _
+from odoo.exceptions import UserError
+
+IMPORT_ROW_KEYS = ("accession", "instrument_code", "test_code", "service_code", "result", "remark")
+
+IMPORT_ENCODING_SELECTION = [
+    ("utf-8-sig", "UTF-8"),
+    ("utf-16", "UTF-16"),
+    ("latin-1", "ISO-8859-1 (Latin-1)"),
+    ("cp1252", "Windows-1252"),
+    ("gb18030", "GB18030"),
+    ("shift_jis", "Shift JIS"),
+]
+IMPORT_DELIMITER_SELECTION = [(",", "Comma (,)"), (";", "Semicolon (;)"), ("\t", "Tab"), ("|", "Pipe (|)")]
+
+INSTRUMENT_PARSERS = {}
+
+
+def register_parser(code, label):
+    def decorator(func):
+        INSTRUMENT_PARSERS[code] = (label, func)
+        return func
+
+    return decorator
+
+
+def parser_selection():
+    return [(code, label) for code, (label, _func) in INSTRUMENT_PARSERS.items()]
+
+
+def iter_import_rows(stream, profile):
+    entry = INSTRUMENT_PARSERS.get(profile.get("parser") or "csv")
+    if not entry:
+        raise UserError(_("Unknown instrument file parser: %s") % profile.get("parser"))
+    return entry[1](stream, profile)
+
+
+def parse_mapping_text(text, separator="="):
+    """Parse ``key<separator>value`` lines, ignoring blanks and ``#`` comments."""
+    result = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#") or separator not in line:
+            continue
+        key, value = line.split(separator, 1)
+        result.append((key.strip(), value.strip()))
+    return result
+
+
+def _normalize(values, profile):
+    row = {key: (values.get(key) or "").strip() for key in IMPORT_ROW_KEYS}
+    row["service_code"] = row["service_code"].upper()
+    if not row["instrument_code"]:
+        row["instrument_code"] = profile.get("instrument_code") or ""
+    return row
+
+
+def _check_columns(available, profile):
+    missing = set(profile.get("required") or ()) - set(available)
+    if profile.get("instrument_code"):
+        missing.discard("instrument_code")
+    if missing:
+        raise UserError(
+            _("Import file is missing columns: %(cols)s.") % {"cols": ", ".join(sorted(missing))}
+        )
+
+
+@register_parser("csv", "Delimited Text (CSV)")
+def parse_delimited(stream, profile):
+    text = io.TextIOWrapper(stream, encoding=profile.get("encoding") or "utf-8-sig", newline="")
+    reader = csv.reader(text, delimiter=profile.get("delimiter") or ",", quotechar=profile.get("quotechar") or '"')
+    skip = profile.get("header_lines_skip") or 0
+    for _i in range(skip):
+        next(reader, None)
+    header = [col.strip() for col in next(reader, [])]
+    column_map = profile.get("column_map") or {}
+    source_to_key = {source: key for key, source in column_map.items()}
+    keys = [source_to_key.get(col, col) for col in header]
+    _check_columns(keys, profile)
+    for row_no, values in enumerate(reader, start=skip + 2):
+        if not any(values):
+            continue
+        yield row_no, _normalize(dict(zip(keys, values)), profile)
+
+
+@register_parser("fixed_width", "Fixed-Width Text")
+def parse_fixed_width(stream, profile):
+    layout = profile.get("layout") or []
+    _check_columns([key for key, _start, _width in layout], profile)
+    text = io.TextIOWrapper(stream, encoding=profile.get("encoding") or "utf-8-sig", newline="")
+    skip = profile.get("header_lines_skip") or 0
+    for row_no, line in enumerate(text, start=1):
+        if row_no <= skip:
+            continue
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        yield row_no, _normalize({key: line[start : start + width] for key, start, width in layout}, profile)
+
+
+@register_parser("xml", "XML Records")
+def parse_xml(stream, profile):
+    record_tag = profile.get("record_tag") or "result"
+    column_map = profile.get("column_map") or {}
+    events = etree.iterparse(
+        stream,
+        events=("end",),
+        tag=record_tag,
+        encoding=profile.get("xml_encoding"),
+        resolve_entities=False,
+        no_network=True,
+    )
+    try:
+        for row_no, (_event, elem) in enumerate(events, start=1):
+            values = {}
+            present = []
+            for key in IMPORT_ROW_KEYS:
+                source = column_map.get(key, key)
+                if source.startswith("@"):
+                    values[key] = elem.get(source[1:])
+                    found = source[1:] in elem.attrib
+                else:
+                    child = elem.find(source)
+                    values[key] = child.text if child is not None else None
+                    found = child is not None
+                if found:
+                    present.append(key)
+            if row_no == 1:
+                # The first record stands in for the header row of text formats.
+                _check_columns(present, profile)
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+            yield row_no, _normalize(values, profile)
+    except etree.XMLSyntaxError as err:
+        raise UserError(_("Invalid XML result file: %s") % err) from err
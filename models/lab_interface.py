@@ -571,6 +571,17 @@ class LabInterfaceJob(models.Model):
             self.request_id = sample.request_id.id
             return "200", json.dumps({"status": "accepted", "updated_lines": updated})
 
+        if self.message_type == "qc":
+            entries = payload.get("runs")
+            if entries is None:
+                entries = [payload] if payload.get("material_code") or payload.get("qc_material_id") else []
+            if not entries:
+                raise UserError(_("Inbound QC payload has no runs."))
+            summary = self.env["lab.qc.run"].ingest_runs(entries)
+            if not summary["created"] and not summary["duplicates"]:
+                raise UserError(_("No QC runs could be ingested: %s") % json.dumps(summary["errors"]))
+            return "200", json.dumps(dict(summary, status="accepted"))
+
         return "200", json.dumps({"status": "accepted"})
 
     def action_process(self):
@@ -887,16 +898,17 @@ class LabSampleInterfaceMixin(models.Model):
             rec.interface_job_count = len(rec.interface_job_ids)
 
     def _queue_interface_report(self):
-        endpoint_obj = self.env["lab.interface.endpoint"]
+        endpoints = self.env["lab.interface.endpoint"].search(
+            [
+                ("active", "=", True),
+                ("system_type", "in", ("lis", "his")),
+                ("direction", "in", ("outbound", "bidirectional")),
+            ]
+        )
+        if not endpoints:
+            return
         jobs = self.env["lab.interface.job"]
         for rec in self:
-            endpoints = endpoint_obj.search(
-                [
-                    ("active", "=", True),
-                    ("system_type", "in", ("lis", "his")),
-                    ("direction", "in", ("outbound", "bidirectional")),
-                ]
-            )
             for endpoint in endpoints:
                 jobs._get_or_create_outbound_job(
                     endpoint=endpoint,
@@ -907,9 +919,14 @@ class LabSampleInterfaceMixin(models.Model):
 
     def action_release_report(self):
         result = super().action_release_report()
-        self._queue_interface_report()
+        if not self._defer_release_followups():
+            self._queue_interface_report()
         return result
 
+    def _run_release_followups(self):
+        super()._run_release_followups()
+        self._queue_interface_report()
+
     def action_view_interface_jobs(self):
         self.ensure_one()
         return {
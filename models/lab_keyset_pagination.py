@@ -0,0 +1,179 @@
+import base64
+import json
+
+from odoo import api, fields, models
+from odoo.tools import SQL
+
+KEYSET_FIELD_TYPES = ("char", "selection", "integer", "float", "monetary", "date", "datetime")
+
+
+class LabKeysetPagination(models.AbstractModel):
+    """Seek pagination for long portal and API listings.
+
+    Pages are read with ``WHERE (sort key, id) > cursor ORDER BY sort key, id
+    LIMIT n`` instead of ``OFFSET``, so page 5000 costs the same as page 1.
+    Cursors are opaque URL-safe tokens holding the sort values of the row at
+    the page boundary. NULLs follow PostgreSQL's default placement (last
+    ascending, first descending), which is what the ORM emits for plain
+    ``field asc|desc`` orders.
+    """
+
+    _name = "lab.keyset.pagination"
+    _description = "Keyset Pagination Helper"
+
+    @api.model
+    def _keyset_order(self, model_name, order):
+        """Return ``[(field name, descending)]`` ending with ``id``, or None if ``order`` cannot be seeked."""
+        model = self.env[model_name]
+        keys = []
+        for part in (order or "id").split(","):
+            tokens = part.split()
+            if not tokens or len(tokens) > 2:
+                return None
+            name = tokens[0]
+            direction = tokens[1].lower() if len(tokens) == 2 else "asc"
+            field = model._fields.get(name)
+            if direction not in ("asc", "desc") or not field or not field.store:
+                return None
+            if name != "id" and (field.type not in KEYSET_FIELD_TYPES or getattr(field, "translate", False)):
+                return None
+            keys.append((name, direction == "desc"))
+            if name == "id":
+                break
+        if keys[-1][0] != "id":
+            keys.append(("id", keys[-1][1]))
+        return keys
+
+    @api.model
+    def _encode_cursor(self, record, keys):
+        values = []
+        for name, _desc in keys:
+            value = record[name]
+            if isinstance(value, models.BaseModel):
+                value = value.id
+            field = record._fields[name]
+            if value is False and field.type not in ("integer", "float", "monetary"):
+                value = None
+            elif field.type == "datetime":
+                value = fields.Datetime.to_string(value)
+            elif field.type == "date":
+                value = fields.Date.to_string(value)
+            values.append(value)
+        return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+    @api.model
+    def _decode_cursor(self, token, keys, model_name):
+        """Return the cursor values, or None unless every value fits the type of its key."""
+        if not token:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        except ValueError:
+            return None
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        model = self.env[model_name]
+        for (name, _desc), value in zip(keys, values):
+            if not self._cursor_value_valid(model._fields[name], value):
+                return None
+        return values
+
+    @api.model
+    def _cursor_value_valid(self, field, value):
+        if field.name == "id" or field.type == "integer":
+            return isinstance(value, int) and not isinstance(value, bool)
+        if field.type in ("float", "monetary"):
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+        if value is None:
+            return True
+        if not isinstance(value, str):
+            return False
+        try:
+            if field.type == "date":
+                fields.Date.to_date(value)
+            elif field.type == "datetime":
+                fields.Datetime.to_datetime(value)
+        except ValueError:
+            return False
+        return True
+
+    @api.model
+    def _seek_domain(self, keys, values):
+        """Domain of the rows strictly after ``values`` in the ``keys`` order."""
+        branches = []
+        for index, (name, desc) in enumerate(keys):
+            value = values[index]
+            if value is None:
+                # NULL sorts last ascending (nothing follows) and first descending (every value follows).
+                if not desc:
+                    continue
+                last = [(name, "!=", False)]
+            elif desc:
+                last = [(name, "<", value)]
+            else:
+                last = ["|", (name, ">", value), (name, "=", False)]
+            terms = [
+                [(prev_name, "=", False if values[prev] is None else values[prev])]
+                for prev, (prev_name, _prev_desc) in enumerate(keys[:index])
+            ]
+            terms.append(last)
+            branches.append(["&"] * (len(terms) - 1) + [leaf for term in terms for leaf in term])
+        if not branches:
+            return [("id", "=", 0)]
+        domain = ["|"] * (len(branches) - 1) + [leaf for branch in branches for leaf in branch]
+        # Redundant range on the leading key lets PostgreSQL start the index scan at the cursor.
+        name, desc = keys[0]
+        if values[0] is None:
+            return domain
+        if desc:
+            return ["&", (name, "<=", values[0])] + domain
+        return ["&", "|", (name, ">=", values[0]), (name, "=", False)] + domain
+
+    @api.model
+    def _keyset_search(self, model_name, domain, order, limit, after=None, before=None):
+        """Read one page after or before a cursor.
+
+        Return ``(records, previous cursor, next cursor)``; a cursor is False
+        when there is nothing on that side. Return None when ``order`` does
+        not support seeking or a cursor is invalid, so callers can fall back
+        to offset paging.
+        """
+        keys = self._keyset_order(model_name, order)
+        if not keys:
+            return None
+        model = self.env[model_name].sudo()
+        backwards = bool(before) and not after
+        token = before if backwards else after
+        values = self._decode_cursor(token, keys, model_name)
+        if token and values is None:
+            return None
+        seek_keys = [(name, not desc) for name, desc in keys] if backwards else keys
+        seek_order = ", ".join("%s %s" % (name, "desc" if desc else "asc") for name, desc in seek_keys)
+        seek_domain = list(domain)
+        if values is not None:
+            seek_domain += self._seek_domain(seek_keys, values)
+        records = model.search(seek_domain, order=seek_order, limit=limit + 1)
+        more = len(records) > limit
+        records = records[:limit]
+        if backwards:
+            records = records.browse(list(reversed(records.ids)))
+            has_previous, has_next = more, True
+        else:
+            has_previous, has_next = bool(token), more
+        previous_cursor = has_previous and records and self._encode_cursor(records[0], keys)
+        next_cursor = has_next and records and self._encode_cursor(records[-1], keys)
+        return records, previous_cursor or False, next_cursor or False
+
+    @api.model
+    def _approximate_count(self, model_name, domain, exact_below=5000):
+        """Planner row estimate of ``domain``; exact when the estimate is below ``exact_below``."""
+        model = self.env[model_name].sudo()
+        query = model._search(domain)
+        self.env.cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query.select(SQL("1"))))
+        plan = self.env.cr.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+        if estimate < exact_below:
+            return model.search_count(domain), True
+        return estimate, False
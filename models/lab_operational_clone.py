@@ -1,10 +1,12 @@
 import json
-import statistics
+from array import array
 from collections import defaultdict
 
 from odoo import _, api, fields, models
 from odoo.exceptions import UserError, ValidationError
 
+from .lab_qc_engine import series_stats
+
 
 DEPARTMENTS = [
     ("chemistry", "Clinical Chemistry"),
@@ -406,25 +408,43 @@ class LabQcTrendSnapshot(models.Model):
                 vals["name"] = seq_model.next_by_code("lab.quality.kpi.snapshot") or "New"
         return super().create(vals_list)
 
-    def _service_qc_values(self, service, limit_size):
-        rows = self.env["lab.qc.run"].search(
-            [("service_id", "=", service.id)],
-            order="run_date desc, id desc",
-            limit=limit_size,
+    @api.model
+    def _service_qc_values(self, service_ids, limit_size):
+        """Return ``{service_id: [result_value, ...]}``, newest first, in one windowed query."""
+        if not service_ids:
+            return {}
+        self.env["lab.qc.run"].flush_model(["service_id", "run_date", "result_value"])
+        self.env.cr.execute(
+            """
+            SELECT service_id, result_value
+              FROM (
+                    SELECT service_id,
+                           result_value,
+                           ROW_NUMBER() OVER (PARTITION BY service_id ORDER BY run_date DESC, id DESC) AS rn
+                      FROM lab_qc_run
+                     WHERE service_id = ANY(%s)
+                   ) ranked
+             WHERE rn <= %s AND result_value IS NOT NULL
+             ORDER BY service_id, rn
+            """,
+            [list(service_ids), max(limit_size or 0, 1)],
         )
-        return [x.result_value for x in rows if x.result_value not in (None, False)]
+        values = defaultdict(lambda: array("d"))
+        for service_id, result_value in self.env.cr.fetchall():
+            values[service_id].append(result_value)
+        return values
 
     def action_capture(self):
         for rec in self:
             profile = rec.profile_id
             services = profile.service_ids or self.env["lab.service"].search([])
+            values_by_service = rec._service_qc_values(services.ids, profile.window_size)
             lines = []
             for service in services:
-                values = rec._service_qc_values(service, profile.window_size)
+                values = values_by_service.get(service.id)
                 if not values:
                     continue
-                mean_val = statistics.mean(values)
-                std_val = statistics.pstdev(values) if len(values) > 1 else 0.0
+                mean_val, std_val = series_stats(values)
                 latest = values[0]
                 sigma = abs((latest - mean_val) / std_val) if std_val else 0.0
                 if sigma >= profile.reject_sigma:
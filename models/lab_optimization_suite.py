@@ -902,12 +902,14 @@ class LabSample(models.Model):
             )
 
     def action_release_report(self):
+        iso_blockers = (
+            self._get_iso15189_release_blockers_batch() if hasattr(self, "_get_iso15189_release_blockers_batch") else {}
+        )
         for rec in self:
             blockers = []
             if hasattr(rec, "review_required_for_release") and rec.review_required_for_release and not rec.review_release_ready:
                 blockers.append(rec.review_block_reason or _("Dual review is not complete."))
-            if hasattr(rec, "_get_iso15189_release_blockers"):
-                blockers.extend(rec._get_iso15189_release_blockers())
+            blockers.extend(iso_blockers.get(rec.id, []))
             if blockers:
                 rec._create_release_exception("\n".join(blockers), category="review", severity="high")
         return super().action_release_report()
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from odoo import api, models
+from odoo.tools import SQL
+
+# Portal counters: {(dbname, commercial partner id, model name, cache key): (expires_at, counts)}.
+PORTAL_COUNTER_CACHE = {}
+PORTAL_COUNTER_LOCK = threading.Lock()
+PORTAL_COUNTER_TTL = 30
+# Partner ids whose counters the current transaction changed, kept in cr.postcommit.data.
+PORTAL_COUNTER_PENDING = "laboratory_management.portal_counters_stale"
+
+
+def _drop_portal_counters(dbname, partner_ids):
+    with PORTAL_COUNTER_LOCK:
+        for key in [key for key in PORTAL_COUNTER_CACHE if key[0] == dbname and key[1] in partner_ids]:
+            del PORTAL_COUNTER_CACHE[key]
+
+
+class LabPortalCounter(models.AbstractModel):
+    """Grouped record counts for the portal home page and dashboard, cached per partner."""
+
+    _name = "lab.portal.counter"
+    _description = "Portal Counter Helper"
+
+    @api.model
+    def _grouped_counts(self, model_name, domain, buckets, partner_id=None, cache_key=None):
+        """Count ``domain`` records overall (``"all"``) and per bucket in one query.
+
+        ``buckets`` maps a key to ``{field: value or tuple of values}`` on stored
+        columns of ``model_name``. With a ``partner_id`` and a ``cache_key`` the
+        counts are kept for ``laboratory_management.portal_counter_cache_seconds``
+        (0 disables); committed changes to records of that partner drop them
+        earlier in this process, other workers catch up when the entry expires.
+        A transaction that changed the partner's records neither reads nor
+        fills its cache.
+        """
+        config = self.env["ir.config_parameter"].sudo()
+        ttl = int(config.get_param("laboratory_management.portal_counter_cache_seconds", PORTAL_COUNTER_TTL) or 0)
+        cached = partner_id and cache_key is not None and ttl > 0
+        if cached and partner_id in self.env.cr.postcommit.data.get(PORTAL_COUNTER_PENDING, ()):
+            cached = False
+        full_key = (self.env.cr.dbname, partner_id, model_name, cache_key)
+        if cached:
+            with PORTAL_COUNTER_LOCK:
+                entry = PORTAL_COUNTER_CACHE.get(full_key)
+            if entry and entry[0] > time.monotonic():
+                return dict(entry[1])
+
+        model = self.env[model_name].sudo()
+        query = model._search(domain)
+        aggregates = [SQL("COUNT(*)")]
+        for conditions in buckets.values():
+            clauses = [
+                SQL(
+                    "%s IN %s" if isinstance(value, tuple) else "%s = %s",
+                    model._field_to_sql(model._table, name, query),
+                    value,
+                )
+                for name, value in conditions.items()
+            ]
+            aggregates.append(SQL("COUNT(*) FILTER (WHERE %s)", SQL(" AND ").join(clauses)))
+        [row] = self.env.execute_query(query.select(*aggregates))
+        counts = dict(zip(["all", *buckets], row))
+
+        if cached:
+            with PORTAL_COUNTER_LOCK:
+                PORTAL_COUNTER_CACHE[full_key] = (time.monotonic() + ttl, counts)
+        return dict(counts)
+
+    @api.model
+    def _invalidate_partners(self, partners):
+        """Drop the cached counters of ``partners`` and their ancestors once the transaction commits.
+
+        Portal listings match ``child_of``, so every ancestor sees the records
+        of a partner. Dropping earlier would let a concurrent request cache
+        the counts from before the change again.
+        """
+        partner_ids = {int(pid) for path in partners.sudo().mapped("parent_path") if path for pid in path.split("/") if pid}
+        if not partner_ids:
+            return
+        cr = self.env.cr
+        pending = cr.postcommit.data.get(PORTAL_COUNTER_PENDING)
+        if pending is None:
+            pending = cr.postcommit.data[PORTAL_COUNTER_PENDING] = set()
+            dbname = cr.dbname
+            cr.postcommit.add(lambda: _drop_portal_counters(dbname, pending))
+        pending |= partner_ids
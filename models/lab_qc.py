@@ -1,7 +1,39 @@
 import json
+import threading
+from array import array
+from datetime import timedelta
 
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+from .lab_qc_engine import (
+    QC_Z_HISTORY,
+    QcRollingState,
+    classify_rules,
+    downsample_lttb,
+    evaluate_rules,
+    scan_rule,
+)
+
+QC_CHART_MAX_POINTS = 2000
+QC_CHART_DEFAULT_POINTS = 500
+QC_TREND_RUNS = 30
+QC_REVISION_SEQUENCE = "lab_qc_material_revision_seq"
+QC_RULE_REPLAY_DAYS = 30
+
+QC_RUN_RESULT_FIELDS = (
+    "z_score",
+    "analytical_sigma",
+    "prev_z_score",
+    "prev2_z_score",
+    "moving_avg_20",
+    "moving_sd_20",
+    "westgard_rules",
+    "westgard_rule_count",
+    "status",
+    "rule_triggered",
+)
 
 
 class LabQcMaterial(models.Model):
@@ -12,6 +44,7 @@ class LabQcMaterial(models.Model):
     name = fields.Char(required=True)
     code = fields.Char(required=True)
     service_id = fields.Many2one("lab.service", required=True)
+    instrument_id = fields.Many2one("lab.instrument", help="Analyzer this control material is run on.")
     lot_number = fields.Char()
     target_value = fields.Float(required=True)
     std_dev = fields.Float(required=True, default=1.0)
@@ -30,13 +63,263 @@ class LabQcMaterial(models.Model):
         compute="_compute_trend_json",
         help="JSON payload for UI trend chart rendering of latest QC runs.",
     )
+    qc_state_json = fields.Text(
+        readonly=True,
+        copy=False,
+        help="Rolling Westgard state (recent results and z-scores) used to evaluate new runs incrementally.",
+    )
+    qc_revision = fields.Integer(
+        readonly=True,
+        copy=False,
+        help="Bumped whenever runs of this material are evaluated; keys the cached chart series.",
+    )
+    qc_replay_pending = fields.Boolean(
+        readonly=True,
+        copy=False,
+        index=True,
+        help="Set when a QC rule library change affects this material; recent runs are replayed in the background.",
+    )
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {"target_value", "std_dev", "rule_ids"} & set(vals):
+            self._reevaluate_qc_history()
+        elif "instrument_id" in vals:
+            self.env["lab.qc.status"]._refresh_services(self.mapped("service_id").ids)
+        return res
+
+    def unlink(self):
+        services = self.mapped("service_id")
+        res = super().unlink()
+        self.env["lab.qc.status"]._refresh_services(services.ids)
+        return res
+
+    def _qc_rules(self):
+        self.ensure_one()
+        if self.rule_ids:
+            return self.rule_ids.filtered("active")
+        return self.env["lab.qc.rule.library"].search([("active", "=", True)])
+
+    def _qc_rule_codes(self):
+        self.ensure_one()
+        return set(self._qc_rules().mapped("code"))
+
+    def _qc_rule_config(self):
+        """Return ``{(code, scope): severity}`` for the rules this material uses."""
+        self.ensure_one()
+        return {(rule.code, rule.scope or "material"): rule.severity for rule in self._qc_rules()}
+
+    def _qc_z(self, value):
+        self.ensure_one()
+        if (self.std_dev or 0.0) <= 0:
+            return 0.0
+        return (value - self.target_value) / self.std_dev
+
+    def _qc_run_values(self, state, key, value, rules):
+        """Fold one run into ``state`` and return its QC field values.
+
+        ``rules`` is the ``(reject_rules, warning_rules)`` pair already
+        evaluated for the run.
+        """
+        self.ensure_one()
+        std_dev = self.std_dev or 0.0
+        if std_dev <= 0:
+            state.push(key, value, 0.0)
+            return {
+                "z_score": 0.0,
+                "analytical_sigma": 0.0,
+                "prev_z_score": 0.0,
+                "prev2_z_score": 0.0,
+                "moving_avg_20": value or 0.0,
+                "moving_sd_20": 0.0,
+                "westgard_rules": "invalid_sd",
+                "westgard_rule_count": 1,
+                "status": "reject",
+                "rule_triggered": "invalid_sd",
+            }
+
+        z = self._qc_z(value)
+        prior_z = state.recent_z(2)
+        moving_avg, moving_sd = state.push(key, value, z)
+        reject_rules, warning_rules = rules
+        all_rules = reject_rules + warning_rules
+        if reject_rules:
+            status, triggered = "reject", reject_rules[0]
+        elif warning_rules:
+            status, triggered = "warning", warning_rules[0]
+        else:
+            status, triggered = "pass", "in_control"
+        return {
+            "z_score": z,
+            # Analytical sigma proxy for dashboarding (target/sd).
+            "analytical_sigma": abs(self.target_value or 0.0) / std_dev,
+            "prev_z_score": prior_z[0] if prior_z else 0.0,
+            "prev2_z_score": prior_z[1] if len(prior_z) > 1 else 0.0,
+            "moving_avg_20": moving_avg,
+            "moving_sd_20": moving_sd,
+            "westgard_rules": ", ".join(all_rules) if all_rules else "in_control",
+            "westgard_rule_count": len(all_rules),
+            "status": status,
+            "rule_triggered": triggered,
+        }
+
+    def _reevaluate_qc_history(self, date_from=False):
+        """Re-run the rules over whole histories in one sorted pass per service.
+
+        Every control level of the affected services is replayed together so
+        rules evaluated across levels see the same series as single-run entry.
+        Each rule is scanned once over the z-score array; only rows whose
+        values changed are written. With ``date_from``, runs before it are
+        read only as rule context and keep their stored results.
+        """
+        if not self:
+            return
+        run_obj = self.env["lab.qc.run"].sudo().with_context(qc_engine_write=True)
+        fnames = list(QC_RUN_RESULT_FIELDS)
+        run_obj.flush_model(["qc_material_id", "run_date", "result_value"])
+        new_rejects = run_obj.browse()
+        material_obj = self.with_context(active_test=False)
+        for service in self.mapped("service_id"):
+            materials = material_obj.search([("service_id", "=", service.id)]) | self.filtered(
+                lambda m, s=service: m.service_id == s
+            )
+            domain = [("qc_material_id", "in", materials.ids)]
+            if date_from:
+                domain.append(("run_date", ">=", materials._qc_context_start(date_from)))
+            rows = run_obj.search_read(
+                domain,
+                ["qc_material_id", "run_date", "result_value"] + fnames,
+                order="run_date asc, id asc",
+            )
+            material_by_id = {material.id: material for material in materials}
+            configs = {material.id: material._qc_rule_config() for material in materials}
+            service_z = array("d")
+            positions = {material.id: [] for material in materials}
+            for pos, row in enumerate(rows):
+                material = material_by_id[row["qc_material_id"][0]]
+                service_z.append(material._qc_z(row["result_value"]))
+                positions[material.id].append(pos)
+            service_codes = {code for config in configs.values() for code, scope in config if scope == "service"}
+            service_flags = {code: scan_rule(code, service_z) for code in service_codes}
+
+            for material in materials:
+                config = configs[material.id]
+                material_pos = positions[material.id]
+                material_z = array("d", (service_z[pos] for pos in material_pos))
+                material_flags = {
+                    code: scan_rule(code, material_z) for code, scope in config if scope == "material"
+                }
+                state = QcRollingState()
+                for idx, pos in enumerate(material_pos):
+                    row = rows[pos]
+                    fired = {(code, "material") for code, flags in material_flags.items() if flags[idx]}
+                    fired |= {
+                        (code, "service")
+                        for code, scope in config
+                        if scope == "service" and service_flags[code][pos]
+                    }
+                    key = (fields.Datetime.to_string(row["run_date"]), row["id"])
+                    vals = material._qc_run_values(state, key, row["result_value"], classify_rules(fired, config))
+                    if date_from and row["run_date"] < date_from:
+                        continue
+                    changed = {
+                        fname: value
+                        for fname, value in vals.items()
+                        if (
+                            abs((row[fname] or 0.0) - value) > 1e-9
+                            if isinstance(value, float)
+                            else (row[fname] or False) != (value or False)
+                        )
+                    }
+                    if changed:
+                        run_obj.browse(row["id"]).write(changed)
+                        if changed.get("status") == "reject":
+                            new_rejects |= run_obj.browse(row["id"])
+                material._store_qc_state(state)
+        self.env["lab.qc.status"]._refresh_services(self.mapped("service_id").ids)
+        new_rejects._auto_create_reject_nonconformance()
+
+    def _qc_context_start(self, date_from):
+        """Earliest run date needed to rebuild the rule windows of these materials at ``date_from``."""
+        self.env.cr.execute(
+            """
+            SELECT MIN(run_date)
+              FROM (
+                    SELECT run_date,
+                           ROW_NUMBER() OVER (PARTITION BY qc_material_id ORDER BY run_date DESC, id DESC) AS depth
+                      FROM lab_qc_run
+                     WHERE qc_material_id = ANY(%s) AND run_date < %s
+                   ) prior
+             WHERE depth <= %s
+            """,
+            [self.ids, date_from, QC_Z_HISTORY],
+        )
+        return self.env.cr.fetchone()[0] or date_from
+
+    @api.model
+    def _cron_replay_qc_rules(self, limit=None):
+        """Replay the recent runs of materials flagged by QC rule library changes.
+
+        Runs older than ``laboratory_management.qc_rule_replay_days`` keep the
+        status they were released with; they only feed the rule windows.
+        """
+        config = self.env["ir.config_parameter"].sudo()
+        days = int(config.get_param("laboratory_management.qc_rule_replay_days", QC_RULE_REPLAY_DAYS) or 0)
+        date_from = fields.Datetime.now() - timedelta(days=days)
+        batch_size = limit or 20
+        material_obj = self.sudo().with_context(active_test=False)
+        while True:
+            materials = material_obj.search([("qc_replay_pending", "=", True)], limit=batch_size)
+            if not materials:
+                break
+            # Levels of a service are replayed together, so take them off the queue together.
+            materials |= material_obj.search(
+                [("qc_replay_pending", "=", True), ("service_id", "in", materials.service_id.ids)]
+            )
+            materials._reevaluate_qc_history(date_from=date_from)
+            materials.write({"qc_replay_pending": False})
+            if getattr(threading.current_thread(), "testing", False):
+                break
+            self.env.cr.commit()
+            self.env.invalidate_all()
+        return True
+
+    def init(self):
+        self.env.cr.execute(SQL("CREATE SEQUENCE IF NOT EXISTS %s", SQL.identifier(QC_REVISION_SEQUENCE)))
+        self.env.cr.execute(
+            SQL(
+                "SELECT setval(%(seq)s, GREATEST((SELECT last_value FROM %(table)s), MAX(qc_revision))) FROM lab_qc_material",
+                seq=QC_REVISION_SEQUENCE,
+                table=SQL.identifier(QC_REVISION_SEQUENCE),
+            )
+        )
+
+    def _store_qc_state(self, state):
+        """Store the rolling state; the revision comes from a sequence so rolled back series stay unreachable."""
+        self.ensure_one()
+        self.env.cr.execute(SQL("SELECT nextval(%s)", QC_REVISION_SEQUENCE))
+        self.sudo().write({"qc_state_json": state.to_json(), "qc_revision": self.env.cr.fetchone()[0]})
+
+    def _last_qc_run_ids(self):
+        ids = [material_id for material_id in self.ids if material_id]
+        if not ids:
+            return {}
+        self.env["lab.qc.run"].flush_model(["qc_material_id"])
+        self.env.cr.execute(
+            "SELECT qc_material_id, MAX(id) FROM lab_qc_run WHERE qc_material_id = ANY(%s) GROUP BY qc_material_id",
+            [ids],
+        )
+        return dict(self.env.cr.fetchall())
 
     def _compute_trend_json(self):
         for rec in self:
+            if not rec.id:
+                rec.trend_json = "[]"
+                continue
             rows = self.env["lab.qc.run"].search(
                 [("qc_material_id", "=", rec.id)],
                 order="run_date desc, id desc",
-                limit=30,
+                limit=QC_TREND_RUNS,
             )
             rows = rows.sorted("run_date")
             points = [
@@ -50,6 +333,82 @@ class LabQcMaterial(models.Model):
             ]
             rec.trend_json = json.dumps(points, ensure_ascii=True)
 
+    def get_levey_jennings_data(self, date_from=False, date_to=False, max_points=QC_CHART_DEFAULT_POINTS):
+        """Return downsampled Levey-Jennings series of these materials.
+
+        ``date_from``/``date_to`` are optional datetime strings bounding the
+        runs; each series holds at most ``max_points`` points chosen by LTTB
+        on the z-score, so multi-year histories stay cheap to draw. Only the
+        default full-history series is cached; other ranges are computed on
+        request so client input cannot fill the registry caches.
+        """
+        self.check_access("read")
+        max_points = max(3, min(int(max_points or QC_CHART_DEFAULT_POINTS), QC_CHART_MAX_POINTS))
+        date_from = fields.Datetime.to_string(fields.Datetime.to_datetime(date_from)) if date_from else False
+        date_to = fields.Datetime.to_string(fields.Datetime.to_datetime(date_to)) if date_to else False
+        cached = not date_from and not date_to and max_points == QC_CHART_DEFAULT_POINTS
+        last_run_ids = self._last_qc_run_ids() if cached else {}
+        result = []
+        for material in self:
+            if cached:
+                series = material._default_levey_jennings_series(
+                    material.id, material.qc_revision, last_run_ids.get(material.id)
+                )
+            else:
+                series = material._levey_jennings_series(material.id, date_from, date_to, max_points)
+            result.append(
+                dict(
+                    series,
+                    material_id=material.id,
+                    material_name=material.name,
+                    service_id=material.service_id.id,
+                    target_value=material.target_value,
+                    std_dev=material.std_dev,
+                )
+            )
+        return result
+
+    @api.model
+    @tools.ormcache("material_id", "revision", "last_run_id")
+    def _default_levey_jennings_series(self, material_id, revision, last_run_id):
+        """Full-history series at the default size, cached per evaluation revision and newest run."""
+        return self._levey_jennings_series(material_id, False, False, QC_CHART_DEFAULT_POINTS)
+
+    @api.model
+    def _levey_jennings_series(self, material_id, date_from, date_to, max_points):
+        """Build one material series from lab_qc_run."""
+        self.env["lab.qc.run"].flush_model(
+            ["qc_material_id", "run_date", "result_value", "z_score", "status", "rule_triggered"]
+        )
+        query = """
+            SELECT id, run_date, result_value, z_score, status, rule_triggered
+              FROM lab_qc_run
+             WHERE qc_material_id = %s
+        """
+        params = [material_id]
+        if date_from:
+            query += " AND run_date >= %s"
+            params.append(date_from)
+        if date_to:
+            query += " AND run_date <= %s"
+            params.append(date_to)
+        self.env.cr.execute(query + " ORDER BY run_date, id", params)
+        rows = self.env.cr.fetchall()
+        xs = array("d", (row[1].timestamp() for row in rows))
+        ys = array("d", (row[3] or 0.0 for row in rows))
+        points = [
+            {
+                "run_id": rows[i][0],
+                "x": fields.Datetime.to_string(rows[i][1]),
+                "value": rows[i][2],
+                "z": rows[i][3] or 0.0,
+                "status": rows[i][4],
+                "rule": rows[i][5] or "",
+            }
+            for i in downsample_lttb(xs, ys, max_points)
+        ]
+        return {"total_points": len(rows), "points": points}
+
 
 class LabQcRun(models.Model):
     _name = "lab.qc.run"
@@ -60,31 +419,29 @@ class LabQcRun(models.Model):
     name = fields.Char(default="New", readonly=True, copy=False)
     qc_material_id = fields.Many2one("lab.qc.material", required=True)
     service_id = fields.Many2one(related="qc_material_id.service_id", store=True)
+    instrument_id = fields.Many2one(related="qc_material_id.instrument_id", store=True)
     run_date = fields.Datetime(default=fields.Datetime.now, required=True)
     operator_id = fields.Many2one("res.users", default=lambda self: self.env.user, required=True)
     result_value = fields.Float(required=True)
-    z_score = fields.Float(compute="_compute_qc", store=True)
-    analytical_sigma = fields.Float(compute="_compute_qc", store=True)
-    prev_z_score = fields.Float(compute="_compute_qc", store=True)
-    prev2_z_score = fields.Float(compute="_compute_qc", store=True)
-    moving_avg_20 = fields.Float(compute="_compute_qc", store=True)
-    moving_sd_20 = fields.Float(compute="_compute_qc", store=True)
-    westgard_rules = fields.Char(compute="_compute_qc", store=True)
-    westgard_rule_count = fields.Integer(compute="_compute_qc", store=True)
+    z_score = fields.Float(readonly=True)
+    analytical_sigma = fields.Float(readonly=True)
+    prev_z_score = fields.Float(readonly=True)
+    prev2_z_score = fields.Float(readonly=True)
+    moving_avg_20 = fields.Float(readonly=True)
+    moving_sd_20 = fields.Float(readonly=True)
+    westgard_rules = fields.Char(readonly=True)
+    westgard_rule_count = fields.Integer(readonly=True)
     status = fields.Selection(
         [("pass", "Pass"), ("warning", "Warning"), ("reject", "Reject")],
-        compute="_compute_qc",
-        store=True,
+        readonly=True,
         tracking=True,
     )
-    rule_triggered = fields.Char(compute="_compute_qc", store=True)
+    rule_triggered = fields.Char(readonly=True)
     note = fields.Text()
 
     def _material_rule_codes(self):
         self.ensure_one()
-        if self.qc_material_id.rule_ids:
-            return set(self.qc_material_id.rule_ids.filtered("active").mapped("code"))
-        return set(self.env["lab.qc.rule.library"].search([("active", "=", True)]).mapped("code"))
+        return self.qc_material_id._qc_rule_codes()
 
     @api.model_create_multi
     def create(self, vals_list):
@@ -93,146 +450,130 @@ class LabQcRun(models.Model):
             if vals.get("name", "New") == "New":
                 vals["name"] = seq_model.next_by_code("lab.qc.run") or "New"
         records = super().create(vals_list)
+        records._evaluate_qc()
         records._auto_create_reject_nonconformance()
         return records
 
     def write(self, vals):
+        if self.env.context.get("qc_engine_write"):
+            return super().write(vals)
+        materials = self.mapped("qc_material_id") if "qc_material_id" in vals else self.env["lab.qc.material"]
         res = super().write(vals)
+        if {"result_value", "run_date", "qc_material_id"} & set(vals):
+            (materials | self.mapped("qc_material_id"))._reevaluate_qc_history()
         if "status" in vals or "result_value" in vals or "qc_material_id" in vals:
             self._auto_create_reject_nonconformance()
         return res
 
-    @api.depends(
-        "result_value",
-        "qc_material_id.target_value",
-        "qc_material_id.std_dev",
-        "qc_material_id.rule_ids",
-        "qc_material_id.rule_ids.active",
-    )
-    def _compute_qc(self):
-        for rec in self:
-            std_dev = rec.qc_material_id.std_dev or 0.0
-            if std_dev <= 0:
-                rec.z_score = 0.0
-                rec.analytical_sigma = 0.0
-                rec.prev_z_score = 0.0
-                rec.prev2_z_score = 0.0
-                rec.moving_avg_20 = rec.result_value or 0.0
-                rec.moving_sd_20 = 0.0
-                rec.westgard_rules = "invalid_sd"
-                rec.westgard_rule_count = 1
-                rec.status = "reject"
-                rec.rule_triggered = "invalid_sd"
-                continue
-
-            z = (rec.result_value - rec.qc_material_id.target_value) / std_dev
-            # Analytical sigma proxy for dashboarding (target/sd).
-            rec.analytical_sigma = abs(rec.qc_material_id.target_value or 0.0) / std_dev
-            rec.z_score = z
-            abs_z = abs(z)
-
-            prev_runs = self.search(
-                [
-                    ("qc_material_id", "=", rec.qc_material_id.id),
-                    ("id", "!=", rec.id),
-                    ("run_date", "<=", rec.run_date),
-                ],
-                order="run_date desc, id desc",
-                limit=20,
-            )
-            prev_z = prev_runs[:1].z_score if prev_runs else 0.0
-            prev2_z = prev_runs[1:2].z_score if len(prev_runs) > 1 else 0.0
-            rec.prev_z_score = prev_z
-            rec.prev2_z_score = prev2_z
-
-            result_values = [rec.result_value] + prev_runs.mapped("result_value")
-            if result_values:
-                avg = sum(result_values) / len(result_values)
-                rec.moving_avg_20 = avg
-                rec.moving_sd_20 = (
-                    (sum((v - avg) ** 2 for v in result_values) / len(result_values)) ** 0.5
-                    if len(result_values) > 1
-                    else 0.0
-                )
-            else:
-                rec.moving_avg_20 = 0.0
-                rec.moving_sd_20 = 0.0
-
-            reject_rules = []
-            warning_rules = []
-            enabled_rules = rec._material_rule_codes()
-
-            if "13s" in enabled_rules and abs_z > 3:
-                reject_rules.append("13s")
-            elif "12s" in enabled_rules and abs_z > 2:
-                warning_rules.append("12s")
-
-            if "22s" in enabled_rules and prev_runs and abs(prev_z) > 2 and abs_z > 2 and (prev_z * z) > 0:
-                reject_rules.append("22s")
+    def unlink(self):
+        materials = self.mapped("qc_material_id")
+        res = super().unlink()
+        materials.exists()._reevaluate_qc_history()
+        return res
 
-            if "R4s" in enabled_rules and prev_runs and (prev_z * z) < 0 and abs(prev_z - z) > 4:
-                reject_rules.append("R4s")
+    def _qc_key(self):
+        return (fields.Datetime.to_string(self.run_date), self.id)
 
-            seq_4 = [z] + prev_runs.mapped("z_score")[:3]
+    def _service_prior_z(self):
+        """Return the service z-series before this run, or None when newer runs exist."""
+        self.ensure_one()
+        rows = self.search_read(
+            [("service_id", "=", self.service_id.id), ("id", "!=", self.id)],
+            ["run_date", "z_score"],
+            order="run_date desc, id desc",
+            limit=QC_Z_HISTORY,
+        )
+        if rows and (fields.Datetime.to_string(rows[0]["run_date"]), rows[0]["id"]) > self._qc_key():
+            return None
+        return [row["z_score"] for row in reversed(rows)]
+
+    def _evaluate_qc(self):
+        """Evaluate new runs from the material rolling state.
+
+        Runs appended after the newest evaluated run are folded into the state
+        one by one; anything else (backdated entry, missing state, several
+        levels of a service entered together under cross-level rules) falls
+        back to a single sorted pass over the service history.
+        """
+        run_ids_by_material = {}
+        service_run_count = {}
+        for rec in self:
+            run_ids_by_material.setdefault(rec.qc_material_id, []).append(rec.id)
+            service_run_count[rec.service_id.id] = service_run_count.get(rec.service_id.id, 0) + 1
+        replay = self.env["lab.qc.material"]
+        for material, run_ids in run_ids_by_material.items():
+            runs = self.browse(run_ids).sorted(lambda r: r._qc_key())
+            state = QcRollingState.from_json(material.qc_state_json)
+            config = material._qc_rule_config()
+            cross_level = any(scope == "service" for _code, scope in config)
             if (
-                "41s" in enabled_rules
-                and len(seq_4) == 4
-                and all(abs(v) >= 1 for v in seq_4)
-                and (all(v > 0 for v in seq_4) or all(v < 0 for v in seq_4))
+                state is None
+                or not state.accepts(runs[0]._qc_key())
+                or (cross_level and service_run_count[material.service_id.id] > 1)
             ):
-                warning_rules.append("41s")
-
-            seq_10 = [z] + prev_runs.mapped("z_score")[:9]
-            if "10x" in enabled_rules and len(seq_10) == 10 and (all(v > 0 for v in seq_10) or all(v < 0 for v in seq_10)):
-                warning_rules.append("10x")
-
-            all_rules = reject_rules + warning_rules
-            rec.westgard_rule_count = len(all_rules)
-            rec.westgard_rules = ", ".join(all_rules) if all_rules else "in_control"
-            if reject_rules:
-                rec.status = "reject"
-                rec.rule_triggered = reject_rules[0]
-            elif warning_rules:
-                rec.status = "warning"
-                rec.rule_triggered = warning_rules[0]
+                replay |= material
+                continue
+            for run in runs:
+                service_z = None
+                if cross_level:
+                    service_z = run._service_prior_z()
+                    if service_z is None:
+                        replay |= material
+                        break
+                z = material._qc_z(run.result_value)
+                material_z = list(state.z_history) + [z]
+                rules = evaluate_rules(config, material_z, service_z + [z] if cross_level else None)
+                run.sudo().with_context(qc_engine_write=True).write(
+                    material._qc_run_values(state, run._qc_key(), run.result_value, rules)
+                )
             else:
-                rec.status = "pass"
-                rec.rule_triggered = "in_control"
+                material._store_qc_state(state)
+        replay._reevaluate_qc_history()
+        self.env["lab.qc.status"]._refresh_services(self.mapped("service_id").ids)
 
     @api.constrains("qc_material_id", "run_date")
     def _check_duplicate_timestamp(self):
-        for rec in self:
-            if not rec.qc_material_id or not rec.run_date:
-                continue
-            dup = self.search_count(
-                [
-                    ("id", "!=", rec.id),
-                    ("qc_material_id", "=", rec.qc_material_id.id),
-                    ("run_date", "=", rec.run_date),
-                ]
-            )
-            if dup:
-                raise ValidationError(_("A QC run already exists for this material at the same datetime."))
+        records = self.filtered(lambda r: r.qc_material_id and r.run_date)
+        if not records:
+            return
+        self.flush_model(["qc_material_id", "run_date"])
+        self.env.cr.execute(
+            """
+            SELECT 1
+              FROM lab_qc_run run
+              JOIN lab_qc_run other
+                ON other.qc_material_id = run.qc_material_id
+               AND other.run_date = run.run_date
+               AND other.id != run.id
+             WHERE run.id = ANY(%s)
+             LIMIT 1
+            """,
+            [records.ids],
+        )
+        if self.env.cr.fetchone():
+            raise ValidationError(_("A QC run already exists for this material at the same datetime."))
 
     def _auto_create_reject_nonconformance(self):
+        rejected = self.filtered(lambda r: r.status == "reject")
+        if not rejected:
+            return
         ncr_obj = self.env["lab.nonconformance"]
-        for rec in self:
-            if rec.status != "reject":
-                continue
-            exists = ncr_obj.search(
-                [
-                    ("qc_run_id", "=", rec.id),
-                    ("state", "in", ("draft", "open", "investigation", "capa")),
-                ],
-                limit=1,
-            )
-            if exists:
+        open_ncrs = ncr_obj.search(
+            [
+                ("qc_run_id", "in", rejected.ids),
+                ("state", "in", ("draft", "open", "investigation", "capa")),
+            ]
+        )
+        covered = set(open_ncrs.mapped("qc_run_id").ids)
+        vals_list = []
+        for rec in rejected:
+            if rec.id in covered:
                 continue
             title = _("QC Rejected: %s") % rec.service_id.name
             desc = _(
                 "QC run %(run)s was rejected by rule %(rule)s (z-score=%(z)s)."
             ) % {"run": rec.name, "rule": rec.rule_triggered or "-", "z": f"{rec.z_score:.2f}"}
-            ncr_obj.create(
+            vals_list.append(
                 {
                     "title": title,
                     "description": desc,
@@ -243,6 +584,90 @@ class LabQcRun(models.Model):
                     "state": "open",
                 }
             )
+        if vals_list:
+            ncr_obj.create(vals_list)
+
+    @api.model
+    def ingest_runs(self, entries):
+        """Create QC runs in bulk, e.g. when backfilling from analyzer logs.
+
+        Each entry holds ``material_code`` (or ``qc_material_id``), ``run_date``,
+        ``result`` (or ``result_value``) and an optional ``note``. Materials are
+        resolved and duplicates (within the batch or already stored) detected
+        with one query each; accepted runs are created sorted per material so
+        the rule engine folds them in a single pass. Invalid or duplicate entries
+        are reported instead of aborting the batch.
+        """
+        material_obj = self.env["lab.qc.material"]
+        codes = {str(entry.get("material_code")).strip() for entry in entries if entry.get("material_code")}
+        materials_by_code = {}
+        if codes:
+            for material in material_obj.search([("code", "in", list(codes))], order="id desc"):
+                materials_by_code[material.code] = material.id
+        ids = {int(entry["qc_material_id"]) for entry in entries if str(entry.get("qc_material_id") or "").isdigit()}
+        known_ids = set(material_obj.browse(list(ids)).exists().ids) if ids else set()
+
+        errors = []
+        candidates = []
+        for index, entry in enumerate(entries):
+            material_id = False
+            if str(entry.get("qc_material_id") or "").isdigit():
+                material_id = int(entry["qc_material_id"])
+                if material_id not in known_ids:
+                    material_id = False
+            elif entry.get("material_code"):
+                material_id = materials_by_code.get(str(entry["material_code"]).strip())
+            if not material_id:
+                errors.append({"index": index, "error": _("Unknown QC material.")})
+                continue
+            raw_value = entry.get("result", entry.get("result_value"))
+            try:
+                run_date = fields.Datetime.to_datetime(str(entry.get("run_date") or "").replace("T", " ")[:19])
+                result_value = float(raw_value)
+            except (TypeError, ValueError):
+                errors.append({"index": index, "error": _("Invalid run date or result value.")})
+                continue
+            if not run_date:
+                errors.append({"index": index, "error": _("Run date is required.")})
+                continue
+            candidates.append((material_id, run_date, index, result_value, entry.get("note") or False))
+
+        duplicates = []
+        if candidates:
+            self.flush_model(["qc_material_id", "run_date"])
+            self.env.cr.execute(
+                "SELECT qc_material_id, run_date FROM lab_qc_run WHERE qc_material_id = ANY(%s) AND run_date = ANY(%s)",
+                [list({c[0] for c in candidates}), list({c[1] for c in candidates})],
+            )
+            seen = set(self.env.cr.fetchall())
+            accepted = []
+            for candidate in sorted(candidates, key=lambda c: (c[0], c[1], c[2])):
+                key = (candidate[0], candidate[1])
+                if key in seen:
+                    duplicates.append(candidate[2])
+                    continue
+                seen.add(key)
+                accepted.append(candidate)
+            candidates = accepted
+
+        runs = self.create(
+            [
+                {
+                    "qc_material_id": material_id,
+                    "run_date": run_date,
+                    "result_value": result_value,
+                    "note": note,
+                }
+                for material_id, run_date, _index, result_value, note in candidates
+            ]
+        )
+        return {
+            "created": len(runs),
+            "run_ids": runs.ids,
+            "rejected": len(runs.filtered(lambda r: r.status == "reject")),
+            "duplicates": sorted(duplicates),
+            "errors": errors,
+        }
 
     def action_capture_trend_snapshot(self):
         self.env["lab.qc.daily.snapshot"].action_capture_from_runs(self)
@@ -263,14 +688,64 @@ class LabQcRuleLibrary(models.Model):
             ("R4s", "R4s"),
             ("41s", "41s"),
             ("10x", "10x"),
+            ("2of32s", "2 of 3 2s"),
+            ("31s", "31s"),
+            ("6x", "6x"),
+            ("8x", "8x"),
+            ("9x", "9x"),
+            ("12x", "12x"),
+            ("7T", "7T"),
         ],
         required=True,
     )
+    scope = fields.Selection(
+        [("material", "Within Control Level"), ("service", "Across Control Levels")],
+        default="material",
+        required=True,
+        help="Across control levels evaluates the rule on the combined series of every QC material of the service.",
+    )
     severity = fields.Selection([("warning", "Warning"), ("reject", "Reject")], required=True)
     description = fields.Text()
     active = fields.Boolean(default=True)
 
-    _rule_code_uniq = models.Constraint("unique(code)", "QC rule code must be unique.")
+    _rule_code_uniq = models.Constraint("unique(code, scope)", "QC rule code must be unique per scope.")
+
+    def _affected_materials(self, new=False):
+        """Materials whose rule set includes these rules; new rules only reach materials using the whole library."""
+        domain = [("rule_ids", "=", False)]
+        if not new:
+            domain = ["|", ("rule_ids", "in", self.ids)] + domain
+        return self.env["lab.qc.material"].sudo().with_context(active_test=False).search(domain)
+
+    @api.model
+    def _queue_qc_replay(self, materials):
+        """Flag ``materials`` for the background replay; one run covers every rule change of the transaction."""
+        if not materials:
+            return
+        materials.write({"qc_replay_pending": True})
+        cron = self.env.ref("laboratory_management.ir_cron_lab_qc_rule_replay", raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self._queue_qc_replay(records._affected_materials(new=True))
+        return records
+
+    def write(self, vals):
+        if not {"active", "code", "scope", "severity"} & set(vals):
+            return super().write(vals)
+        materials = self._affected_materials()
+        res = super().write(vals)
+        self._queue_qc_replay(materials)
+        return res
+
+    def unlink(self):
+        materials = self._affected_materials()
+        res = super().unlink()
+        self._queue_qc_replay(materials)
+        return res
 
 
 class LabQcDailySnapshot(models.Model):
@@ -303,39 +778,68 @@ class LabQcDailySnapshot(models.Model):
 
     @api.model
     def action_capture_from_runs(self, runs):
-        for run in runs:
-            day = fields.Date.to_date(run.run_date)
-            same_day = self.env["lab.qc.run"].search(
-                [
-                    ("qc_material_id", "=", run.qc_material_id.id),
-                    ("run_date", ">=", fields.Datetime.to_string(day)),
-                    ("run_date", "<", fields.Datetime.to_string(fields.Date.add(day, days=1))),
-                ]
+        """Rebuild the snapshots of every (material, day) touched by ``runs`` in one aggregate query."""
+        if not runs:
+            return
+        self.env["lab.qc.run"].flush_model(
+            ["qc_material_id", "service_id", "run_date", "status", "z_score", "analytical_sigma"]
+        )
+        self.env.cr.execute(
+            """
+            WITH touched AS (
+                SELECT DISTINCT qc_material_id, run_date::date AS day
+                  FROM lab_qc_run
+                 WHERE id = ANY(%s)
             )
-            z_values = same_day.mapped("z_score")
-            vals = {
+            SELECT t.qc_material_id,
+                   t.day,
+                   MIN(r.service_id),
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE r.status = 'pass'),
+                   COUNT(*) FILTER (WHERE r.status = 'warning'),
+                   COUNT(*) FILTER (WHERE r.status = 'reject'),
+                   AVG(COALESCE(r.z_score, 0.0)),
+                   MAX(ABS(COALESCE(r.z_score, 0.0))),
+                   AVG(COALESCE(r.analytical_sigma, 0.0))
+              FROM touched t
+              JOIN lab_qc_run r
+                ON r.qc_material_id = t.qc_material_id
+               AND r.run_date >= t.day
+               AND r.run_date < t.day + 1
+             GROUP BY t.qc_material_id, t.day
+            """,
+            [runs.ids],
+        )
+        vals_by_key = {}
+        for row in self.env.cr.fetchall():
+            material_id, day = row[0], row[1]
+            vals_by_key[(material_id, day)] = {
                 "snapshot_date": day,
-                "qc_material_id": run.qc_material_id.id,
-                "service_id": run.service_id.id,
-                "run_count": len(same_day),
-                "pass_count": len(same_day.filtered(lambda r: r.status == "pass")),
-                "warning_count": len(same_day.filtered(lambda r: r.status == "warning")),
-                "reject_count": len(same_day.filtered(lambda r: r.status == "reject")),
-                "mean_z": (sum(z_values) / len(z_values)) if z_values else 0.0,
-                "max_abs_z": max([abs(z) for z in z_values] or [0.0]),
-                "sigma_mean": (sum(same_day.mapped("analytical_sigma")) / len(same_day)) if same_day else 0.0,
+                "qc_material_id": material_id,
+                "service_id": row[2],
+                "run_count": row[3],
+                "pass_count": row[4],
+                "warning_count": row[5],
+                "reject_count": row[6],
+                "mean_z": row[7] or 0.0,
+                "max_abs_z": row[8] or 0.0,
+                "sigma_mean": row[9] or 0.0,
             }
-            existing = self.search(
-                [
-                    ("snapshot_date", "=", day),
-                    ("qc_material_id", "=", run.qc_material_id.id),
-                ],
-                limit=1,
-            )
-            if existing:
-                existing.write(vals)
-            else:
-                self.create(vals)
+        if not vals_by_key:
+            return
+        existing = self.search(
+            [
+                ("qc_material_id", "in", list({key[0] for key in vals_by_key})),
+                ("snapshot_date", "in", list({key[1] for key in vals_by_key})),
+            ],
+            order="id desc",
+        )
+        for snapshot in existing:
+            vals = vals_by_key.pop((snapshot.qc_material_id.id, snapshot.snapshot_date), None)
+            if vals:
+                snapshot.write(vals)
+        if vals_by_key:
+            self.create(list(vals_by_key.values()))
 
     @api.model
     def _cron_capture_recent_trends(self):
@@ -0,0 +1,281 @@
+"""Incremental Westgard evaluation helpers.
+
+``QcRollingState`` keeps what the rules need from a material's history: a
+windowed Welford mean/variance over recent results and a ring buffer of the
+recent z-scores. It is serialised on ``lab.qc.material`` so a new run is
+evaluated without reading previous runs back from the database.
+"""
+
+import json
+import math
+from collections import deque
+
+QC_VALUE_WINDOW = 20
+QC_Z_HISTORY = 20
+
+
+class QcRollingState:
+    __slots__ = ("values", "z_history", "count", "mean", "m2", "last_key")
+
+    def __init__(self, values=(), z_history=(), mean=0.0, m2=0.0, last_key=None):
+        self.values = deque(values)
+        self.z_history = deque(z_history, maxlen=QC_Z_HISTORY)
+        self.count = len(self.values)
+        self.mean = mean
+        self.m2 = m2
+        self.last_key = tuple(last_key) if last_key else None
+
+    @classmethod
+    def from_json(cls, payload):
+        if not payload:
+            return None
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return None
+        return cls(
+            values=data.get("values") or (),
+            z_history=data.get("z") or (),
+            mean=data.get("mean") or 0.0,
+            m2=data.get("m2") or 0.0,
+            last_key=data.get("last"),
+        )
+
+    def to_json(self):
+        return json.dumps(
+            {
+                "values": list(self.values),
+                "z": list(self.z_history),
+                "mean": self.mean,
+                "m2": self.m2,
+                "last": list(self.last_key) if self.last_key else None,
+            }
+        )
+
+    def accepts(self, key):
+        """True when ``key`` (run_date string, id) comes after every run already folded in."""
+        return self.last_key is None or tuple(key) > self.last_key
+
+    def recent_z(self, size):
+        """Return up to ``size`` previous z-scores, newest first."""
+        result = []
+        for value in reversed(self.z_history):
+            if len(result) >= size:
+                break
+            result.append(value)
+        return result
+
+    def _add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value):
+        self.count -= 1
+        if self.count <= 0:
+            self.count = 0
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+
+    def push(self, key, value, z):
+        """Fold a run in and return ``(mean, sd)`` over it plus the previous window."""
+        self.values.append(value)
+        self._add(value)
+        mean = self.mean
+        sd = (max(self.m2, 0.0) / self.count) ** 0.5 if self.count > 1 else 0.0
+        if len(self.values) > QC_VALUE_WINDOW:
+            self._remove(self.values.popleft())
+        self.z_history.append(z)
+        self.last_key = tuple(key)
+        return mean, sd
+
+
+def series_stats(values):
+    """Return ``(mean, population sd)`` of ``values`` in two passes."""
+    count = len(values)
+    if not count:
+        return 0.0, 0.0
+    mean = math.fsum(values) / count
+    if count == 1:
+        return mean, 0.0
+    return mean, math.sqrt(math.fsum((value - mean) ** 2 for value in values) / count)
+
+
+def downsample_lttb(xs, ys, threshold):
+    """Return the indices kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket, so peaks and rule violations survive.
+    """
+    size = len(xs)
+    if threshold >= size or threshold < 3:
+        return list(range(size))
+    kept = [0]
+    bucket = (size - 2) / (threshold - 2)
+    previous = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket) + 1
+        end = int((i + 1) * bucket) + 1
+        next_start = end
+        next_end = min(int((i + 2) * bucket) + 1, size)
+        if next_start >= next_end:
+            next_start, next_end = size - 1, size
+        avg_x = math.fsum(xs[next_start:next_end]) / (next_end - next_start)
+        avg_y = math.fsum(ys[next_start:next_end]) / (next_end - next_start)
+        px, py = xs[previous], ys[previous]
+        best = start
+        best_area = -1.0
+        for j in range(start, end):
+            area = abs((px - avg_x) * (ys[j] - py) - (px - xs[j]) * (avg_y - py))
+            if area > best_area:
+                best_area = area
+                best = j
+        kept.append(best)
+        previous = best
+    kept.append(size - 1)
+    return kept
+
+
+# Rule specs: ("beyond", limit, hits, window, inclusive) fires when the current
+# point and at least ``hits`` of the last ``window`` points sit beyond ``limit``
+# SD on the same side; ("range", limit) when two consecutive points straddle
+# the mean more than ``limit`` SD apart; ("side", n) for n consecutive points on
+# one side of the mean; ("trend", n) for n consecutive rising or falling points.
+QC_RULE_SPECS = {
+    "13s": ("beyond", 3.0, 1, 1, False),
+    "12s": ("beyond", 2.0, 1, 1, False),
+    "22s": ("beyond", 2.0, 2, 2, False),
+    "R4s": ("range", 4.0),
+    "2of32s": ("beyond", 2.0, 2, 3, False),
+    "31s": ("beyond", 1.0, 3, 3, False),
+    "41s": ("beyond", 1.0, 4, 4, True),
+    "6x": ("side", 6),
+    "8x": ("side", 8),
+    "9x": ("side", 9),
+    "10x": ("side", 10),
+    "12x": ("side", 12),
+    "7T": ("trend", 7),
+}
+QC_RULE_ORDER = tuple(QC_RULE_SPECS)
+
+
+def _scan_beyond(z, limit, hits, window, inclusive):
+    size = len(z)
+    flags = bytearray(size)
+    if inclusive:
+        high = [1 if v >= limit else 0 for v in z]
+        low = [1 if v <= -limit else 0 for v in z]
+    else:
+        high = [1 if v > limit else 0 for v in z]
+        low = [1 if v < -limit else 0 for v in z]
+    sum_high = sum_low = 0
+    for i in range(size):
+        sum_high += high[i]
+        sum_low += low[i]
+        if i >= window:
+            sum_high -= high[i - window]
+            sum_low -= low[i - window]
+        if (high[i] and sum_high >= hits) or (low[i] and sum_low >= hits):
+            flags[i] = 1
+    return flags
+
+
+def _scan_range(z, limit):
+    flags = bytearray(len(z))
+    for i in range(1, len(z)):
+        if z[i] * z[i - 1] < 0 and abs(z[i] - z[i - 1]) > limit:
+            flags[i] = 1
+    return flags
+
+
+def _scan_side(z, length):
+    flags = bytearray(len(z))
+    run = 0
+    sign = 0
+    for i, v in enumerate(z):
+        current = 1 if v > 0 else (-1 if v < 0 else 0)
+        run = run + 1 if current and current == sign else (1 if current else 0)
+        sign = current
+        if run >= length:
+            flags[i] = 1
+    return flags
+
+
+def _scan_trend(z, length):
+    flags = bytearray(len(z))
+    rising = falling = 1
+    for i in range(1, len(z)):
+        rising = rising + 1 if z[i] > z[i - 1] else 1
+        falling = falling + 1 if z[i] < z[i - 1] else 1
+        if rising >= length or falling >= length:
+            flags[i] = 1
+    return flags
+
+
+def scan_rule(code, z):
+    """Return a flag per point of the oldest-first z-series ``z`` for rule ``code``."""
+    spec = QC_RULE_SPECS[code]
+    kind = spec[0]
+    if kind == "beyond":
+        return _scan_beyond(z, *spec[1:])
+    if kind == "range":
+        return _scan_range(z, spec[1])
+    if kind == "side":
+        return _scan_side(z, spec[1])
+    return _scan_trend(z, spec[1])
+
+
+def rule_window(code):
+    """Number of points (current included) a rule looks at."""
+    spec = QC_RULE_SPECS[code]
+    if spec[0] == "beyond":
+        return spec[3]
+    if spec[0] == "range":
+        return 2
+    return spec[1]
+
+
+def classify_rules(fired, rule_config):
+    """Split fired rules into reject and warning labels in library order.
+
+    ``fired`` is a set of ``(code, scope)``; ``rule_config`` maps ``(code, scope)``
+    to the library severity. Single-point 12s is not reported next to 13s.
+    """
+    reject_rules = []
+    warning_rules = []
+    for code in QC_RULE_ORDER:
+        for scope in ("material", "service"):
+            if (code, scope) not in fired:
+                continue
+            if code == "12s" and ("13s", scope) in fired:
+                continue
+            label = code if scope == "material" else "%s (levels)" % code
+            if rule_config[(code, scope)] == "reject":
+                reject_rules.append(label)
+            else:
+                warning_rules.append(label)
+    return reject_rules, warning_rules
+
+
+def evaluate_rules(rule_config, material_z, service_z=None):
+    """Evaluate the latest point of oldest-first z-series against enabled rules.
+
+    ``material_z`` is the run's own material history, ``service_z`` the
+    history across every control level of the service (both ending with the
+    current run). Returns ``(reject_rules, warning_rules)``.
+    """
+    fired = set()
+    for (code, scope) in rule_config:
+        series = material_z if scope == "material" else service_z
+        if not series:
+            continue
+        window = series[-max(rule_window(code), 2) :]
+        if scan_rule(code, window)[-1]:
+            fired.add((code, scope))
+    return classify_rules(fired, rule_config)
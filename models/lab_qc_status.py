@@ -0,0 +1,140 @@
+from odoo import api, fields, models
+
+
+class LabQcStatus(models.Model):
+    _name = "lab.qc.status"
+    _description = "Current QC Status"
+    _order = "service_id, instrument_id"
+
+    service_id = fields.Many2one("lab.service", required=True, ondelete="cascade", index=True, readonly=True)
+    instrument_id = fields.Many2one(
+        "lab.instrument",
+        ondelete="cascade",
+        index=True,
+        readonly=True,
+        help="Empty for the service-wide status across every QC material.",
+    )
+    run_id = fields.Many2one("lab.qc.run", string="Latest QC Run", ondelete="set null", readonly=True)
+    run_date = fields.Datetime(readonly=True)
+    status = fields.Selection(
+        [("pass", "Pass"), ("warning", "Warning"), ("reject", "Reject")],
+        readonly=True,
+    )
+    rule_triggered = fields.Char(readonly=True)
+    locked = fields.Boolean(
+        string="QC Lockout",
+        readonly=True,
+        index=True,
+        help="Set while the latest QC run is rejected; result entry for QC-required services is blocked.",
+    )
+
+    _service_instrument_uniq = models.Constraint(
+        "unique(service_id, instrument_id)",
+        "Only one current QC status per service and instrument.",
+    )
+    # NULLs are distinct in the constraint above, so the service-wide rows need their own index.
+    _service_wide_uniq = models.UniqueIndex(
+        "(service_id) WHERE instrument_id IS NULL",
+        "Only one service-wide QC status per service.",
+    )
+
+    @api.model
+    def _refresh_all(self):
+        """Rebuild the rows of every service with QC history, e.g. after an upgrade."""
+        self.env.cr.execute("SELECT DISTINCT service_id FROM lab_qc_run WHERE service_id IS NOT NULL")
+        service_ids = [row[0] for row in self.env.cr.fetchall()]
+        for start in range(0, len(service_ids), 1000):
+            self._refresh_services(service_ids[start:start + 1000])
+
+    @api.model
+    def _refresh_services(self, service_ids):
+        """Recompute the current status rows of ``service_ids`` from lab_qc_run."""
+        service_ids = [sid for sid in set(service_ids) if sid]
+        if not service_ids:
+            return
+        self.env["lab.qc.run"].flush_model(["service_id", "instrument_id", "run_date", "status", "rule_triggered"])
+        self.env.cr.execute(
+            """
+            SELECT DISTINCT ON (service_id) service_id, NULL, id, run_date, status, rule_triggered
+              FROM lab_qc_run
+             WHERE service_id = ANY(%s)
+             ORDER BY service_id, run_date DESC, id DESC
+            """,
+            [service_ids],
+        )
+        latest = {(row[0], False): row[2:] for row in self.env.cr.fetchall()}
+        self.env.cr.execute(
+            """
+            SELECT DISTINCT ON (service_id, instrument_id) service_id, instrument_id, id, run_date, status, rule_triggered
+              FROM lab_qc_run
+             WHERE service_id = ANY(%s) AND instrument_id IS NOT NULL
+             ORDER BY service_id, instrument_id, run_date DESC, id DESC
+            """,
+            [service_ids],
+        )
+        latest.update({(row[0], row[1]): row[2:] for row in self.env.cr.fetchall()})
+
+        current = self.sudo().search([("service_id", "in", service_ids)])
+        stale = current.browse()
+        for rec in current:
+            key = (rec.service_id.id, rec.instrument_id.id or False)
+            values = latest.pop(key, None)
+            if values is None:
+                stale |= rec
+                continue
+            vals = self._status_vals(values)
+            if (rec.run_id.id, rec.run_date, rec.status, rec.rule_triggered, rec.locked) != (
+                vals["run_id"],
+                vals["run_date"],
+                vals["status"],
+                vals["rule_triggered"],
+                vals["locked"],
+            ):
+                rec.write(vals)
+        stale.unlink()
+        if latest:
+            self.sudo().create(
+                [
+                    dict(self._status_vals(values), service_id=service_id, instrument_id=instrument_id)
+                    for (service_id, instrument_id), values in latest.items()
+                ]
+            )
+
+    @api.model
+    def _status_vals(self, values):
+        run_id, run_date, status, rule_triggered = values
+        return {
+            "run_id": run_id or False,
+            "run_date": run_date or False,
+            "status": status or False,
+            "rule_triggered": rule_triggered or False,
+            "locked": status == "reject",
+        }
+
+    @api.model
+    def _latest_runs(self, service_ids):
+        """Return ``{service_id: lab.qc.run}`` from the maintained service-wide rows.
+
+        Read-only: rows are maintained by QC run and material changes and
+        backfilled on upgrade, so this is safe to call from computes.
+        """
+        service_ids = [sid for sid in set(service_ids) if sid]
+        if not service_ids:
+            return {}
+        domain = [("service_id", "in", service_ids), ("instrument_id", "=", False)]
+        rows = self.sudo().search_read(domain, ["service_id", "run_id"])
+        run_obj = self.env["lab.qc.run"]
+        return {row["service_id"][0]: run_obj.browse(row["run_id"][0]) for row in rows if row["run_id"]}
+
+    @api.model
+    def _locked_service_ids(self, service_ids):
+        rows = self.sudo().search_read(
+            [
+                ("service_id", "in", list(set(service_ids))),
+                ("instrument_id", "=", False),
+                ("locked", "=", True),
+                ("run_id", "!=", False),
+            ],
+            ["service_id"],
+        )
+        return {row["service_id"][0] for row in rows}
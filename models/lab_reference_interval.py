@@ -0,0 +1,176 @@
+from bisect import bisect_right
+
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+
+
+class ReferenceIntervalIndex:
+    """In-memory reference interval lookup for one service.
+
+    Intervals are bucketed by ``(sex, specimen)`` and sorted by lower age bound,
+    so a lookup is a handful of dictionary hits plus a bisect per bucket. The
+    most specific bucket wins; the service-level bounds are the fallback.
+    """
+
+    __slots__ = ("fallback", "buckets")
+
+    def __init__(self, fallback, intervals):
+        self.fallback = fallback
+        buckets = {}
+        for row in sorted(intervals, key=lambda r: (r["age_min"], r["sequence"], r["id"])):
+            key = (row["gender"], row["specimen"] or False)
+            age_mins, rows = buckets.setdefault(key, ([], []))
+            age_mins.append(row["age_min"])
+            rows.append(row)
+        self.buckets = {key: (tuple(age_mins), tuple(rows)) for key, (age_mins, rows) in buckets.items()}
+
+    def lookup(self, sex, age, specimen):
+        sex = sex if sex in ("male", "female") else "any"
+        keys = [(sex, specimen or False), (sex, False), ("any", specimen or False), ("any", False)]
+        for key in dict.fromkeys(keys):
+            bucket = self.buckets.get(key)
+            if not bucket:
+                continue
+            age_mins, rows = bucket
+            if age is None:
+                match = next((r for r in rows if not r["age_min"] and not r["age_max"]), None)
+                if match:
+                    return match
+                continue
+            for row in reversed(rows[: bisect_right(age_mins, age)]):
+                if not row["age_max"] or age < row["age_max"]:
+                    return row
+        return self.fallback
+
+
+class LabServiceReferenceInterval(models.Model):
+    _name = "lab.service.reference.interval"
+    _description = "Service Reference Interval"
+    _inherit = ["lab.master.data.mixin"]
+    _order = "service_id, sequence, age_min, id"
+
+    sequence = fields.Integer(default=10)
+    active = fields.Boolean(default=True)
+    service_id = fields.Many2one("lab.service", required=True, ondelete="cascade", index=True)
+    gender = fields.Selection(
+        [("any", "Any"), ("male", "Male"), ("female", "Female")],
+        default="any",
+        required=True,
+    )
+    age_min = fields.Float(string="Age From (Years)", default=0.0, help="Inclusive lower age bound.")
+    age_max = fields.Float(string="Age To (Years)", default=0.0, help="Exclusive upper age bound. 0 means no limit.")
+    specimen_sample_type = fields.Selection(
+        selection="_selection_sample_type",
+        string="Specimen",
+        help="Leave empty to apply to every specimen.",
+    )
+    ref_min = fields.Float(string="Reference Min")
+    ref_max = fields.Float(string="Reference Max")
+    critical_min = fields.Float(string="Critical Min")
+    critical_max = fields.Float(string="Critical Max")
+    note = fields.Char()
+
+    @api.constrains("age_min", "age_max", "ref_min", "ref_max")
+    def _check_bounds(self):
+        for rec in self:
+            if rec.age_min < 0 or rec.age_max < 0:
+                raise ValidationError(_("Reference interval age bounds must be non-negative."))
+            if rec.age_max and rec.age_max <= rec.age_min:
+                raise ValidationError(_("Reference interval upper age must be greater than lower age."))
+            if rec.ref_max < rec.ref_min:
+                raise ValidationError(_("Reference max must be greater than or equal to reference min."))
+
+    @api.depends("service_id", "gender", "age_min", "age_max", "specimen_sample_type")
+    def _compute_display_name(self):
+        gender_labels = dict(self._fields["gender"].selection)
+        for rec in self:
+            age = "%g-%s" % (rec.age_min, ("%g" % rec.age_max) if rec.age_max else "+")
+            rec.display_name = "%s [%s, %s, %s]" % (
+                rec.service_id.name or "",
+                gender_labels.get(rec.gender, rec.gender),
+                age,
+                rec.specimen_sample_type or _("any specimen"),
+            )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.mapped("service_id")._bump_rule_revision()
+        return records
+
+    def write(self, vals):
+        services = self.mapped("service_id")
+        res = super().write(vals)
+        (services | self.mapped("service_id"))._bump_rule_revision()
+        return res
+
+    def unlink(self):
+        services = self.mapped("service_id")
+        res = super().unlink()
+        services.exists()._bump_rule_revision()
+        return res
+
+    @api.model
+    def _build_index(self, service, intervals):
+        fallback = {
+            "id": False,
+            "ref_min": service.ref_min,
+            "ref_max": service.ref_max,
+            "critical_min": service.critical_min,
+            "critical_max": service.critical_max,
+        }
+        rows = [
+            {
+                "id": rec.id,
+                "sequence": rec.sequence,
+                "gender": rec.gender,
+                "age_min": rec.age_min,
+                "age_max": rec.age_max,
+                "specimen": rec.specimen_sample_type,
+                "ref_min": rec.ref_min,
+                "ref_max": rec.ref_max,
+                # An empty critical bound (stored as 0.0) keeps the service's limit.
+                "critical_min": rec.critical_min or service.critical_min,
+                "critical_max": rec.critical_max or service.critical_max,
+            }
+            for rec in intervals
+        ]
+        return ReferenceIntervalIndex(fallback, rows)
+
+
+def flag_results(values, bounds, binary_rules):
+    """Flag a batch of parsed results in plain Python, one pass over the values.
+
+    ``values`` holds floats (or None for empty / non-numeric results),
+    ``bounds`` the matching ``(ref_min, ref_max, critical_min, critical_max)``
+    tuples and ``binary_rules`` ``(cutoff, negative_when_gte)`` or None.
+    Returns four parallel lists: flag, binary interpretation, out-of-range
+    and critical.
+    """
+    size = len(values)
+    flags = ["normal"] * size
+    binary = [False] * size
+    out_of_range = [False] * size
+    critical = [False] * size
+    for i, num in enumerate(values):
+        if num is None:
+            continue
+        ref_min, ref_max, critical_min, critical_max = bounds[i]
+        if num < ref_min:
+            flags[i] = "low"
+            out_of_range[i] = True
+        elif num > ref_max:
+            flags[i] = "high"
+            out_of_range[i] = True
+        if critical_min not in (False, None) and num < critical_min:
+            critical[i] = True
+        if critical_max not in (False, None) and num > critical_max:
+            critical[i] = True
+        rule = binary_rules[i]
+        if rule:
+            cutoff, negative_when_gte = rule
+            if negative_when_gte:
+                binary[i] = "negative" if num >= cutoff else "positive"
+            else:
+                binary[i] = "positive" if num >= cutoff else "negative"
+    return flags, binary, out_of_range, critical
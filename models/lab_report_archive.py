@@ -0,0 +1,210 @@
+"""Portal report archives.
+
+ZIP packages are streamed straight from the cached report attachments: PDFs
+are already compressed, so entries are stored as-is and the archive is
+written through a small sink that hands every produced chunk to the HTTP
+response instead of buffering the whole file. Selections with reports that
+are not cached yet are prepared by a background job first.
+"""
+
+import io
+import threading
+import time
+import zipfile
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+
+ARCHIVE_READ_CHUNK = 1024 * 1024
+ARCHIVE_RETENTION_DAYS = 7
+
+
+class _ZipChunkSink:
+    """Write-only, non-seekable file object collecting what zipfile produces."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip_stream(entries):
+    """Yield a ZIP archive of ``entries`` chunk by chunk.
+
+    ``entries`` are ``(name, path, content, size)`` tuples: the member is read
+    from ``path`` on disk when set, otherwise ``content`` holds its bytes. The
+    iterator only touches the filesystem, so it can outlive the request cursor.
+    """
+    sink = _ZipChunkSink()
+    date_time = time.localtime(time.time())[:6]
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+        for name, path, content, size in entries:
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.compress_type = zipfile.ZIP_STORED
+            info.file_size = size or 0
+            source = open(path, "rb") if path else io.BytesIO(content or b"")  # noqa: SIM115
+            with source, archive.open(info, "w", force_zip64=not size) as member:
+                while True:
+                    block = source.read(ARCHIVE_READ_CHUNK)
+                    if not block:
+                        break
+                    member.write(block)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+class LabReportArchive(models.Model):
+    _name = "lab.report.archive"
+    _description = "Portal Report Archive"
+    _inherit = ["mail.thread"]
+    _order = "id desc"
+
+    name = fields.Char(required=True, default=lambda self: _("Lab Reports %s") % fields.Date.today())
+    user_id = fields.Many2one("res.users", required=True, index=True, ondelete="cascade", readonly=True)
+    sample_ids = fields.Many2many(
+        "lab.sample",
+        "lab_report_archive_sample_rel",
+        "archive_id",
+        "sample_id",
+        string="Samples",
+        readonly=True,
+    )
+    state = fields.Selection(
+        [("queued", "Queued"), ("running", "Running"), ("ready", "Ready"), ("failed", "Failed")],
+        default="queued",
+        required=True,
+        index=True,
+        readonly=True,
+    )
+    ready_at = fields.Datetime(readonly=True)
+    missing_count = fields.Integer(readonly=True, help="Samples whose report PDF could not be rendered.")
+    error_message = fields.Text(readonly=True)
+
+    @api.model
+    def _zip_entries(self, samples):
+        """Return stream entries for the cached report PDFs of ``samples``."""
+        entries = []
+        used_names = set()
+        for sample in samples.sudo():
+            attachment = sample.report_pdf_attachment_id
+            if not attachment:
+                continue
+            name = "%s.pdf" % sample.name
+            if name in used_names:
+                name = "%s-%s.pdf" % (sample.name, sample.id)
+            used_names.add(name)
+            if attachment.store_fname:
+                entries.append((name, attachment._full_path(attachment.store_fname), None, attachment.file_size))
+            else:
+                entries.append((name, None, attachment.raw or b"", attachment.file_size))
+        return entries
+
+    @api.model
+    def _queue_for_user(self, samples):
+        """Return the current user's archive of ``samples``, queueing one if none is pending or ready.
+
+        Repeated clicks on the same selection reuse the archive instead of
+        rendering and storing it again. A ready archive is only reused while
+        every sample still has its report PDF; otherwise a new run renders
+        the missing ones.
+        """
+        states = ["queued", "running"]
+        if not samples.sudo().filtered(lambda s: not s.report_pdf_attachment_id):
+            states.append("ready")
+        candidates = self.sudo().search(
+            [
+                ("user_id", "=", self.env.user.id),
+                ("state", "in", states),
+                ("sample_ids", "in", samples.ids),
+            ],
+            order="id desc",
+        )
+        archive = candidates.filtered(lambda a: a.sample_ids == samples.sudo())[:1]
+        if archive:
+            return archive
+        archive = self.sudo().create({"user_id": self.env.user.id, "sample_ids": [(6, 0, samples.ids)]})
+        cron = self.env.ref("laboratory_management.ir_cron_lab_report_archive_prepare", raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return archive
+
+    @api.model
+    def _retention_days(self):
+        value = self.env["ir.config_parameter"].sudo().get_param(
+            "laboratory_management.report_archive_retention_days", ARCHIVE_RETENTION_DAYS
+        )
+        try:
+            return max(int(value), 1)
+        except (TypeError, ValueError):
+            return ARCHIVE_RETENTION_DAYS
+
+    @api.model
+    def _cron_purge_archives(self):
+        """Delete finished archives older than ``report_archive_retention_days``."""
+        cutoff = fields.Datetime.now() - timedelta(days=self._retention_days())
+        self.sudo().search([("state", "in", ("ready", "failed")), ("create_date", "<", cutoff)]).unlink()
+        return True
+
+    def _download_url(self):
+        self.ensure_one()
+        return "/my/lab/samples/reports/zip/%s" % self.id
+
+    @api.model
+    def _cron_prepare_archives(self, limit=20):
+        archives = self.sudo().search([("state", "=", "queued")], order="id asc", limit=limit)
+        for archive in archives:
+            archive.write({"state": "running"})
+            try:
+                with self.env.cr.savepoint():
+                    samples = archive.sample_ids
+                    samples._generate_report_pdf_attachments(force=False, suppress_error=True)
+                    missing = samples.filtered(lambda s: not s.report_pdf_attachment_id)
+                    archive.write(
+                        {
+                            "state": "ready",
+                            "ready_at": fields.Datetime.now(),
+                            "missing_count": len(missing),
+                            "error_message": (
+                                _("Report PDF unavailable for: %s") % ", ".join(missing.mapped("name"))
+                                if missing
+                                else False
+                            ),
+                        }
+                    )
+                    archive._notify_ready()
+            except Exception as err:  # noqa: BLE001
+                archive.write({"state": "failed", "error_message": str(err)})
+            if not getattr(threading.current_thread(), "testing", False):
+                self.env.cr.commit()
+        return True
+
+    def _notify_ready(self):
+        self.ensure_one()
+        base_url = self.get_base_url().rstrip("/")
+        self.message_post(
+            body=_("Your report archive is ready: %(url)s") % {"url": base_url + self._download_url()},
+            partner_ids=self.user_id.partner_id.ids,
+            subtype_xmlid="mail.mt_comment",
+        )
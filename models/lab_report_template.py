@@ -36,22 +36,15 @@ class LabReportTemplate(models.Model):
     )
     ai_user_prompt_template = fields.Text(
         string="AI User Prompt Template",
+        help="Identifying placeholders ({sample_name}, {accession}, {patient_name}, {client_name}, "
+        "{physician_name}, the dates and {report_snapshot}) are sent to the AI provider and make every "
+        "prompt unique, so answers are never reused from the response cache.",
         default=(
-            "Sample: {sample_name}\n"
-            "Patient: {patient_name}\n"
-            "Client: {client_name}\n"
-            "Physician: {physician_name}\n"
             "Template: {report_template}\n"
             "Priority: {priority}\n"
-            "State: {state}\n"
-            "Collection Date: {collection_date}\n"
-            "Verified Date: {verified_date}\n"
-            "Report Date: {report_date}\n"
             "Sample Note: {sample_note}\n"
             "Amendment Note: {amendment_note}\n"
             "\n"
-            "Report Snapshot:\n{report_snapshot}\n"
-            "\n"
             "Analysis Results:\n{analysis_lines}\n"
             "\n"
             "Abnormal Items:\n{abnormal_lines}\n"
@@ -68,3 +61,8 @@ class LabReportTemplate(models.Model):
         string="AI Temperature",
         default=0.2,
     )
+    ai_cache_enabled = fields.Boolean(
+        string="Reuse Cached AI Answers",
+        default=True,
+        help="Serve identical prompts from the AI response cache instead of calling the provider again.",
+    )
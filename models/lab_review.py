@@ -15,6 +15,7 @@ class LabReviewReasonTemplate(models.Model):
             ("out_of_range", "Out of Reference Range"),
             ("qc_not_passed", "QC Not Passed"),
             ("delta_fail", "Delta Check Failed"),
+            ("rule_hold", "Auto-Verification Rule Hold"),
         ],
         required=True,
     )
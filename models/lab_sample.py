@@ -1,10 +1,17 @@
 import base64
+import logging
+import threading
 from datetime import datetime, time, timedelta
 from uuid import uuid4
 
 from odoo import _, api, fields, models
 from odoo.exceptions import UserError, ValidationError
 
+from .lab_auto_verify import critical_bounds
+from .lab_reference_interval import flag_results
+
+_logger = logging.getLogger(__name__)
+
 
 class LabSample(models.Model):
     _name = "lab.sample"
@@ -58,8 +65,33 @@ class LabSample(models.Model):
         tracking=True,
         index=True,
     )
+    specimen_sample_type = fields.Selection(
+        selection="_selection_sample_type",
+        string="Specimen Type",
+        help="Specimen collected for this accession; selects specimen-specific reference intervals.",
+    )
     report_pdf_attachment_id = fields.Many2one("ir.attachment", string="Cached Report PDF", readonly=True, copy=False)
     report_pdf_cached_at = fields.Datetime(string="Report PDF Cached At", readonly=True, copy=False)
+    release_followup_pending = fields.Boolean(
+        string="Release Follow-up Pending",
+        readonly=True,
+        copy=False,
+        index=True,
+        help="Set by bulk release: PDF rendering, dispatches and outbound messages are still queued for the background worker.",
+    )
+    release_followup_error = fields.Text(
+        string="Release Follow-up Error",
+        readonly=True,
+        copy=False,
+        help="Why the background worker could not finish the release follow-ups of this sample.",
+    )
+    release_followup_user_id = fields.Many2one(
+        "res.users",
+        string="Released By",
+        readonly=True,
+        copy=False,
+        help="Reviewer whose bulk release queued the follow-ups; the background worker acts as this user.",
+    )
 
     analysis_ids = fields.One2many("lab.sample.analysis", "sample_id", string="Analyses")
     amendment_ids = fields.One2many("lab.sample.amendment", "sample_id", string="Amendments", readonly=True)
@@ -367,23 +399,132 @@ class LabSample(models.Model):
         for rec in self:
             if rec.state != "verified":
                 raise UserError(_("Only verified samples can be released."))
-            rec.write(
-                {
-                    "state": "reported",
-                    "report_date": fields.Datetime.now(),
-                    "report_pdf_attachment_id": False,
-                    "report_pdf_cached_at": False,
-                }
-            )
+        self.write(
+            {
+                "state": "reported",
+                "report_date": fields.Datetime.now(),
+                "report_pdf_attachment_id": False,
+                "report_pdf_cached_at": False,
+            }
+        )
+        for rec in self:
             rec._log_timeline("reported", _("Report released"))
             rec._create_custody_event("release", False, rec.custody_location, _("Report released to requester"))
             rec._create_signoff("release", _("Report released"))
-            cache_on_release = (
-                self.env["ir.config_parameter"].sudo().get_param("laboratory_management.report_pdf_cache_on_release", "1")
-                == "1"
+        if self._defer_release_followups():
+            self.write({"release_followup_pending": True, "release_followup_user_id": self.env.uid})
+            cron = self.env.ref("laboratory_management.ir_cron_lab_sample_release_followups", raise_if_not_found=False)
+            if cron:
+                cron.sudo()._trigger()
+        else:
+            self._render_release_pdfs()
+
+    def action_release_report_bulk(self):
+        """Release reports and leave PDFs, dispatches and outbound messages to the background worker.
+
+        Samples blocked by a release gate are skipped and listed; the others
+        are released.
+        """
+        deferred = self.with_context(defer_release_followups=True)
+        try:
+            with self.env.cr.savepoint():
+                deferred.action_release_report()
+            return True
+        except UserError:
+            self.env.invalidate_all()
+        blocked = []
+        for rec in deferred:
+            try:
+                with self.env.cr.savepoint():
+                    rec.action_release_report()
+            except UserError as error:
+                self.env.invalidate_all()
+                blocked.append("%s: %s" % (rec.name, error.args[0]))
+        if len(blocked) == len(self):
+            raise UserError(_("No report was released:\n- %s") % "\n- ".join(blocked))
+        return {
+            "type": "ir.actions.client",
+            "tag": "display_notification",
+            "params": {
+                "title": _("Release Reports"),
+                "message": _("Released %(released)s report(s); %(blocked)s blocked:\n- %(reasons)s")
+                % {"released": len(self) - len(blocked), "blocked": len(blocked), "reasons": "\n- ".join(blocked)},
+                "sticky": True,
+                "type": "warning",
+            },
+        }
+
+    def _defer_release_followups(self):
+        return bool(self.env.context.get("defer_release_followups"))
+
+    def _render_release_pdfs(self):
+        cache_on_release = (
+            self.env["ir.config_parameter"].sudo().get_param("laboratory_management.report_pdf_cache_on_release", "1")
+            == "1"
+        )
+        if cache_on_release:
+            self._generate_report_pdf_attachments(force=True, suppress_error=True)
+
+    def _run_release_followups(self):
+        """Post-release work deferred by bulk release; modules extend it with their own steps."""
+        self._render_release_pdfs()
+
+    @api.model
+    def _release_followup_domain(self):
+        """Samples whose deferred follow-ups are still due: released and not taken back since."""
+        return [("release_followup_pending", "=", True), ("state", "=", "reported")]
+
+    def _as_release_user(self):
+        """These samples in the environment of the reviewer who released them."""
+        self.ensure_one()
+        user = self.release_followup_user_id or self.env.user
+        return self.with_user(user).with_company(self.company_id or user.company_id)
+
+    @api.model
+    def _cron_process_release_followups(self, limit=None):
+        batch_size = limit or int(
+            self.env["ir.config_parameter"].sudo().get_param("laboratory_management.release_followup_batch_size", "50")
+            or 50
+        )
+        while True:
+            samples = self.search(self._release_followup_domain(), order="report_date asc, id asc", limit=batch_size)
+            if not samples:
+                break
+            groups = {}
+            for sample in samples:
+                groups.setdefault((sample.release_followup_user_id, sample.company_id), self.browse())
+                groups[(sample.release_followup_user_id, sample.company_id)] |= sample
+            for group in groups.values():
+                try:
+                    with self.env.cr.savepoint():
+                        group[:1]._as_release_user().browse(group.ids)._run_release_followups()
+                        group.write({"release_followup_pending": False, "release_followup_error": False})
+                except Exception:
+                    # One broken sample must not hold back the batch: retry one by one.
+                    self.env.invalidate_all()
+                    for sample in group:
+                        sample._run_release_followups_isolated()
+            if getattr(threading.current_thread(), "testing", False):
+                break
+            self.env.cr.commit()
+            self.env.invalidate_all()
+        return True
+
+    def _run_release_followups_isolated(self):
+        self.ensure_one()
+        try:
+            with self.env.cr.savepoint():
+                self._as_release_user()._run_release_followups()
+                self.write({"release_followup_pending": False, "release_followup_error": False})
+        except Exception as error:
+            _logger.exception("Release follow-ups failed for sample %s", self.name)
+            self.env.invalidate_all()
+            self.write(
+                {
+                    "release_followup_pending": False,
+                    "release_followup_error": "%s: %s" % (type(error).__name__, error),
+                }
             )
-            if cache_on_release:
-                rec._generate_report_pdf_attachment(force=True, suppress_error=True)
 
     def action_print_report(self):
         self.ensure_one()
@@ -565,33 +706,78 @@ class LabSample(models.Model):
             action_xmlid = self.get_report_action_xmlid()
             action = self.env.ref(action_xmlid).sudo()
             pdf_content, _content_type = action._render_qweb_pdf(action.report_name, res_ids=self.ids)
-            filename = self._build_report_pdf_filename()
-            vals = {
-                "name": filename,
-                "type": "binary",
-                "datas": base64.b64encode(pdf_content),
-                "res_model": "lab.sample",
-                "res_id": self.id,
-                "mimetype": "application/pdf",
-                "company_id": self.company_id.id,
-            }
-            attachment = self.report_pdf_attachment_id.sudo()
-            if attachment:
-                attachment.write(vals)
-            else:
-                attachment = self.env["ir.attachment"].sudo().create(vals)
-            self.sudo().write(
-                {
-                    "report_pdf_attachment_id": attachment.id,
-                    "report_pdf_cached_at": fields.Datetime.now(),
-                }
-            )
-            return attachment
+            return self._store_report_pdf(pdf_content)
         except Exception:
             if suppress_error:
                 return self.env["ir.attachment"]
             raise
 
+    def _store_report_pdf(self, pdf_content):
+        self.ensure_one()
+        vals = {
+            "name": self._build_report_pdf_filename(),
+            "type": "binary",
+            "datas": base64.b64encode(pdf_content),
+            "res_model": "lab.sample",
+            "res_id": self.id,
+            "mimetype": "application/pdf",
+            "company_id": self.company_id.id,
+        }
+        attachment = self.report_pdf_attachment_id.sudo()
+        if attachment:
+            attachment.write(vals)
+        else:
+            attachment = self.env["ir.attachment"].sudo().create(vals)
+        self.sudo().write(
+            {
+                "report_pdf_attachment_id": attachment.id,
+                "report_pdf_cached_at": fields.Datetime.now(),
+            }
+        )
+        return attachment
+
+    @api.model
+    def _report_pdf_batch_size(self):
+        value = self.env["ir.config_parameter"].sudo().get_param("laboratory_management.report_pdf_batch_size", "25")
+        try:
+            return max(int(value), 1)
+        except (TypeError, ValueError):
+            return 25
+
+    def _generate_report_pdf_attachments(self, force=False, suppress_error=False):
+        """Cache report PDFs of many samples with one engine run per batch.
+
+        Samples sharing a report action are rendered together, at most
+        ``report_pdf_batch_size`` per run, and the output is split back per
+        sample on the record markers of the report layout. Samples whose
+        document cannot be separated fall back to a single render.
+        """
+        todo = self if force else self.filtered(lambda s: not s.report_pdf_attachment_id)
+        ids_by_action = {}
+        for rec in todo:
+            ids_by_action.setdefault(rec.get_report_action_xmlid(), []).append(rec.id)
+        batch_size = self._report_pdf_batch_size()
+        for action_xmlid, sample_ids in ids_by_action.items():
+            action = self.env.ref(action_xmlid).sudo()
+            for start in range(0, len(sample_ids), batch_size):
+                batch = self.browse(sample_ids[start : start + batch_size])
+                try:
+                    streams = action._render_qweb_pdf_prepare_streams(action.report_name, {}, res_ids=batch.ids)
+                except Exception:
+                    if len(batch) == 1 and not suppress_error:
+                        raise
+                    streams = {}
+                for rec in batch:
+                    stream = (streams.get(rec.id) or {}).get("stream")
+                    if stream is None:
+                        rec._generate_report_pdf_attachment(force=True, suppress_error=suppress_error)
+                        continue
+                    rec._store_report_pdf(stream.getvalue())
+                for entry in streams.values():
+                    if entry.get("stream"):
+                        entry["stream"].close()
+        return self.mapped("report_pdf_attachment_id")
+
     def _log_timeline(self, event_type, note):
         self.ensure_one()
         self.env["lab.sample.timeline"].create(
@@ -719,6 +905,12 @@ class LabSampleAnalysis(models.Model):
     )
     result_value = fields.Char()
     result_note = fields.Char()
+    result_date = fields.Datetime(
+        readonly=True,
+        copy=False,
+        index=True,
+        help="When the result was last marked done; auto-verification simulations replay results by this time.",
+    )
     auto_verified = fields.Boolean(default=False, readonly=True)
     delta_previous_value = fields.Float(readonly=True)
     delta_check_value = fields.Float(readonly=True)
@@ -734,6 +926,7 @@ class LabSampleAnalysis(models.Model):
             ("out_of_range", "Out of Reference Range"),
             ("qc_not_passed", "QC Not Passed"),
             ("delta_fail", "Delta Check Failed"),
+            ("rule_hold", "Auto-Verification Rule Hold"),
         ],
         readonly=True,
     )
@@ -742,6 +935,11 @@ class LabSampleAnalysis(models.Model):
     needs_manual_review = fields.Boolean(default=False, readonly=True)
     review_due_date = fields.Datetime(readonly=True)
     review_overdue = fields.Boolean(compute="_compute_review_overdue", search="_search_review_overdue")
+    qc_locked = fields.Boolean(
+        string="QC Lockout",
+        compute="_compute_qc_locked",
+        help="The latest QC run of this QC-required service is rejected.",
+    )
     review_assigned_user_id = fields.Many2one("res.users", string="Review Assignee", readonly=True)
     review_assigned_date = fields.Datetime(readonly=True)
     manual_reviewed_by_id = fields.Many2one("res.users", readonly=True)
@@ -759,10 +957,16 @@ class LabSampleAnalysis(models.Model):
     is_out_of_range = fields.Boolean(compute="_compute_result_flag", store=True)
 
     unit = fields.Char(related="service_id.unit", store=True)
-    ref_min = fields.Float(related="service_id.ref_min", store=True)
-    ref_max = fields.Float(related="service_id.ref_max", store=True)
-    critical_min = fields.Float(related="service_id.critical_min", store=True)
-    critical_max = fields.Float(related="service_id.critical_max", store=True)
+    reference_interval_id = fields.Many2one(
+        "lab.service.reference.interval",
+        compute="_compute_reference_bounds",
+        store=True,
+        string="Reference Interval",
+    )
+    ref_min = fields.Float(compute="_compute_reference_bounds", store=True)
+    ref_max = fields.Float(compute="_compute_reference_bounds", store=True)
+    critical_min = fields.Float(compute="_compute_reference_bounds", store=True)
+    critical_max = fields.Float(compute="_compute_reference_bounds", store=True)
     department = fields.Selection(related="service_id.department", store=True)
     sample_type = fields.Selection(related="service_id.sample_type", store=True)
     is_critical = fields.Boolean(compute="_compute_result_flag", store=True)
@@ -771,6 +975,12 @@ class LabSampleAnalysis(models.Model):
         for rec in self:
             rec.is_retest = bool(rec.retest_of_id)
 
+    def _compute_qc_locked(self):
+        qc_services = self.mapped("service_id").filtered("require_qc")
+        locked = self.env["lab.qc.status"]._locked_service_ids(qc_services.ids) if qc_services else set()
+        for rec in self:
+            rec.qc_locked = rec.service_id.id in locked
+
     def _compute_review_overdue(self):
         now = fields.Datetime.now()
         for rec in self:
@@ -804,6 +1014,54 @@ class LabSampleAnalysis(models.Model):
             return not_overdue_domain if value else overdue_domain
         return overdue_domain
 
+    def _reference_interval_key(self):
+        """Return ``(sex, age_years, specimen)`` used to select a reference interval."""
+        self.ensure_one()
+        sample = self.sample_id
+        patient = sample.patient_id
+        age = None
+        if patient.birthdate:
+            on_date = fields.Date.to_date(sample.collection_date) if sample.collection_date else fields.Date.today()
+            age = max((on_date - patient.birthdate).days, 0) / 365.25
+        return patient.gender, age, sample.specimen_sample_type or self.sample_type
+
+    @api.depends(
+        "service_id.ref_min",
+        "service_id.ref_max",
+        "service_id.critical_min",
+        "service_id.critical_max",
+        "service_id.reference_interval_ids",
+        "service_id.reference_interval_ids.active",
+        "service_id.reference_interval_ids.gender",
+        "service_id.reference_interval_ids.age_min",
+        "service_id.reference_interval_ids.age_max",
+        "service_id.reference_interval_ids.specimen_sample_type",
+        "service_id.reference_interval_ids.ref_min",
+        "service_id.reference_interval_ids.ref_max",
+        "service_id.reference_interval_ids.critical_min",
+        "service_id.reference_interval_ids.critical_max",
+        "sample_id.patient_id.gender",
+        "sample_id.patient_id.birthdate",
+        "sample_id.collection_date",
+        "sample_id.specimen_sample_type",
+    )
+    def _compute_reference_bounds(self):
+        indexes = {}
+        for rec in self:
+            service = rec.service_id
+            if not service:
+                rec.reference_interval_id = False
+                rec.ref_min = rec.ref_max = rec.critical_min = rec.critical_max = 0.0
+                continue
+            if service.id not in indexes:
+                indexes[service.id] = service._get_reference_interval_index()
+            interval = indexes[service.id].lookup(*rec._reference_interval_key())
+            rec.reference_interval_id = interval["id"]
+            rec.ref_min = interval["ref_min"]
+            rec.ref_max = interval["ref_max"]
+            rec.critical_min = interval["critical_min"]
+            rec.critical_max = interval["critical_max"]
+
     @api.depends(
         "result_value",
         "service_id.result_type",
@@ -812,41 +1070,51 @@ class LabSampleAnalysis(models.Model):
         "service_id.auto_binary_negative_when_gte",
         "ref_min",
         "ref_max",
+        "critical_min",
+        "critical_max",
     )
     def _compute_result_flag(self):
+        values = []
+        bounds = []
+        binary_rules = []
         for rec in self:
-            flag = "normal"
-            out_of_range = False
-            is_critical = False
-            binary_interpretation = False
-            if rec.service_id.result_type == "numeric" and rec.result_value not in (False, ""):
+            service = rec.service_id
+            value = None
+            if service.result_type == "numeric" and rec.result_value not in (False, ""):
                 try:
-                    num = float(rec.result_value)
-                    if num < rec.ref_min:
-                        flag = "low"
-                        out_of_range = True
-                    elif num > rec.ref_max:
-                        flag = "high"
-                        out_of_range = True
-                    if rec.service_id.auto_binary_enabled:
-                        cutoff = rec.service_id.auto_binary_cutoff
-                        if rec.service_id.auto_binary_negative_when_gte:
-                            binary_interpretation = "negative" if num >= cutoff else "positive"
-                        else:
-                            binary_interpretation = "positive" if num >= cutoff else "negative"
-                    if rec.critical_min not in (False, None) and num < rec.critical_min:
-                        is_critical = True
-                    if rec.critical_max not in (False, None) and num > rec.critical_max:
-                        is_critical = True
+                    value = float(rec.result_value)
                 except (TypeError, ValueError):
-                    flag = "normal"
-                    out_of_range = False
-                    binary_interpretation = False
+                    value = None
+            values.append(value)
+            bounds.append((rec.ref_min, rec.ref_max, rec.critical_min, rec.critical_max))
+            binary_rules.append(
+                (service.auto_binary_cutoff, service.auto_binary_negative_when_gte) if service.auto_binary_enabled else None
+            )
+        flags, binary, out_of_range, critical = flag_results(values, bounds, binary_rules)
+        for rec, flag, binary_value, oor, is_critical in zip(self, flags, binary, out_of_range, critical):
             rec.result_flag = flag
-            rec.binary_interpretation = binary_interpretation
-            rec.is_out_of_range = out_of_range
+            rec.binary_interpretation = binary_value
+            rec.is_out_of_range = oor
             rec.is_critical = is_critical
 
+    def _recompute_result_flags(self):
+        """Flag a large batch of lines in one pass (imports, plate completion)."""
+        fnames = [
+            "reference_interval_id",
+            "ref_min",
+            "ref_max",
+            "critical_min",
+            "critical_max",
+            "result_flag",
+            "binary_interpretation",
+            "is_out_of_range",
+            "is_critical",
+        ]
+        for fname in fnames:
+            self.env.add_to_compute(self._fields[fname], self)
+        self.flush_recordset(fnames)
+        return True
+
     @api.onchange("service_id")
     def _onchange_service_id_assign_panel_lot(self):
         for rec in self:
@@ -936,10 +1204,13 @@ class LabSampleAnalysis(models.Model):
                     raise ValidationError(_("Numeric result expected for service %s") % rec.service_id.name) from exc
 
     def action_mark_done(self):
+        latest_qc_runs = self._latest_qc_runs_by_service()
+        qc_services = self.mapped("service_id").filtered("require_qc")
+        locked_services = self.env["lab.qc.status"]._locked_service_ids(qc_services.ids) if qc_services else set()
         for rec in self:
             if rec.result_value in (False, ""):
                 raise UserError(_("Please input result value for %s") % rec.service_id.name)
-            qc_run = False
+            qc_run = latest_qc_runs.get(rec.service_id.id, False)
             if rec.service_id.require_reagent_lot and not rec.reagent_lot_id:
                 raise UserError(
                     _("Service %(service)s requires reagent lot before marking done.")
@@ -952,17 +1223,12 @@ class LabSampleAnalysis(models.Model):
                 )
             rec._propagate_panel_lot_to_sample()
             if rec.service_id.require_qc:
-                qc_run = self.env["lab.qc.run"].search(
-                    [("service_id", "=", rec.service_id.id)],
-                    order="run_date desc, id desc",
-                    limit=1,
-                )
                 if not qc_run:
                     raise UserError(
                         _("QC is required for %(service)s, but no QC run exists.")
                         % {"service": rec.service_id.name}
                     )
-                if qc_run.status == "reject":
+                if rec.service_id.id in locked_services:
                     raise UserError(
                         _(
                             "Latest QC for %(service)s is rejected (rule: %(rule)s). "
@@ -970,12 +1236,19 @@ class LabSampleAnalysis(models.Model):
                         )
                         % {"service": rec.service_id.name, "rule": qc_run.rule_triggered or "-"}
                     )
+            rec._evaluate_delta_check()
 
-            auto_verifiable = rec._can_auto_verify(qc_run=qc_run)
+        decisions = self._evaluate_auto_verify_batch(qc_runs=latest_qc_runs)
+        now = fields.Datetime.now()
+        for rec in self:
+            reason_code, manual = decisions[rec.id]
+            rec._set_manual_review_reason(reason_code, manual=manual)
+            auto_verifiable = not reason_code
             rec.write(
                 {
                     "state": "verified" if auto_verifiable else "done",
                     "auto_verified": auto_verifiable,
+                    "result_date": now,
                     "manual_reviewed_by_id": False,
                     "manual_reviewed_date": False,
                 }
@@ -1081,34 +1354,56 @@ class LabSampleAnalysis(models.Model):
                 if sample.state in ("draft", "received", "to_verify"):
                     sample.state = "in_progress"
 
-    def _can_auto_verify(self, qc_run=False):
+    def _can_auto_verify(self, qc_run=None):
+        """Single-result check; ``qc_run`` None looks the latest run up, False means there is none."""
         self.ensure_one()
-        service = self.service_id
         self._evaluate_delta_check()
-        if not service.auto_verify_enabled:
-            self._set_manual_review_reason("auto_disabled", manual=False)
-            return False
-        if self.is_critical:
-            self._set_manual_review_reason("critical", manual=True)
-            return False
-        if self.needs_manual_review:
-            self._set_manual_review_reason("delta_fail", manual=True)
-            return False
-        if self.is_out_of_range and not service.auto_verify_allow_out_of_range:
-            self._set_manual_review_reason("out_of_range", manual=True)
-            return False
-        if service.require_qc and service.auto_verify_require_qc_pass:
-            if not qc_run:
-                qc_run = self.env["lab.qc.run"].search(
-                    [("service_id", "=", service.id)],
-                    order="run_date desc, id desc",
-                    limit=1,
-                )
-            if not qc_run or qc_run.status != "pass":
-                self._set_manual_review_reason("qc_not_passed", manual=True)
-                return False
-        self._set_manual_review_reason(False, manual=False)
-        return True
+        qc_runs = None if qc_run is None else {self.service_id.id: qc_run}
+        reason_code, manual = self._evaluate_auto_verify_batch(qc_runs=qc_runs)[self.id]
+        self._set_manual_review_reason(reason_code, manual=manual)
+        return not reason_code
+
+    def _latest_qc_runs_by_service(self):
+        """Return ``{service_id: lab.qc.run}`` with the latest run of each service."""
+        return self.env["lab.qc.status"]._latest_runs(self.mapped("service_id").ids)
+
+    def _auto_verify_facts(self, qc_status=False):
+        self.ensure_one()
+        value = None
+        if self.service_id.result_type == "numeric" and self.result_value not in (False, ""):
+            try:
+                value = float(self.result_value)
+            except (TypeError, ValueError):
+                value = None
+        low, high = critical_bounds(self.critical_min, self.critical_max)
+        return {
+            "value": value,
+            "result_flag": self.result_flag,
+            "binary_interpretation": self.binary_interpretation,
+            "is_out_of_range": self.is_out_of_range,
+            "is_critical": self.is_critical,
+            "critical_min": low,
+            "critical_max": high,
+            "delta_status": "fail" if self.needs_manual_review else (self.delta_check_status or "na"),
+            "delta_value": self.delta_check_value,
+            "qc_status": qc_status,
+        }
+
+    def _evaluate_auto_verify_batch(self, qc_runs=None, include_draft=False):
+        """Evaluate the compiled service programs over a batch of results.
+
+        Returns ``{analysis_id: (reason_code, manual)}`` without writing anything.
+        """
+        if qc_runs is None:
+            qc_runs = self._latest_qc_runs_by_service()
+        decisions = {}
+        for service in self.mapped("service_id"):
+            lines = self.filtered(lambda x, s=service: x.service_id == s)
+            qc_status = qc_runs[service.id].status if qc_runs.get(service.id) else False
+            program = service._get_auto_verify_program(include_draft=include_draft)
+            results = program.evaluate_batch([line._auto_verify_facts(qc_status) for line in lines])
+            decisions.update(zip(lines.ids, results))
+        return decisions
 
     def _evaluate_delta_check(self):
         self.ensure_one()
@@ -1,10 +1,31 @@
+import base64
+import hashlib
 import json
+import random
+import threading
 import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
 
+import psycopg2
 import requests
+from requests.adapters import HTTPAdapter
 
 from odoo import _, api, fields, models
 from odoo.exceptions import UserError
+from odoo.tools import SQL, config as odoo_config, sql
+
+# Queue priority of interpretations requested from the portal.
+AI_PORTAL_PRIORITY = 10
+# Default number of provider calls kept in flight by the queue worker; a
+# local Ollama server usually serves one generation at a time.
+AI_PROVIDER_CONCURRENCY = {"openai": 4, "openai_compatible": 4, "ollama": 1}
+AI_MAX_CONCURRENCY = 32
+# Wall-clock budget of one queue run when the server sets no cron time limit.
+AI_QUEUE_TIME_BUDGET = 600
 
 
 class _SafeDict(dict):
@@ -12,6 +33,337 @@ class _SafeDict(dict):
         return ""
 
 
+AI_RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+AI_RETRY_BACKOFF = 0.5
+AI_RETRY_BACKOFF_MAX = 20.0
+AI_PROGRESS_INTERVAL = 1.0
+# History text fields kept in lab.ai.content.blob, with their reference field.
+AI_HISTORY_BODY_FIELDS = {
+    "system_prompt": "system_prompt_blob_id",
+    "user_prompt": "user_prompt_blob_id",
+    "response_text": "response_blob_id",
+}
+# Completion tokens reserved per request until the provider reports usage.
+AI_COMPLETION_TOKEN_ESTIMATE = 400
+
+_provider_sessions = {}
+_provider_sessions_lock = threading.Lock()
+
+
+class AIRateLimitError(UserError):
+    """The provider kept answering 429; the generation is deferred, not failed."""
+
+
+def estimate_ai_tokens(job):
+    """Rough token need of a request (4 characters per token plus an answer allowance)."""
+    return (len(job["system_prompt"] or "") + len(job["prompt"] or "")) // 4 + AI_COMPLETION_TOKEN_ESTIMATE
+
+
+def _provider_session(base_url):
+    """Return the process-wide keep-alive session for the origin of ``base_url``.
+
+    Sessions are shared by the queue worker threads; their connection pool
+    is sized for the largest concurrency the worker allows.
+    """
+    parts = urlsplit(base_url)
+    origin = "%s://%s" % (parts.scheme, parts.netloc)
+    with _provider_sessions_lock:
+        session = _provider_sessions.get(origin)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=AI_MAX_CONCURRENCY, max_retries=0)
+            session.mount(origin, adapter)
+            _provider_sessions[origin] = session
+        return session
+
+
+def _retry_delay(attempt, response=None):
+    """Exponential backoff with full jitter, honouring a numeric ``Retry-After``."""
+    if response is not None:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.strip().isdigit():
+            return min(float(retry_after), AI_RETRY_BACKOFF_MAX)
+    return random.uniform(0, min(AI_RETRY_BACKOFF * (2**attempt), AI_RETRY_BACKOFF_MAX))
+
+
+def _post_with_retries(settings, body, headers=None, stream=False):
+    """POST ``body`` to the provider, retrying connection errors and throttling answers."""
+    session = _provider_session(settings["base_url"])
+    retries = max(int(settings.get("retries") or 0), 0)
+    attempt = 0
+    while True:
+        try:
+            response = session.post(
+                settings["base_url"],
+                headers=headers,
+                json=body,
+                timeout=settings["timeout"],
+                stream=stream,
+            )
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt >= retries:
+                raise
+            time.sleep(_retry_delay(attempt))
+            attempt += 1
+            continue
+        if response.status_code in AI_RETRY_STATUSES and attempt < retries:
+            delay = _retry_delay(attempt, response)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+            continue
+        response.ai_attempts = attempt + 1
+        return response
+
+
+def _iter_stream_chunks(response, provider):
+    """Yield decoded JSON events from an OpenAI SSE or Ollama NDJSON stream."""
+    for raw in response.iter_lines():
+        line = raw.decode("utf-8", "replace").strip() if raw else ""
+        if not line:
+            continue
+        if provider != "ollama":
+            if not line.startswith("data:"):
+                continue
+            line = line[5:].strip()
+            if line == "[DONE]":
+                return
+        try:
+            yield json.loads(line)
+        except ValueError:
+            continue
+
+
+def _read_stream(response, provider, started, on_progress):
+    """Collect a streamed answer, reporting the text so far to ``on_progress``."""
+    parts = []
+    usage = {}
+    model_name = None
+    first_token_ms = None
+    for event in _iter_stream_chunks(response, provider):
+        if not isinstance(event, dict):
+            continue
+        if provider == "ollama":
+            delta = (event.get("message") or {}).get("content") or event.get("response") or ""
+            if event.get("done"):
+                prompt_tokens = event.get("prompt_eval_count") or 0
+                completion_tokens = event.get("eval_count") or 0
+                usage = {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                }
+        else:
+            choices = event.get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content") or ""
+            if event.get("usage"):
+                usage = event["usage"]
+        model_name = event.get("model") or model_name
+        if delta:
+            if first_token_ms is None:
+                first_token_ms = int((time.monotonic() - started) * 1000)
+            parts.append(delta)
+            if on_progress:
+                on_progress("".join(parts))
+    return "".join(parts), model_name, dict(usage, first_token_ms=first_token_ms)
+
+
+def request_ai_completion(settings, *, prompt, system_prompt, temperature, on_progress=None):
+    """Call the configured chat endpoint and return ``(content, model, usage)``.
+
+    ``settings`` comes from ``lab.sample._ai_request_settings``. The function
+    does not touch the ORM, so the queue worker runs it in its thread pool.
+    Besides token counts, ``usage`` carries the number of HTTP ``attempts``.
+    When ``settings["stream"]`` is set the answer is streamed, ``on_progress``
+    receives the text received so far and ``usage`` also has
+    ``first_token_ms``.
+    """
+    provider = settings["provider"]
+    model_name = settings["model"]
+    stream = bool(settings.get("stream"))
+    started = time.monotonic()
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+
+    if provider == "ollama":
+        body = {
+            "model": model_name,
+            "messages": messages,
+            "stream": stream,
+            "options": {
+                "temperature": temperature,
+            },
+        }
+        response = _post_with_retries(settings, body, stream=stream)
+        with response:
+            if response.status_code == 429:
+                raise AIRateLimitError(_("Ollama API is throttling requests: %s") % response.text[:500])
+            if response.status_code >= 400:
+                raise UserError(_("Ollama API request failed: %s") % response.text[:500])
+            if stream:
+                content, streamed_model, usage = _read_stream(response, provider, started, on_progress)
+                if not content:
+                    raise UserError(_("Ollama API returned empty interpretation."))
+                return content, streamed_model or model_name, dict(usage, attempts=response.ai_attempts)
+            result = response.json() if response.content else {}
+        message = result.get("message", {}) if isinstance(result, dict) else {}
+        content = message.get("content") or result.get("response")
+        if not content:
+            raise UserError(_("Ollama API returned empty interpretation."))
+        usage = {
+            "prompt_tokens": result.get("prompt_eval_count") or 0,
+            "completion_tokens": result.get("eval_count") or 0,
+            "total_tokens": (result.get("prompt_eval_count") or 0) + (result.get("eval_count") or 0),
+            "attempts": response.ai_attempts,
+        }
+        return content, result.get("model") or model_name, usage
+
+    api_key = settings.get("api_key")
+    if provider == "openai" and not api_key:
+        raise UserError(
+            _(
+                "OpenAI API key is not configured. Set system parameter: "
+                "laboratory_management.openai_api_key"
+            )
+        )
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = "Bearer %s" % api_key
+    body = {
+        "model": model_name,
+        "messages": messages,
+        "temperature": temperature,
+    }
+    if stream:
+        body["stream"] = True
+        body["stream_options"] = {"include_usage": True}
+
+    response = _post_with_retries(settings, body, headers=headers, stream=stream)
+    with response:
+        if response.status_code == 429:
+            raise AIRateLimitError(_("AI API is throttling requests: %s") % response.text[:500])
+        if response.status_code >= 400:
+            raise UserError(_("AI API request failed: %s") % response.text[:500])
+        if stream:
+            content, _streamed_model, usage = _read_stream(response, provider, started, on_progress)
+            if not content:
+                raise UserError(_("AI API returned empty interpretation."))
+            return content, model_name, dict(usage, attempts=response.ai_attempts)
+        result = response.json() if response.content else {}
+    content = result.get("choices", [{}])[0].get("message", {}).get("content") if isinstance(result, dict) else False
+    if not content:
+        raise UserError(_("AI API returned empty interpretation."))
+    usage = result.get("usage", {}) if isinstance(result, dict) else {}
+    return content, model_name, dict(usage, attempts=response.ai_attempts)
+
+
+class LabAIContentBlob(models.Model):
+    """Prompt and response bodies stored once, zlib-compressed, by SHA-256.
+
+    Thousands of history rows share the same system prompt and often the
+    same answer; they reference the body instead of repeating it.
+    """
+
+    _name = "lab.ai.content.blob"
+    _description = "Laboratory AI Prompt/Response Body"
+
+    digest = fields.Char(required=True, readonly=True)
+    size = fields.Integer(readonly=True, help="Uncompressed size in characters.")
+    data = fields.Binary(attachment=False, required=True, readonly=True)
+
+    _digest_uniq = models.Constraint("unique(digest)", "AI content bodies are stored once per digest.")
+
+    @api.model
+    def _intern(self, texts):
+        """Return ``{text: blob id}`` for the non-empty ``texts``, storing new bodies."""
+        by_digest = {hashlib.sha256(text.encode()).hexdigest(): text for text in set(texts) if text}
+        if not by_digest:
+            return {}
+        blobs = self.sudo()
+        # The key-share lock keeps the garbage collector from deleting a body
+        # this transaction is about to reference again.
+        self.env.cr.execute(
+            "SELECT digest, id FROM lab_ai_content_blob WHERE digest = ANY(%s) FOR KEY SHARE", [list(by_digest)]
+        )
+        known = dict(self.env.cr.fetchall())
+        for digest, text in by_digest.items():
+            if digest in known:
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    known[digest] = blobs.create(
+                        {
+                            "digest": digest,
+                            "size": len(text),
+                            "data": base64.b64encode(zlib.compress(text.encode(), 6)),
+                        }
+                    ).id
+            except psycopg2.errors.UniqueViolation:
+                # Stored meanwhile by a concurrent worker.
+                known[digest] = blobs.search([("digest", "=", digest)], limit=1).id
+        return {text: known[digest] for digest, text in by_digest.items()}
+
+    def _texts(self):
+        """Return ``{blob id: text}`` for the bodies in ``self``, read in one query."""
+        return {blob.id: zlib.decompress(base64.b64decode(blob.data)).decode() for blob in self.sudo() if blob.data}
+
+    @api.model
+    def _move_column(self, table, column, target):
+        """Move legacy inline bodies of ``table.column`` into the store (used by migrations)."""
+        cr = self.env.cr
+        if not sql.column_exists(cr, table, column):
+            return
+        while True:
+            cr.execute(
+                SQL(
+                    "SELECT id, %s FROM %s WHERE %s IS NOT NULL LIMIT 1000",
+                    SQL.identifier(column),
+                    SQL.identifier(table),
+                    SQL.identifier(column),
+                )
+            )
+            rows = cr.fetchall()
+            if not rows:
+                return
+            blob_ids = self._intern([text for _id, text in rows])
+            for record_id, text in rows:
+                cr.execute(
+                    SQL(
+                        "UPDATE %s SET %s = %s, %s = NULL WHERE id = %s",
+                        SQL.identifier(table),
+                        SQL.identifier(target),
+                        blob_ids.get(text),
+                        SQL.identifier(column),
+                        record_id,
+                    )
+                )
+
+    @api.model
+    def _cron_collect_garbage(self):
+        """Delete bodies no longer referenced by history or samples.
+
+        Bodies younger than a day are kept: they may belong to a generation
+        that has stored the body but not yet committed the row pointing at it.
+        """
+        self.env["lab.sample.ai.interpretation"].flush_model()
+        self.env["lab.sample"].flush_model(["ai_interpretation_prompt_blob_id"])
+        self.env.cr.execute(
+            """
+            DELETE FROM lab_ai_content_blob blob
+             WHERE blob.create_date < (NOW() AT TIME ZONE 'UTC') - INTERVAL '1 day'
+               AND NOT EXISTS (
+                       SELECT 1 FROM lab_sample_ai_interpretation h
+                        WHERE blob.id IN (h.system_prompt_blob_id, h.user_prompt_blob_id, h.response_blob_id)
+                   )
+               AND NOT EXISTS (SELECT 1 FROM lab_sample s WHERE s.ai_interpretation_prompt_blob_id = blob.id)
+            """
+        )
+        self.invalidate_model()
+        return True
+
+
 class LabSampleAIInterpretation(models.Model):
     _name = "lab.sample.ai.interpretation"
     _description = "Laboratory Sample AI Interpretation History"
@@ -40,15 +392,25 @@ class LabSampleAIInterpretation(models.Model):
         index=True,
     )
     model_name = fields.Char(string="Model")
+    requested_model = fields.Char(
+        readonly=True,
+        help="Model configured when the call was made; the daily token budget is counted against it.",
+    )
     output_language = fields.Char()
     duration_ms = fields.Integer(string="Duration (ms)")
+    first_token_ms = fields.Integer(string="First Token (ms)", help="Latency until the first streamed token arrived.")
+    attempt_count = fields.Integer(string="Attempts", help="HTTP attempts made, retries included.")
     prompt_tokens = fields.Integer()
     completion_tokens = fields.Integer()
     total_tokens = fields.Integer()
-    system_prompt = fields.Text()
-    user_prompt = fields.Text()
-    response_text = fields.Text()
+    system_prompt_blob_id = fields.Many2one("lab.ai.content.blob", ondelete="restrict", readonly=True)
+    user_prompt_blob_id = fields.Many2one("lab.ai.content.blob", ondelete="restrict", readonly=True)
+    response_blob_id = fields.Many2one("lab.ai.content.blob", ondelete="restrict", readonly=True)
+    system_prompt = fields.Text(compute="_compute_bodies", inverse="_inverse_bodies")
+    user_prompt = fields.Text(compute="_compute_bodies", inverse="_inverse_bodies")
+    response_text = fields.Text(compute="_compute_bodies", inverse="_inverse_bodies")
     error_text = fields.Text()
+    cache_hit = fields.Boolean(readonly=True, help="Answer served from the AI response cache without calling the provider.")
     generated_at = fields.Datetime(default=fields.Datetime.now, required=True, index=True)
 
     def init(self):
@@ -65,6 +427,26 @@ class LabSampleAIInterpretation(models.Model):
             """
         )
 
+    @api.depends("system_prompt_blob_id", "user_prompt_blob_id", "response_blob_id")
+    def _compute_bodies(self):
+        blobs = self.system_prompt_blob_id | self.user_prompt_blob_id | self.response_blob_id
+        texts = blobs._texts()
+        for rec in self:
+            for body_field, blob_field in AI_HISTORY_BODY_FIELDS.items():
+                rec[body_field] = texts.get(rec[blob_field].id, False)
+
+    def _inverse_bodies(self):
+        blob_ids = self.env["lab.ai.content.blob"]._intern(
+            [rec[body_field] for rec in self for body_field in AI_HISTORY_BODY_FIELDS]
+        )
+        for rec in self:
+            rec.write(
+                {
+                    blob_field: blob_ids.get(rec[body_field], False)
+                    for body_field, blob_field in AI_HISTORY_BODY_FIELDS.items()
+                }
+            )
+
 
 class LabSampleAIReviewLog(models.Model):
     _name = "lab.sample.ai.review.log"
@@ -94,6 +476,278 @@ class LabSampleAIReviewLog(models.Model):
         )
 
 
+class LabAIResponseCache(models.Model):
+    _name = "lab.ai.response.cache"
+    _description = "Laboratory AI Response Cache"
+    _order = "last_used_at desc, id desc"
+
+    key = fields.Char(required=True, index=True, readonly=True)
+    model_name = fields.Char(string="Model", readonly=True)
+    output_language = fields.Char(readonly=True)
+    response_text = fields.Text(readonly=True)
+    prompt_tokens = fields.Integer(readonly=True)
+    completion_tokens = fields.Integer(readonly=True)
+    total_tokens = fields.Integer(readonly=True)
+    hit_count = fields.Integer(readonly=True)
+    cached_at = fields.Datetime(
+        default=fields.Datetime.now, required=True, index=True, readonly=True, help="When the answer was stored; the TTL runs from here."
+    )
+    last_used_at = fields.Datetime(default=fields.Datetime.now, required=True, index=True, readonly=True)
+
+    _key_uniq = models.Constraint("unique(key)", "AI response cache keys must be unique.")
+
+    @api.model
+    def _make_key(self, *, system_prompt, prompt, model_name, temperature, output_language):
+        """Hash what determines a provider answer; whitespace-only differences are ignored."""
+        normalized = "\n".join(" ".join(line.split()) for line in (prompt or "").strip().splitlines())
+        payload = json.dumps(
+            [(system_prompt or "").strip(), normalized, model_name or "", round(temperature or 0.0, 3), output_language or ""],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @api.model
+    def _settings(self):
+        config = self.env["ir.config_parameter"].sudo()
+        enabled = (config.get_param("laboratory_management.ai_cache_enabled") or "1").strip()
+        return {
+            "enabled": enabled not in ("0", "false", "False"),
+            "ttl_hours": int((config.get_param("laboratory_management.ai_cache_ttl_hours") or "168").strip()),
+            "max_entries": int((config.get_param("laboratory_management.ai_cache_max_entries") or "5000").strip()),
+        }
+
+    @api.model
+    def _lookup(self, key):
+        """Return ``(content, model_name, usage)`` for a fresh entry and count the hit."""
+        ttl_hours = self._settings()["ttl_hours"]
+        domain = [("key", "=", key)]
+        if ttl_hours > 0:
+            domain.append(("cached_at", ">=", fields.Datetime.now() - timedelta(hours=ttl_hours)))
+        entry = self.sudo().search(domain, limit=1)
+        if not entry:
+            return None
+        self.env.cr.execute(
+            "UPDATE lab_ai_response_cache SET hit_count = hit_count + 1, last_used_at = NOW() AT TIME ZONE 'UTC' WHERE id = %s",
+            [entry.id],
+        )
+        entry.invalidate_recordset(["hit_count", "last_used_at"])
+        usage = {
+            "prompt_tokens": entry.prompt_tokens,
+            "completion_tokens": entry.completion_tokens,
+            "total_tokens": entry.total_tokens,
+        }
+        return entry.response_text, entry.model_name, usage
+
+    @api.model
+    def _remember(self, key, content, model_name, usage, output_language=None):
+        vals = {
+            "model_name": model_name,
+            "output_language": output_language,
+            "response_text": content,
+            "prompt_tokens": usage.get("prompt_tokens") or 0,
+            "completion_tokens": usage.get("completion_tokens") or 0,
+            "total_tokens": usage.get("total_tokens") or 0,
+            "cached_at": fields.Datetime.now(),
+            "last_used_at": fields.Datetime.now(),
+        }
+        entry = self.sudo().search([("key", "=", key)], limit=1)
+        if entry:
+            # Expired or regenerated entry: the fresh answer restarts the TTL.
+            entry.write(dict(vals, hit_count=0))
+        else:
+            self.sudo().create(dict(vals, key=key))
+
+    @api.model
+    def _forget(self, texts):
+        """Drop cached answers whose text a reviewer rejected."""
+        texts = [text for text in texts if text]
+        if texts:
+            self.sudo().search([("response_text", "in", texts)]).unlink()
+
+    @api.model
+    def _cron_evict(self):
+        """Drop expired entries, then the least recently used ones above the size cap."""
+        settings = self._settings()
+        cache = self.sudo()
+        if settings["ttl_hours"] > 0:
+            cutoff = fields.Datetime.now() - timedelta(hours=settings["ttl_hours"])
+            cache.search([("cached_at", "<", cutoff)]).unlink()
+        if settings["max_entries"] > 0:
+            cache.search([], order="last_used_at desc, id desc", offset=settings["max_entries"]).unlink()
+        return True
+
+    @api.model
+    def _stats(self):
+        """Return hit/miss counters taken from the interpretation history."""
+        history = self.env["lab.sample.ai.interpretation"].sudo()
+        return {
+            "entries": self.sudo().search_count([]),
+            "hits": history.search_count([("state", "=", "done"), ("cache_hit", "=", True)]),
+            "misses": history.search_count([("state", "=", "done"), ("cache_hit", "=", False)]),
+        }
+
+
+class LabAIRateLimit(models.Model):
+    _name = "lab.ai.rate.limit"
+    _description = "Laboratory AI Provider Rate Limit"
+    _order = "provider, model_name"
+
+    provider = fields.Char(required=True, readonly=True)
+    model_name = fields.Char(string="Model", required=True, readonly=True)
+    request_allowance = fields.Float(readonly=True, help="Requests left in the per-minute bucket at the last refill.")
+    token_allowance = fields.Float(readonly=True, help="Tokens left in the per-minute bucket at the last refill.")
+    refilled_at = fields.Datetime(readonly=True)
+    deferred_count = fields.Integer(readonly=True, help="Generations postponed because a limit was reached.")
+    reserved_tokens = fields.Float(
+        readonly=True,
+        help="Tokens granted to calls still in flight today; counted against the daily budget until settled.",
+    )
+    reserved_on = fields.Date(readonly=True)
+
+    _provider_model_uniq = models.Constraint(
+        "unique(provider, model_name)",
+        "Only one rate limit bucket per provider and model.",
+    )
+
+    @api.model
+    def _limits(self):
+        config = self.env["ir.config_parameter"].sudo()
+        return {
+            "rpm": int((config.get_param("laboratory_management.ai_requests_per_minute") or "0").strip()),
+            "tpm": int((config.get_param("laboratory_management.ai_tokens_per_minute") or "0").strip()),
+            "daily_tokens": int((config.get_param("laboratory_management.ai_daily_token_budget") or "0").strip()),
+        }
+
+    @contextmanager
+    def _bucket_cursor(self):
+        """Cursor committing bucket updates at once so every worker sees them.
+
+        Tests run on a single cursor and use it directly.
+        """
+        if getattr(threading.current_thread(), "testing", False):
+            yield self.env.cr
+            return
+        with self.env.registry.cursor() as cr:
+            yield cr
+
+    @api.model
+    def _tokens_used_today(self, model_name):
+        """Provider tokens consumed by the configured ``model_name`` since midnight (UTC); cache hits are free."""
+        history = self.env["lab.sample.ai.interpretation"]
+        history.flush_model(
+            ["model_name", "requested_model", "generated_at", "state", "cache_hit", "prompt_tokens", "completion_tokens"]
+        )
+        self.env.cr.execute(
+            """
+            SELECT COALESCE(SUM(COALESCE(prompt_tokens, 0) + COALESCE(completion_tokens, 0)), 0)
+              FROM lab_sample_ai_interpretation
+             WHERE COALESCE(requested_model, model_name) = %s
+               AND generated_at >= %s
+               AND state = 'done'
+               AND cache_hit IS NOT TRUE
+            """,
+            [model_name, datetime.combine(fields.Date.today(), datetime.min.time())],
+        )
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _acquire(self, provider, model_name, tokens):
+        """Take one request and ``tokens`` from the buckets of ``provider``/``model_name``.
+
+        Returns 0 when the call may go ahead, otherwise the number of seconds
+        to wait. Buckets hold one minute of allowance and refill continuously;
+        they live in their own short transaction so every worker shares them.
+        Granted tokens stay reserved against the daily budget until
+        ``_settle``, so a batch of calls cannot overshoot it.
+        """
+        limits = self._limits()
+        rpm, tpm, daily = limits["rpm"], limits["tpm"], limits["daily_tokens"]
+        if not rpm and not tpm and not daily:
+            return 0
+        used_today = self._tokens_used_today(model_name) if daily else 0
+        with self._bucket_cursor() as cr:
+            bucket_id, requests_left, tokens_left, refilled_at, reserved = self._lock_bucket(
+                cr, provider, model_name, rpm, tpm
+            )
+            now = fields.Datetime.now()
+            wait = 0.0
+            if daily and used_today + reserved + tokens > daily:
+                tomorrow = datetime.combine(fields.Date.today() + timedelta(days=1), datetime.min.time())
+                wait = max((tomorrow - now).total_seconds(), 60.0)
+            else:
+                elapsed = max((now - refilled_at).total_seconds(), 0.0) if refilled_at else 60.0
+                requests_left = min(rpm, requests_left + elapsed * rpm / 60.0) if rpm else 0.0
+                tokens_left = min(tpm, tokens_left + elapsed * tpm / 60.0) if tpm else 0.0
+                if rpm and requests_left < 1:
+                    wait = (1 - requests_left) * 60.0 / rpm
+                needed = min(tokens, tpm)
+                if tpm and tokens_left < needed:
+                    wait = max(wait, (needed - tokens_left) * 60.0 / tpm)
+                if not wait:
+                    requests_left -= 1 if rpm else 0
+                    tokens_left -= tokens if tpm else 0
+                    reserved += tokens if daily else 0
+                refilled_at = now
+            cr.execute(
+                """
+                UPDATE lab_ai_rate_limit
+                   SET request_allowance = %s, token_allowance = %s, refilled_at = %s,
+                       reserved_tokens = %s, reserved_on = %s,
+                       deferred_count = COALESCE(deferred_count, 0) + %s
+                 WHERE id = %s
+                """,
+                [requests_left, tokens_left, refilled_at, reserved, fields.Date.today(), 1 if wait else 0, bucket_id],
+            )
+        return wait
+
+    @api.model
+    def _lock_bucket(self, cr, provider, model_name, rpm, tpm):
+        """Lock the bucket row; reservations made on a previous day are dropped."""
+        cr.execute(
+            """
+            INSERT INTO lab_ai_rate_limit (provider, model_name, request_allowance, token_allowance, deferred_count)
+            VALUES (%s, %s, %s, %s, 0)
+            ON CONFLICT (provider, model_name) DO NOTHING
+            """,
+            [provider, model_name, rpm, tpm],
+        )
+        cr.execute(
+            """
+            SELECT id, COALESCE(request_allowance, 0), COALESCE(token_allowance, 0), refilled_at,
+                   CASE WHEN reserved_on = %s THEN COALESCE(reserved_tokens, 0) ELSE 0 END
+              FROM lab_ai_rate_limit
+             WHERE provider = %s AND model_name = %s
+               FOR UPDATE
+            """,
+            [fields.Date.today(), provider, model_name],
+        )
+        return cr.fetchone()
+
+    @api.model
+    def _settle(self, provider, model_name, estimated, actual):
+        """Release the daily reservation of a granted call and correct its per-minute tokens.
+
+        ``actual`` is the usage reported by the provider, 0 when the call was
+        never made or failed; the difference goes back to the minute bucket.
+        """
+        limits = self._limits()
+        if not limits["tpm"] and not limits["daily_tokens"]:
+            return
+        refund = estimated - actual if limits["tpm"] else 0
+        with self._bucket_cursor() as cr:
+            cr.execute(
+                """
+                UPDATE lab_ai_rate_limit
+                   SET token_allowance = COALESCE(token_allowance, 0) + %s,
+                       reserved_tokens = CASE WHEN reserved_on = %s
+                                              THEN GREATEST(COALESCE(reserved_tokens, 0) - %s, 0)
+                                              ELSE 0 END
+                 WHERE provider = %s AND model_name = %s
+                """,
+                [refund, fields.Date.today(), estimated, provider, model_name],
+            )
+
+
 class LabSample(models.Model):
     _inherit = "lab.sample"
 
@@ -110,11 +764,31 @@ class LabSample(models.Model):
         tracking=True,
     )
     ai_interpretation_text = fields.Text(readonly=True)
+    ai_interpretation_partial = fields.Text(
+        readonly=True,
+        help="Text streamed so far while the interpretation is being generated.",
+    )
     ai_interpretation_error = fields.Text(readonly=True)
     ai_interpretation_model = fields.Char(readonly=True)
     ai_interpretation_lang = fields.Char(readonly=True)
-    ai_interpretation_prompt = fields.Text(readonly=True)
+    ai_interpretation_prompt_blob_id = fields.Many2one("lab.ai.content.blob", ondelete="restrict", readonly=True)
+    ai_interpretation_prompt = fields.Text(
+        compute="_compute_ai_interpretation_prompt",
+        inverse="_inverse_ai_interpretation_prompt",
+        readonly=True,
+    )
     ai_interpretation_updated_at = fields.Datetime(readonly=True)
+    ai_queue_priority = fields.Integer(readonly=True, help="Queued samples with a higher priority are generated first.")
+    ai_queue_source = fields.Selection(
+        [
+            ("manual", "Manual"),
+            ("release", "Auto on Release"),
+            ("queue", "Queued Worker"),
+            ("portal", "Portal"),
+            ("cron", "Scheduled Retry"),
+        ],
+        readonly=True,
+    )
     ai_review_state = fields.Selection(
         [
             ("none", "No Review"),
@@ -162,6 +836,27 @@ class LabSample(models.Model):
         mapping = dict(selection or [])
         return mapping.get(value, value)
 
+    def init(self):
+        super().init()
+        self.env.cr.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_lab_sample_ai_queue
+            ON lab_sample (ai_queue_priority DESC, ai_interpretation_updated_at, id)
+            WHERE ai_interpretation_state = 'queued'
+            """
+        )
+
+    @api.depends("ai_interpretation_prompt_blob_id")
+    def _compute_ai_interpretation_prompt(self):
+        texts = self.ai_interpretation_prompt_blob_id._texts()
+        for rec in self:
+            rec.ai_interpretation_prompt = texts.get(rec.ai_interpretation_prompt_blob_id.id, False)
+
+    def _inverse_ai_interpretation_prompt(self):
+        blob_ids = self.env["lab.ai.content.blob"]._intern(self.mapped("ai_interpretation_prompt"))
+        for rec in self:
+            rec.ai_interpretation_prompt_blob_id = blob_ids.get(rec.ai_interpretation_prompt, False)
+
     def _compute_ai_interpretation_history_count(self):
         for rec in self:
             rec.ai_interpretation_history_count = len(rec.ai_interpretation_history_ids)
@@ -341,10 +1036,6 @@ class LabSample(models.Model):
         user_prompt_template = template.ai_user_prompt_template if template else False
         if not user_prompt_template:
             user_prompt_template = (
-                "Sample: {sample_name}\n"
-                "Patient: {patient_name}\n"
-                "Report Date: {report_date}\n"
-                "\n"
                 "Analysis Results:\n{analysis_lines}\n"
                 "\n"
                 "Abnormal Items:\n{abnormal_lines}\n"
@@ -372,29 +1063,38 @@ class LabSample(models.Model):
         user_prompt=None,
         response_text=None,
         error_text=None,
+        cache_hit=False,
+        first_token_ms=None,
+        attempt_count=None,
     ):
         self.ensure_one()
+        blob_ids = self.env["lab.ai.content.blob"]._intern([system_prompt, user_prompt, response_text])
         self.env["lab.sample.ai.interpretation"].sudo().create(
             {
                 "sample_id": self.id,
                 "state": state,
                 "trigger_source": trigger_source or "manual",
                 "model_name": model_name,
+                "requested_model": self._get_ai_provider_and_model()[1],
                 "output_language": output_language,
                 "duration_ms": duration_ms,
                 "prompt_tokens": prompt_tokens,
                 "completion_tokens": completion_tokens,
                 "total_tokens": total_tokens,
-                "system_prompt": system_prompt,
-                "user_prompt": user_prompt,
-                "response_text": response_text,
+                "system_prompt_blob_id": blob_ids.get(system_prompt, False),
+                "user_prompt_blob_id": blob_ids.get(user_prompt, False),
+                "response_blob_id": blob_ids.get(response_text, False),
                 "error_text": error_text,
+                "cache_hit": cache_hit,
+                "first_token_ms": first_token_ms,
+                "attempt_count": attempt_count,
                 "generated_at": fields.Datetime.now(),
             }
         )
 
+    @api.model
     def _get_ai_provider_and_model(self):
-        self.ensure_one()
+        """Return the configured ``(provider, model name)``; settings are global, not per sample."""
         config = self.env["ir.config_parameter"].sudo()
         provider = (config.get_param("laboratory_management.ai_provider") or "openai").strip()
         if provider == "openai_compatible":
@@ -408,83 +1108,66 @@ class LabSample(models.Model):
             model_name = (config.get_param("laboratory_management.openai_model") or "gpt-4.1-mini").strip()
         return provider, model_name
 
-    def _call_ai_provider(self, *, prompt, system_prompt, temperature):
-        self.ensure_one()
+    @api.model
+    def _ai_request_settings(self):
+        """Return the provider settings a worker thread needs to call the model.
+
+        The dict only holds plain values so provider calls can run without
+        access to the environment or the database cursor.
+        """
         config = self.env["ir.config_parameter"].sudo()
         provider, model_name = self._get_ai_provider_and_model()
-        timeout_seconds = int((config.get_param("laboratory_management.ai_timeout_seconds") or "120").strip())
-
+        settings = {
+            "provider": provider,
+            "model": model_name,
+            "api_key": "",
+            "timeout": int((config.get_param("laboratory_management.ai_timeout_seconds") or "120").strip()),
+            "retries": int((config.get_param("laboratory_management.ai_max_retries") or "2").strip()),
+            "stream": (config.get_param("laboratory_management.ai_stream_enabled") or "0").strip()
+            not in ("0", "false", "False"),
+        }
         if provider == "ollama":
-            base_url = (config.get_param("laboratory_management.ollama_base_url") or "http://127.0.0.1:11434/api/chat").strip()
-            body = {
-                "model": model_name,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                "stream": False,
-                "options": {
-                    "temperature": temperature,
-                },
-            }
-            response = requests.post(base_url, json=body, timeout=timeout_seconds)
-            if response.status_code >= 400:
-                raise UserError(_("Ollama API request failed: %s") % response.text[:500])
-            result = response.json() if response.content else {}
-            message = result.get("message", {}) if isinstance(result, dict) else {}
-            content = message.get("content") or result.get("response")
-            if not content:
-                raise UserError(_("Ollama API returned empty interpretation."))
-            usage = {
-                "prompt_tokens": result.get("prompt_eval_count") or 0,
-                "completion_tokens": result.get("eval_count") or 0,
-                "total_tokens": (result.get("prompt_eval_count") or 0) + (result.get("eval_count") or 0),
-            }
-            return content, result.get("model") or model_name, usage
-
-        if provider == "openai_compatible":
-            api_key = (config.get_param("laboratory_management.openai_compatible_api_key") or "").strip()
-            base_url = (
+            settings["base_url"] = (
+                config.get_param("laboratory_management.ollama_base_url") or "http://127.0.0.1:11434/api/chat"
+            ).strip()
+        elif provider == "openai_compatible":
+            settings["api_key"] = (config.get_param("laboratory_management.openai_compatible_api_key") or "").strip()
+            settings["base_url"] = (
                 config.get_param("laboratory_management.openai_compatible_base_url")
                 or "http://127.0.0.1:8000/v1/chat/completions"
             ).strip()
         else:
-            api_key = (config.get_param("laboratory_management.openai_api_key") or "").strip()
-            base_url = (
+            settings["api_key"] = (config.get_param("laboratory_management.openai_api_key") or "").strip()
+            settings["base_url"] = (
                 config.get_param("laboratory_management.openai_base_url") or "https://api.openai.com/v1/chat/completions"
             ).strip()
-            if not api_key:
-                raise UserError(
-                    _(
-                        "OpenAI API key is not configured. Set system parameter: "
-                        "laboratory_management.openai_api_key"
-                    )
-                )
+        return settings
 
-        headers = {"Content-Type": "application/json"}
-        if api_key:
-            headers["Authorization"] = "Bearer %s" % api_key
-        body = {
-            "model": model_name,
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt},
-            ],
-            "temperature": temperature,
-        }
+    @api.model
+    def _ai_queue_concurrency(self, provider):
+        """Number of provider calls the queue worker keeps in flight for ``provider``."""
+        config = self.env["ir.config_parameter"].sudo()
+        default = AI_PROVIDER_CONCURRENCY.get(provider, 1)
+        try:
+            value = int((config.get_param("laboratory_management.%s_concurrency" % provider) or default))
+        except (TypeError, ValueError):
+            value = default
+        return max(1, min(value, AI_MAX_CONCURRENCY))
 
-        response = requests.post(base_url, headers=headers, json=body, timeout=timeout_seconds)
-        if response.status_code >= 400:
-            raise UserError(_("AI API request failed: %s") % response.text[:500])
+    def _call_ai_provider(self, *, prompt, system_prompt, temperature):
+        self.ensure_one()
+        return request_ai_completion(
+            self._ai_request_settings(),
+            prompt=prompt,
+            system_prompt=system_prompt,
+            temperature=temperature,
+        )
 
-        result = response.json() if response.content else {}
-        content = result.get("choices", [{}])[0].get("message", {}).get("content") if isinstance(result, dict) else False
-        if not content:
-            raise UserError(_("AI API returned empty interpretation."))
-        usage = result.get("usage", {}) if isinstance(result, dict) else {}
-        return content, model_name, usage
+    def _prepare_ai_request(self):
+        """Validate the sample and build the provider request.
 
-    def _generate_ai_interpretation_internal(self):
+        Returns ``False`` when the report template disables interpretation.
+        """
         self.ensure_one()
         if self.state not in ("verified", "reported"):
             raise UserError(_("AI interpretation is only available for verified/reported samples."))
@@ -496,7 +1179,6 @@ class LabSample(models.Model):
         trigger_source = self.env.context.get("ai_trigger_source") or "manual"
         if trigger_source == "portal" and self.ai_review_state == "approved":
             raise UserError(_("AI interpretation is locked after approval and cannot be refreshed from portal."))
-        started = time.monotonic()
 
         prompt, output_lang = self._build_ai_prompt()
         system_prompt = (
@@ -505,33 +1187,56 @@ class LabSample(models.Model):
         if not system_prompt:
             system_prompt = "You are a laboratory report interpretation assistant."
         temperature = template.ai_temperature if template else 0.2
+        cache_key = False
+        cache = self.env["lab.ai.response.cache"]
+        if (not template or template.ai_cache_enabled) and cache._settings()["enabled"]:
+            cache_key = cache._make_key(
+                system_prompt=system_prompt,
+                prompt=prompt,
+                model_name=self._get_ai_provider_and_model()[1],
+                temperature=temperature,
+                output_language=output_lang,
+            )
+        return {
+            "prompt": prompt,
+            "system_prompt": system_prompt,
+            "temperature": temperature,
+            "output_language": output_lang,
+            "trigger_source": trigger_source,
+            "cache_key": cache_key,
+            # Someone explicitly asked for a new answer: call the provider.
+            "bypass_cache": bool(self.env.context.get("ai_bypass_cache"))
+            or (bool(self.env.context.get("force_ai_regenerate")) and trigger_source in ("manual", "portal")),
+        }
 
-        self.write(
-            {
-                "ai_interpretation_state": "running",
-                "ai_interpretation_error": False,
-            }
-        )
+    def _cached_ai_result(self, job):
+        """Return the cached ``(content, model_name, usage)`` answer for ``job``, if any."""
+        if not job.get("cache_key") or job.get("bypass_cache"):
+            return None
+        return self.env["lab.ai.response.cache"]._lookup(job["cache_key"])
 
-        content, model_name, usage = self._call_ai_provider(
-            prompt=prompt,
-            system_prompt=system_prompt,
-            temperature=temperature,
-        )
-        prompt_tokens = usage.get("prompt_tokens") or 0
-        completion_tokens = usage.get("completion_tokens") or 0
-        total_tokens = usage.get("total_tokens") or 0
-        duration_ms = int((time.monotonic() - started) * 1000)
+    def _apply_ai_result(self, job, content, model_name, usage, duration_ms, cache_hit=False):
+        """Store an answer for the request built by ``_prepare_ai_request``.
 
+        Cache hits are logged without token usage since the provider was not called.
+        """
+        self.ensure_one()
+        prompt = job["prompt"]
+        output_lang = job["output_language"]
+        if cache_hit:
+            usage = {}
+        elif job.get("cache_key"):
+            self.env["lab.ai.response.cache"]._remember(job["cache_key"], content, model_name, usage, output_lang)
         was_approved = self.ai_review_state == "approved"
         self.write(
             {
                 "ai_interpretation_state": "done",
                 "ai_interpretation_text": content,
+                "ai_interpretation_partial": False,
                 "ai_interpretation_error": False,
                 "ai_interpretation_model": model_name,
                 "ai_interpretation_lang": output_lang,
-                "ai_interpretation_prompt": prompt,
+                "ai_interpretation_prompt_blob_id": self.env["lab.ai.content.blob"]._intern([prompt]).get(prompt, False),
                 "ai_interpretation_updated_at": fields.Datetime.now(),
                 "ai_review_state": "pending",
                 "ai_reviewed_by_id": False,
@@ -543,20 +1248,99 @@ class LabSample(models.Model):
         self._schedule_ai_review_activity()
         self._create_ai_history(
             state="done",
-            trigger_source=trigger_source,
+            trigger_source=job["trigger_source"],
             model_name=model_name,
             output_language=output_lang,
             duration_ms=duration_ms,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
-            system_prompt=system_prompt,
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0,
+            total_tokens=usage.get("total_tokens") or 0,
+            system_prompt=job["system_prompt"],
             user_prompt=prompt,
             response_text=content,
+            cache_hit=cache_hit,
+            first_token_ms=usage.get("first_token_ms"),
+            attempt_count=usage.get("attempts"),
         )
         self.message_post(body=_("AI interpretation generated (model: %s)") % model_name)
         return True
 
+    def _apply_ai_failure(self, error, duration_ms, trigger_source, job=None):
+        """Flag the sample as failed and log the attempt in the history."""
+        self.ensure_one()
+        prompt = output_lang = system_prompt = False
+        if job:
+            prompt, output_lang, system_prompt = job["prompt"], job["output_language"], job["system_prompt"]
+        else:
+            try:
+                prompt, output_lang = self._build_ai_prompt()
+                template = self.report_template_id
+                system_prompt = (
+                    (template.ai_system_prompt or "").strip()
+                    if template
+                    else "You are a laboratory report interpretation assistant."
+                )
+            except Exception:
+                pass
+
+        self.write(
+            {
+                "ai_interpretation_state": "error",
+                "ai_interpretation_error": str(error),
+                "ai_interpretation_partial": False,
+                "ai_interpretation_updated_at": fields.Datetime.now(),
+            }
+        )
+        self._create_ai_history(
+            state="error",
+            trigger_source=trigger_source,
+            model_name=self._get_ai_provider_and_model()[1],
+            output_language=output_lang,
+            duration_ms=duration_ms,
+            system_prompt=system_prompt,
+            user_prompt=prompt,
+            error_text=str(error),
+        )
+
+    def _generate_ai_interpretation_internal(self):
+        self.ensure_one()
+        started = time.monotonic()
+        job = self._prepare_ai_request()
+        if not job:
+            return False
+        cached = self._cached_ai_result(job)
+        if cached:
+            return self._apply_ai_result(job, *cached, int((time.monotonic() - started) * 1000), cache_hit=True)
+
+        limiter = self.env["lab.ai.rate.limit"]
+        provider, limit_model = self._get_ai_provider_and_model()
+        estimate = estimate_ai_tokens(job)
+        wait = limiter._acquire(provider, limit_model, estimate)
+        if wait:
+            self._defer_ai_generation(wait, _("AI provider rate limit reached; generation was queued."))
+            return False
+
+        self.write(
+            {
+                "ai_interpretation_state": "running",
+                "ai_interpretation_error": False,
+            }
+        )
+
+        used_tokens = 0
+        try:
+            content, model_name, usage = self._call_ai_provider(
+                prompt=job["prompt"],
+                system_prompt=job["system_prompt"],
+                temperature=job["temperature"],
+            )
+            used_tokens = usage.get("total_tokens") or 0
+            duration_ms = int((time.monotonic() - started) * 1000)
+            return self._apply_ai_result(job, content, model_name, usage, duration_ms)
+        finally:
+            # Also when storing the answer fails: the provider call was made and the reservation must go.
+            limiter._settle(provider, limit_model, estimate, used_tokens)
+
     def action_generate_ai_interpretation(self):
         force = bool(self.env.context.get("force_ai_regenerate"))
         silent = bool(self.env.context.get("ai_silent"))
@@ -567,57 +1351,40 @@ class LabSample(models.Model):
             started = time.monotonic()
             try:
                 rec._generate_ai_interpretation_internal()
+            except AIRateLimitError as exc:
+                rec._defer_ai_generation(60, str(exc))
             except Exception as exc:
-                duration_ms = int((time.monotonic() - started) * 1000)
-                prompt = False
-                output_lang = False
-                system_prompt = False
-                try:
-                    prompt, output_lang = rec._build_ai_prompt()
-                    template = rec.report_template_id
-                    system_prompt = (
-                        (template.ai_system_prompt or "").strip()
-                        if template
-                        else "You are a laboratory report interpretation assistant."
-                    )
-                except Exception:
-                    pass
-
-                rec.write(
-                    {
-                        "ai_interpretation_state": "error",
-                        "ai_interpretation_error": str(exc),
-                        "ai_interpretation_updated_at": fields.Datetime.now(),
-                    }
-                )
-                rec._create_ai_history(
-                    state="error",
-                    trigger_source=trigger_source,
-                    model_name=rec._get_ai_provider_and_model()[1],
-                    output_language=output_lang,
-                    duration_ms=duration_ms,
-                    system_prompt=system_prompt,
-                    user_prompt=prompt,
-                    error_text=str(exc),
-                )
+                rec._apply_ai_failure(exc, int((time.monotonic() - started) * 1000), trigger_source)
                 if not silent:
                     raise
         return True
 
-    def action_queue_ai_interpretation(self, force=False, trigger_source="release"):
-        now = fields.Datetime.now()
-        for rec in self:
-            if rec.state not in ("verified", "reported"):
-                continue
-            if rec.ai_interpretation_state == "done" and rec.ai_interpretation_text and not force:
-                continue
-            rec.write(
+    def action_queue_ai_interpretation(self, force=False, trigger_source="release", priority=0):
+        """Queue generation; samples already queued or running are coalesced.
+
+        A waiting sample only has its priority raised. A positive ``priority``
+        wakes the queue worker right away.
+        """
+        targets = self.filtered(
+            lambda rec: rec.state in ("verified", "reported")
+            and rec.ai_interpretation_state not in ("queued", "running")
+            and (force or not (rec.ai_interpretation_state == "done" and rec.ai_interpretation_text))
+        )
+        waiting = self.filtered(lambda rec: rec.ai_interpretation_state == "queued" and rec.ai_queue_priority < priority)
+        if targets:
+            targets.write(
                 {
                     "ai_interpretation_state": "queued",
                     "ai_interpretation_error": False,
-                    "ai_interpretation_updated_at": now,
+                    "ai_interpretation_updated_at": fields.Datetime.now(),
+                    "ai_queue_priority": priority,
+                    "ai_queue_source": trigger_source or "manual",
                 }
             )
+        if waiting:
+            waiting.write({"ai_queue_priority": priority})
+        if priority > 0 and (targets or waiting):
+            self._schedule_ai_queue(0)
         return True
 
     def action_clear_ai_interpretation(self):
@@ -628,7 +1395,7 @@ class LabSample(models.Model):
                 "ai_interpretation_error": False,
                 "ai_interpretation_model": False,
                 "ai_interpretation_lang": False,
-                "ai_interpretation_prompt": False,
+                "ai_interpretation_prompt_blob_id": False,
                 "ai_interpretation_updated_at": False,
                 "ai_review_state": "none",
                 "ai_reviewed_by_id": False,
@@ -667,32 +1434,83 @@ class LabSample(models.Model):
                 }
             )
             rec._create_ai_review_log(action="rejected", note=rec.ai_review_note)
+            self.env["lab.ai.response.cache"]._forget([rec.ai_interpretation_text])
             rec._close_ai_review_activity()
             rec.message_post(body=_("AI interpretation rejected from portal/report display."))
         return True
 
     def action_release_report(self):
         result = super().action_release_report()
+        if not self._defer_release_followups():
+            self._start_release_ai_interpretation()
+        return result
+
+    def _run_release_followups(self):
+        super()._run_release_followups()
+        self._start_release_ai_interpretation()
+
+    def _start_release_ai_interpretation(self):
         config = self.env["ir.config_parameter"].sudo()
         async_on_release = (config.get_param("laboratory_management.ai_async_on_release", "1") or "1").strip()
         use_async = async_on_release not in ("0", "false", "False")
-        for rec in self:
-            template = rec.report_template_id
-            if not template or not template.ai_interpretation_enabled or not template.ai_auto_generate_on_release:
-                continue
-            if use_async:
-                rec.action_queue_ai_interpretation(force=True, trigger_source="release")
-            else:
-                rec.with_context(
-                    ai_silent=True,
-                    force_ai_regenerate=True,
-                    ai_trigger_source="release",
-                ).action_generate_ai_interpretation()
-        return result
+        targets = self.filtered(
+            lambda rec: rec.report_template_id
+            and rec.report_template_id.ai_interpretation_enabled
+            and rec.report_template_id.ai_auto_generate_on_release
+        )
+        if use_async:
+            targets.action_queue_ai_interpretation(force=True, trigger_source="release")
+            return
+        for rec in targets:
+            rec.with_context(
+                ai_silent=True,
+                force_ai_regenerate=True,
+                ai_trigger_source="release",
+            ).action_generate_ai_interpretation()
+
+    @api.model
+    def _ai_queue_time_budget(self):
+        """Seconds one queue run may take: the server's cron time limit when set."""
+        limit = odoo_config.get("limit_time_real_cron")
+        if limit is None or limit < 0:
+            limit = odoo_config.get("limit_time_real")
+        return limit if limit and limit > 0 else AI_QUEUE_TIME_BUDGET
+
+    @api.model
+    def _ai_call_worst_case(self, settings):
+        """Upper bound in seconds of one provider call including its retries."""
+        return settings["timeout"] * (settings["retries"] + 1) + AI_RETRY_BACKOFF_MAX * settings["retries"]
+
+    @api.model
+    def _reap_stale_ai_running(self):
+        """Re-queue samples left ``running`` by a queue run that died or was killed.
+
+        Samples are flagged ``running`` only when their provider call is
+        submitted, so one still running a minute after the slowest possible
+        call is orphaned.
+        """
+        lease = self._ai_call_worst_case(self._ai_request_settings()) + 60
+        stale = self.search(
+            [
+                ("ai_interpretation_state", "=", "running"),
+                ("ai_interpretation_updated_at", "<", fields.Datetime.now() - timedelta(seconds=lease)),
+            ]
+        )
+        if stale:
+            stale.write(
+                {
+                    "ai_interpretation_state": "queued",
+                    "ai_interpretation_partial": False,
+                    "ai_interpretation_error": _("Generation was interrupted and has been queued again."),
+                    "ai_interpretation_updated_at": fields.Datetime.now(),
+                }
+            )
+        return stale
 
     @api.model
     def _cron_process_ai_interpretation_queue(self):
         config = self.env["ir.config_parameter"].sudo()
+        self._reap_stale_ai_running()
         limit = int((config.get_param("laboratory_management.ai_queue_batch_size") or "50").strip())
         queued = self.search(
             [
@@ -700,14 +1518,201 @@ class LabSample(models.Model):
                 ("ai_interpretation_state", "=", "queued"),
             ],
             limit=limit,
-            order="ai_interpretation_updated_at asc, id asc",
+            order="ai_queue_priority desc, ai_interpretation_updated_at asc, id asc",
         )
-        for rec in queued:
-            rec.with_context(
-                ai_silent=True,
-                force_ai_regenerate=True,
-                ai_trigger_source="queue",
-            ).action_generate_ai_interpretation()
+        if queued:
+            queued.with_context(ai_trigger_source="queue")._drain_ai_queue()
+
+    def _drain_ai_queue(self):
+        """Generate interpretations for queued samples with a bounded thread pool.
+
+        Prompts are built in one short transaction; provider calls then run
+        concurrently in worker threads that never touch the cursor. Each
+        sample is flagged ``running`` when its call is submitted, and each
+        answer is written back and committed on its own as it arrives.
+        """
+        default_source = self.env.context.get("ai_trigger_source") or "queue"
+        jobs = []
+        for rec in self:
+            # Portal requests keep their source so the approval lock still applies.
+            trigger_source = "portal" if rec.ai_queue_source == "portal" else default_source
+            # Manual and portal regenerations ask for a new answer, not the cached one.
+            rec = rec.with_context(
+                ai_trigger_source=trigger_source,
+                ai_bypass_cache=rec.ai_queue_source in ("manual", "portal") and bool(rec.ai_interpretation_text),
+            )
+            try:
+                with self.env.cr.savepoint():
+                    job = rec._prepare_ai_request()
+                    cached = job and rec._cached_ai_result(job)
+                    if cached:
+                        rec._apply_ai_result(job, *cached, 0, cache_hit=True)
+                        continue
+            except Exception as exc:
+                rec._apply_ai_failure(exc, 0, trigger_source)
+                continue
+            if job:
+                jobs.append((rec, job))
+            else:
+                # Interpretation disabled on the template meanwhile: leave the queue.
+                rec.write(
+                    {
+                        "ai_interpretation_state": "done" if rec.ai_interpretation_text else "none",
+                        "ai_queue_priority": 0,
+                    }
+                )
+        if not jobs:
+            self._commit_ai_progress()
+            return
+
+        # Samples sharing a cache key wait for a single provider call.
+        waiting = {}
+        for rec, job in jobs:
+            waiting.setdefault(job["cache_key"] or ("sample", rec.id), []).append((rec, job))
+
+        # Calls over the rate limit or daily budget stay queued for a later run.
+        settings = self._ai_request_settings()
+        provider, model_name = settings["provider"], settings["model"]
+        limiter = self.env["lab.ai.rate.limit"]
+        granted = {}
+        for key, group in waiting.items():
+            job = group[0][1]
+            job["estimated_tokens"] = estimate_ai_tokens(job)
+            wait = limiter._acquire(provider, model_name, job["estimated_tokens"])
+            if wait:
+                self._schedule_ai_queue(wait)
+                break
+            granted[key] = group
+        waiting = granted
+        if not waiting:
+            self._commit_ai_progress()
+            return
+
+        workers = min(self._ai_queue_concurrency(provider), len(waiting))
+        self._commit_ai_progress()
+
+        # Calls are submitted one worker slot at a time and, after the first
+        # wave, only while they can still finish inside the cron time limit;
+        # the rest stay queued for the next run. A sample is flagged running
+        # (the lease checked by _reap_stale_ai_running) when submitted.
+        deadline = time.monotonic() + self._ai_queue_time_budget()
+        pending = list(waiting.values())
+        submitted = 0
+
+        def out_of_time():
+            # The first wave always goes out so every run makes progress.
+            return submitted >= workers and time.monotonic() + settings["timeout"] > deadline
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lab-ai") as pool:
+            futures = {}
+            while pending or futures:
+                while pending and len(futures) < workers and not out_of_time():
+                    group = pending.pop(0)
+                    submitted += 1
+                    self.browse([rec.id for rec, _job in group]).write(
+                        {
+                            "ai_interpretation_state": "running",
+                            "ai_interpretation_error": False,
+                            "ai_queue_priority": 0,
+                            "ai_interpretation_updated_at": fields.Datetime.now(),
+                        }
+                    )
+                    self._commit_ai_progress()
+                    job = group[0][1]
+                    future = pool.submit(
+                        self._timed_ai_completion,
+                        settings,
+                        prompt=job["prompt"],
+                        system_prompt=job["system_prompt"],
+                        temperature=job["temperature"],
+                        on_progress=self._ai_progress_writer([rec.id for rec, _job in group]) if settings["stream"] else None,
+                    )
+                    futures[future] = group
+                if pending and out_of_time():
+                    # Out of time for new calls: hand back their reservations.
+                    for group in pending:
+                        limiter._settle(provider, model_name, group[0][1]["estimated_tokens"], 0)
+                    pending = []
+                    self._schedule_ai_queue(0)
+                done, _running = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    duration_ms, outcome, error = future.result()
+                    group = futures.pop(future)
+                    used_tokens = (outcome[2].get("total_tokens") or 0) if outcome else 0
+                    for index, (rec, job) in enumerate(group):
+                        try:
+                            with self.env.cr.savepoint():
+                                if error is not None:
+                                    raise error
+                                rec._apply_ai_result(job, *outcome, duration_ms, cache_hit=bool(index))
+                        except AIRateLimitError as exc:
+                            rec._defer_ai_generation(60, str(exc))
+                        except Exception as exc:
+                            rec._apply_ai_failure(exc, duration_ms, job["trigger_source"], job=job)
+                    self._commit_ai_progress()
+                    # Usage is committed in the history now; release the reservation.
+                    limiter._settle(provider, model_name, group[0][1]["estimated_tokens"], used_tokens)
+
+    @staticmethod
+    def _timed_ai_completion(settings, **request):
+        """Worker-thread wrapper returning ``(duration_ms, result, error)``."""
+        started = time.monotonic()
+        try:
+            result = request_ai_completion(settings, **request)
+        except Exception as exc:
+            return int((time.monotonic() - started) * 1000), None, exc
+        return int((time.monotonic() - started) * 1000), result, None
+
+    def _defer_ai_generation(self, wait_seconds, reason):
+        """Put samples back in the queue instead of failing them when a limit is hit."""
+        self.write(
+            {
+                "ai_interpretation_state": "queued",
+                "ai_interpretation_partial": False,
+                "ai_interpretation_error": reason,
+                "ai_interpretation_updated_at": fields.Datetime.now(),
+            }
+        )
+        self._schedule_ai_queue(wait_seconds)
+
+    @api.model
+    def _schedule_ai_queue(self, wait_seconds):
+        cron = self.env.ref("laboratory_management.ir_cron_lab_ai_interpretation_queue", raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(fields.Datetime.now() + timedelta(seconds=int(wait_seconds) + 1))
+
+    def _ai_progress_writer(self, sample_ids):
+        """Return a worker-thread callback saving streamed text on its own cursor.
+
+        Writes are throttled and committed immediately so the form shows the
+        answer growing; the queue worker holds no lock on these rows while the
+        provider call runs. Skipped under tests, which share one cursor.
+        """
+        if getattr(threading.current_thread(), "testing", False):
+            return None
+        registry = self.env.registry
+        last_write = [0.0]
+
+        def write_progress(text):
+            now = time.monotonic()
+            if now - last_write[0] < AI_PROGRESS_INTERVAL:
+                return
+            last_write[0] = now
+            with registry.cursor() as cr:
+                cr.execute(
+                    """
+                    UPDATE lab_sample
+                       SET ai_interpretation_partial = %s
+                     WHERE id = ANY(%s) AND ai_interpretation_state = 'running'
+                    """,
+                    [text, sample_ids],
+                )
+
+        return write_progress
+
+    def _commit_ai_progress(self):
+        if not getattr(threading.current_thread(), "testing", False):
+            self.env.cr.commit()
 
     @api.model
     def _cron_retry_ai_interpretation_errors(self):
@@ -732,25 +1737,39 @@ class LabSample(models.Model):
                 ai_trigger_source="cron",
             ).action_generate_ai_interpretation()
 
-    def _dump_ai_history_json(self, limit=20):
+    def _dump_ai_history_json(self, limit=20, include_bodies=False):
+        """Serialise the latest history rows; prompt/response bodies are only read on request."""
         self.ensure_one()
+        columns = [
+            "state",
+            "trigger_source",
+            "model_name",
+            "output_language",
+            "duration_ms",
+            "prompt_tokens",
+            "completion_tokens",
+            "total_tokens",
+            "generated_at",
+            "error_text",
+        ]
+        if include_bodies:
+            columns += list(AI_HISTORY_BODY_FIELDS.values())
+        rows = self.env["lab.sample.ai.interpretation"].search_read(
+            [("sample_id", "=", self.id)], columns, limit=limit, load=None
+        )
+        texts = {}
+        if include_bodies:
+            blob_ids = {row[blob_field] for row in rows for blob_field in AI_HISTORY_BODY_FIELDS.values()}
+            texts = self.env["lab.ai.content.blob"].browse([blob_id for blob_id in blob_ids if blob_id])._texts()
         data = []
-        for line in self.ai_interpretation_history_ids[:limit]:
-            data.append(
-                {
-                    "id": line.id,
-                    "state": line.state,
-                    "trigger_source": line.trigger_source,
-                    "model_name": line.model_name,
-                    "output_language": line.output_language,
-                    "duration_ms": line.duration_ms,
-                    "prompt_tokens": line.prompt_tokens,
-                    "completion_tokens": line.completion_tokens,
-                    "total_tokens": line.total_tokens,
-                    "generated_at": line.generated_at.isoformat() if line.generated_at else None,
-                    "error_text": line.error_text,
-                }
-            )
+        for row in rows:
+            entry = {"id": row["id"]}
+            entry.update({column: row[column] for column in columns if column not in AI_HISTORY_BODY_FIELDS.values()})
+            entry["generated_at"] = row["generated_at"].isoformat() if row["generated_at"] else None
+            if include_bodies:
+                for body_field, blob_field in AI_HISTORY_BODY_FIELDS.items():
+                    entry[body_field] = texts.get(row[blob_field])
+            data.append(entry)
         return json.dumps(data, ensure_ascii=False, indent=2)
 
 
@@ -805,11 +1824,50 @@ class ResConfigSettingsAI(models.TransientModel):
         config_parameter="laboratory_management.ollama_base_url",
         default="http://127.0.0.1:11434/api/chat",
     )
+    lab_openai_concurrency = fields.Integer(
+        string="OpenAI Concurrent Requests",
+        config_parameter="laboratory_management.openai_concurrency",
+        default=4,
+    )
+    lab_openai_compatible_concurrency = fields.Integer(
+        string="OpenAI-Compatible Concurrent Requests",
+        config_parameter="laboratory_management.openai_compatible_concurrency",
+        default=4,
+    )
+    lab_ollama_concurrency = fields.Integer(
+        string="Ollama Concurrent Requests",
+        config_parameter="laboratory_management.ollama_concurrency",
+        default=1,
+    )
     lab_ai_timeout_seconds = fields.Integer(
         string="AI Request Timeout (seconds)",
         config_parameter="laboratory_management.ai_timeout_seconds",
         default=120,
     )
+    lab_ai_max_retries = fields.Integer(
+        string="AI Request Retries",
+        config_parameter="laboratory_management.ai_max_retries",
+        default=2,
+    )
+    lab_ai_stream_enabled = fields.Boolean(
+        string="Stream AI Responses",
+        config_parameter="laboratory_management.ai_stream_enabled",
+    )
+    lab_ai_requests_per_minute = fields.Integer(
+        string="AI Requests per Minute",
+        config_parameter="laboratory_management.ai_requests_per_minute",
+        help="Shared limit per provider and model; 0 disables it.",
+    )
+    lab_ai_tokens_per_minute = fields.Integer(
+        string="AI Tokens per Minute",
+        config_parameter="laboratory_management.ai_tokens_per_minute",
+        help="Shared limit per provider and model; 0 disables it.",
+    )
+    lab_ai_daily_token_budget = fields.Integer(
+        string="AI Daily Token Budget",
+        config_parameter="laboratory_management.ai_daily_token_budget",
+        help="Prompt plus completion tokens allowed per model and day; 0 disables it.",
+    )
     lab_ai_retry_enabled = fields.Boolean(
         string="Retry Failed AI Interpretation Jobs",
         config_parameter="laboratory_management.ai_retry_enabled",
@@ -830,6 +1888,21 @@ class ResConfigSettingsAI(models.TransientModel):
         config_parameter="laboratory_management.ai_queue_batch_size",
         default=50,
     )
+    lab_ai_cache_enabled = fields.Boolean(
+        string="Cache Identical AI Prompts",
+        config_parameter="laboratory_management.ai_cache_enabled",
+        default=True,
+    )
+    lab_ai_cache_ttl_hours = fields.Integer(
+        string="AI Cache Lifetime (hours)",
+        config_parameter="laboratory_management.ai_cache_ttl_hours",
+        default=168,
+    )
+    lab_ai_cache_max_entries = fields.Integer(
+        string="AI Cache Size",
+        config_parameter="laboratory_management.ai_cache_max_entries",
+        default=5000,
+    )
     lab_report_pdf_cache_on_release = fields.Boolean(
         string="Cache Report PDF on Release",
         config_parameter="laboratory_management.report_pdf_cache_on_release",
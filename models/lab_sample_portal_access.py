@@ -0,0 +1,142 @@
+from odoo import api, fields, models
+
+
+class LabSamplePortalAccess(models.Model):
+    """Lookup index of the partners that may list a sample on the portal and the external API.
+
+    A row links a sample to its client, its requester and every ancestor of
+    both, i.e. the partners for which the ``child_of`` domain on
+    ``client_id`` / ``request_id.requester_partner_id`` matches. Listings and
+    counters use it to narrow the candidate rows; the ``child_of`` domain
+    stays the authorization, so a stale row (partner merge, direct SQL) never
+    grants access on its own.
+    """
+
+    _name = "lab.sample.portal.access"
+    _description = "Laboratory Sample Portal Access"
+    _log_access = False
+
+    partner_id = fields.Many2one("res.partner", required=True, readonly=True, ondelete="cascade")
+    sample_id = fields.Many2one("lab.sample", required=True, readonly=True, ondelete="cascade", index=True)
+
+    _partner_sample_uniq = models.Constraint(
+        "unique(partner_id, sample_id)",
+        "A partner is granted access to a sample only once.",
+    )
+
+    def init(self):
+        self.env.cr.execute("SELECT 1 FROM lab_sample_portal_access LIMIT 1")
+        if self.env.cr.fetchone():
+            return
+        self.env.cr.execute("SELECT id FROM lab_sample")
+        sample_ids = [row[0] for row in self.env.cr.fetchall()]
+        for start in range(0, len(sample_ids), 10000):
+            self._refresh_samples(sample_ids[start:start + 10000])
+
+    @api.model
+    def _refresh_samples(self, sample_ids):
+        """Recompute the access rows of ``sample_ids`` from their client and requester."""
+        if not sample_ids:
+            return
+        self.env["lab.sample"].flush_model(["client_id", "request_id"])
+        self.env["lab.test.request"].flush_model(["requester_partner_id"])
+        self.env["res.partner"].flush_model(["parent_id"])
+        sample_ids = list(sample_ids)
+        self.env.cr.execute("DELETE FROM lab_sample_portal_access WHERE sample_id = ANY(%s)", [sample_ids])
+        self.env.cr.execute(
+            """
+            WITH RECURSIVE owner(sample_id, partner_id) AS (
+                SELECT s.id, s.client_id
+                  FROM lab_sample s
+                 WHERE s.id = ANY(%(ids)s) AND s.client_id IS NOT NULL
+                 UNION
+                SELECT s.id, r.requester_partner_id
+                  FROM lab_sample s
+                  JOIN lab_test_request r ON r.id = s.request_id
+                 WHERE s.id = ANY(%(ids)s) AND r.requester_partner_id IS NOT NULL
+                 UNION
+                SELECT o.sample_id, p.parent_id
+                  FROM owner o
+                  JOIN res_partner p ON p.id = o.partner_id
+                 WHERE p.parent_id IS NOT NULL
+            )
+            INSERT INTO lab_sample_portal_access (partner_id, sample_id)
+            SELECT partner_id, sample_id FROM owner
+            ON CONFLICT DO NOTHING
+            """,
+            {"ids": sample_ids},
+        )
+        self.invalidate_model()
+        self.env["lab.sample"].invalidate_model(["portal_access_ids"])
+
+
+class LabSample(models.Model):
+    _inherit = "lab.sample"
+
+    portal_access_ids = fields.One2many("lab.sample.portal.access", "sample_id", readonly=True)
+
+    def _portal_counter_partners(self):
+        return self.sudo().mapped("client_id") | self.sudo().mapped("request_id.requester_partner_id")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env["lab.sample.portal.access"]._refresh_samples(records.ids)
+        self.env["lab.portal.counter"]._invalidate_partners(records._portal_counter_partners())
+        return records
+
+    def write(self, vals):
+        counted = vals.keys() & {"state", "report_publication_state", "client_id", "request_id", "company_id"}
+        partners = self._portal_counter_partners() if counted else None
+        res = super().write(vals)
+        if "client_id" in vals or "request_id" in vals:
+            self.env["lab.sample.portal.access"]._refresh_samples(self.ids)
+        if counted:
+            self.env["lab.portal.counter"]._invalidate_partners(partners | self._portal_counter_partners())
+        return res
+
+
+class LabTestRequest(models.Model):
+    _inherit = "lab.test.request"
+
+    def _portal_counter_partners(self):
+        return self.sudo().mapped("requester_partner_id") | self.sudo().mapped("client_partner_id")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env["lab.portal.counter"]._invalidate_partners(records._portal_counter_partners())
+        return records
+
+    def write(self, vals):
+        counted = vals.keys() & {"state", "requester_partner_id", "client_partner_id", "company_id"}
+        partners = self._portal_counter_partners() if counted else None
+        res = super().write(vals)
+        if "requester_partner_id" in vals:
+            samples = self.env["lab.sample"].sudo().search([("request_id", "in", self.ids)])
+            self.env["lab.sample.portal.access"]._refresh_samples(samples.ids)
+        if counted:
+            # Request changes also move the counters of the request's samples and invoices.
+            self.env["lab.portal.counter"]._invalidate_partners(partners | self._portal_counter_partners())
+        return res
+
+
+class LabRequestInvoice(models.Model):
+    _inherit = "lab.request.invoice"
+
+    def _portal_counter_partners(self):
+        return self.sudo().mapped("request_id")._portal_counter_partners()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env["lab.portal.counter"]._invalidate_partners(records._portal_counter_partners())
+        return records
+
+    def write(self, vals):
+        counted = vals.keys() & {"state", "request_id", "company_id"}
+        partners = self._portal_counter_partners() if counted else None
+        res = super().write(vals)
+        if counted:
+            self.env["lab.portal.counter"]._invalidate_partners(partners | self._portal_counter_partners())
+        return res
@@ -176,8 +176,9 @@ class LabSample(models.Model):
         "company_id",
     )
     def _compute_iso_release_gate(self):
+        blockers_by_sample = self._get_iso15189_release_blockers_batch()
         for rec in self:
-            blockers = rec._get_iso15189_release_blockers()
+            blockers = blockers_by_sample[rec.id]
             rec.iso_release_ready = not blockers
             rec.iso_release_block_reason = "\n".join("- %s" % item for item in blockers) if blockers else False
 
@@ -206,177 +207,192 @@ class LabSample(models.Model):
         ).strip()
         return value not in ("0", "false", "False")
 
-    def _find_missing_service_authorizations(self, user, services, role):
-        self.ensure_one()
-        if not user or not services:
-            return services
-        auths = self.env["lab.service.authorization"].search(
-            [
-                ("user_id", "=", user.id),
-                ("service_id", "in", services.ids),
-                ("role", "=", role),
-                ("is_currently_authorized", "=", True),
-            ]
-        )
-        authorized_service_ids = set(auths.mapped("service_id").ids)
-        return services.filtered(lambda s: s.id not in authorized_service_ids)
-
     def _get_iso15189_release_blockers(self):
         self.ensure_one()
-        if not self._iso_release_gate_enabled():
-            return []
-        blockers = []
-        analyses = self.analysis_ids.filtered(lambda x: x.state != "rejected")
-        if not analyses:
-            blockers.append(_("No active analyses found for release."))
-            return blockers
+        return self._get_iso15189_release_blockers_batch()[self.id]
 
-        if self.state != "verified":
-            blockers.append(_("Sample is not in verified state."))
+    def _get_iso15189_release_blockers_batch(self):
+        """Return ``{sample_id: [blocker, ...]}`` for the whole recordset.
 
-        if analyses.filtered(lambda x: x.state != "verified"):
-            blockers.append(_("All active analyses must be verified before release."))
+        Authorizations, current QC, method validations, open nonconformances
+        and blocking change controls are read once for every sample instead
+        of per analysis, so releasing large batches stays a handful of queries.
+        """
+        result = {rec.id: [] for rec in self}
+        if not self._iso_release_gate_enabled():
+            return result
+        personnel_check = self._iso_personnel_authorization_enabled()
+        today = fields.Date.today()
+        analyses_by_sample = {rec.id: rec.analysis_ids.filtered(lambda x: x.state != "rejected") for rec in self}
+        all_analyses = self.env["lab.sample.analysis"].concat(*analyses_by_sample.values())
+        all_services = all_analyses.mapped("service_id")
+
+        authorized = set()
+        if personnel_check and all_analyses:
+            users = all_analyses.mapped("analyst_id") | self.mapped("technical_reviewer_id") | self.mapped("medical_reviewer_id")
+            for auth in self.env["lab.service.authorization"].search_read(
+                [
+                    ("user_id", "in", users.ids),
+                    ("service_id", "in", all_services.ids),
+                    ("role", "in", ("analyst", "technical_reviewer", "medical_reviewer")),
+                    ("is_currently_authorized", "=", True),
+                ],
+                ["user_id", "service_id", "role"],
+            ):
+                authorized.add((auth["user_id"][0], auth["service_id"][0], auth["role"]))
 
-        if analyses.filtered(lambda x: not x.analyst_id):
-            blockers.append(_("Analyst assignment is required for all analyses."))
+        latest_qc = self.env["lab.qc.status"]._latest_runs(all_services.filtered("require_qc").ids)
 
-        if self._iso_personnel_authorization_enabled():
-            for analysis in analyses.filtered(lambda x: x.analyst_id):
-                authorized = self.env["lab.service.authorization"].search_count(
-                    [
-                        ("user_id", "=", analysis.analyst_id.id),
-                        ("service_id", "=", analysis.service_id.id),
-                        ("role", "=", "analyst"),
-                        ("is_currently_authorized", "=", True),
-                    ]
+        validations_by_service = {}
+        validation_services = all_services.filtered("require_method_validation")
+        if validation_services:
+            for validation in self.env["lab.method.validation"].search(
+                [
+                    ("service_id", "in", validation_services.ids),
+                    ("is_active_for_release", "=", True),
+                ]
+            ):
+                validations_by_service.setdefault(validation.service_id.id, self.env["lab.method.validation"])
+                validations_by_service[validation.service_id.id] |= validation
+
+        open_ncr_sample_ids = set()
+        if self.ids:
+            open_ncr_sample_ids = {
+                row["sample_id"][0]
+                for row in self.env["lab.nonconformance"].search_read(
+                    [("sample_id", "in", self.ids), ("state", "not in", ("closed", "cancel"))],
+                    ["sample_id"],
                 )
-                if not authorized:
-                    blockers.append(
-                        _("No active analyst authorization for %(user)s on service %(service)s.")
-                        % {"user": analysis.analyst_id.name, "service": analysis.service_id.name}
-                    )
-            if self.technical_review_state == "approved" and self.technical_reviewer_id:
-                analyst_conflict = analyses.filtered(lambda x: x.analyst_id.id == self.technical_reviewer_id.id)
-                if analyst_conflict:
-                    blockers.append(
-                        _("Technical reviewer %(user)s also performed analysis on one or more released services.")
-                        % {"user": self.technical_reviewer_id.name}
-                    )
-            if self.medical_review_state == "approved" and self.medical_reviewer_id:
-                analyst_conflict = analyses.filtered(lambda x: x.analyst_id.id == self.medical_reviewer_id.id)
-                if analyst_conflict:
-                    blockers.append(
-                        _("Medical reviewer %(user)s also performed analysis on one or more released services.")
-                        % {"user": self.medical_reviewer_id.name}
-                    )
+                if row["sample_id"]
+            }
 
-        missing_reagent = analyses.filtered(
-            lambda x: x.service_id.require_reagent_lot and not x.reagent_lot_id
-        )
-        if missing_reagent:
-            blockers.append(_("Required reagent lot is missing for one or more analyses."))
+        change_obj = self.env["lab.change.control"]
+        blocking_changes = change_obj.search(change_obj._release_blocking_domain(self.mapped("company_id")))
 
-        expired_reagent = analyses.filtered(
-            lambda x: x.reagent_lot_id and x.reagent_lot_id.is_expired
-        )
-        if expired_reagent:
-            blockers.append(_("Expired reagent lot detected in analysis records."))
-
-        # Check QC readiness by unique service to avoid repeated queries on same assay.
-        qc_required_services = analyses.filtered(lambda x: x.service_id.require_qc).mapped("service_id")
-        for service in qc_required_services:
-            qc = self.env["lab.qc.run"].search(
-                [("service_id", "=", service.id)],
-                order="run_date desc, id desc",
-                limit=1,
-            )
-            if not qc:
-                blockers.append(
-                    _("QC required but no QC run found for service %(service)s.")
-                    % {"service": service.name}
-                )
+        for rec in self:
+            blockers = result[rec.id]
+            analyses = analyses_by_sample[rec.id]
+            if not analyses:
+                blockers.append(_("No active analyses found for release."))
                 continue
-            if qc.status != "pass":
-                blockers.append(
-                    _("Latest QC for service %(service)s is not pass (status: %(status)s).")
-                    % {"service": service.name, "status": qc.status}
-                )
 
-        pending_manual = analyses.filtered(lambda x: x.needs_manual_review)
-        if pending_manual:
-            blockers.append(_("Manual review is still required for one or more analyses."))
+            if rec.state != "verified":
+                blockers.append(_("Sample is not in verified state."))
 
-        if self._iso_personnel_authorization_enabled():
-            services = analyses.mapped("service_id")
-            if self.technical_review_state == "approved" and self.technical_reviewer_id:
-                missing = self._find_missing_service_authorizations(
-                    user=self.technical_reviewer_id,
-                    services=services,
-                    role="technical_reviewer",
-                )
-                for service in missing:
-                    blockers.append(
-                        _(
-                            "No active technical reviewer authorization for %(user)s on service %(service)s."
+            if analyses.filtered(lambda x: x.state != "verified"):
+                blockers.append(_("All active analyses must be verified before release."))
+
+            if analyses.filtered(lambda x: not x.analyst_id):
+                blockers.append(_("Analyst assignment is required for all analyses."))
+
+            if personnel_check:
+                for analysis in analyses.filtered(lambda x: x.analyst_id):
+                    if (analysis.analyst_id.id, analysis.service_id.id, "analyst") not in authorized:
+                        blockers.append(
+                            _("No active analyst authorization for %(user)s on service %(service)s.")
+                            % {"user": analysis.analyst_id.name, "service": analysis.service_id.name}
+                        )
+                if rec.technical_review_state == "approved" and rec.technical_reviewer_id:
+                    analyst_conflict = analyses.filtered(lambda x: x.analyst_id.id == rec.technical_reviewer_id.id)
+                    if analyst_conflict:
+                        blockers.append(
+                            _("Technical reviewer %(user)s also performed analysis on one or more released services.")
+                            % {"user": rec.technical_reviewer_id.name}
                         )
-                        % {"user": self.technical_reviewer_id.name, "service": service.name}
+                if rec.medical_review_state == "approved" and rec.medical_reviewer_id:
+                    analyst_conflict = analyses.filtered(lambda x: x.analyst_id.id == rec.medical_reviewer_id.id)
+                    if analyst_conflict:
+                        blockers.append(
+                            _("Medical reviewer %(user)s also performed analysis on one or more released services.")
+                            % {"user": rec.medical_reviewer_id.name}
+                        )
+
+            missing_reagent = analyses.filtered(
+                lambda x: x.service_id.require_reagent_lot and not x.reagent_lot_id
+            )
+            if missing_reagent:
+                blockers.append(_("Required reagent lot is missing for one or more analyses."))
+
+            expired_reagent = analyses.filtered(
+                lambda x: x.reagent_lot_id and x.reagent_lot_id.is_expired
+            )
+            if expired_reagent:
+                blockers.append(_("Expired reagent lot detected in analysis records."))
+
+            # Check QC readiness per unique service from the maintained current QC status table.
+            for service in analyses.filtered(lambda x: x.service_id.require_qc).mapped("service_id"):
+                qc = latest_qc.get(service.id)
+                if not qc:
+                    blockers.append(
+                        _("QC required but no QC run found for service %(service)s.")
+                        % {"service": service.name}
                     )
-            if self.medical_review_state == "approved" and self.medical_reviewer_id:
-                missing = self._find_missing_service_authorizations(
-                    user=self.medical_reviewer_id,
-                    services=services,
-                    role="medical_reviewer",
-                )
-                for service in missing:
+                    continue
+                if qc.status != "pass":
                     blockers.append(
-                        _("No active medical reviewer authorization for %(user)s on service %(service)s.")
-                        % {"user": self.medical_reviewer_id.name, "service": service.name}
+                        _("Latest QC for service %(service)s is not pass (status: %(status)s).")
+                        % {"service": service.name, "status": qc.status}
                     )
 
-        required_validation_services = analyses.mapped("service_id").filtered(lambda s: s.require_method_validation)
-        if required_validation_services:
-            active_validations = self.env["lab.method.validation"].search(
-                [
-                    ("service_id", "in", required_validation_services.ids),
-                    ("is_active_for_release", "=", True),
-                ]
-            )
-            validated_service_ids = set(active_validations.mapped("service_id").ids)
-            missing = required_validation_services.filtered(lambda s: s.id not in validated_service_ids)
-            for service in missing:
-                blockers.append(
-                    _("No active approved method validation found for service %(service)s.")
-                    % {"service": service.name}
+            pending_manual = analyses.filtered(lambda x: x.needs_manual_review)
+            if pending_manual:
+                blockers.append(_("Manual review is still required for one or more analyses."))
+
+            services = analyses.mapped("service_id")
+            if personnel_check:
+                if rec.technical_review_state == "approved" and rec.technical_reviewer_id:
+                    for service in services:
+                        if (rec.technical_reviewer_id.id, service.id, "technical_reviewer") in authorized:
+                            continue
+                        blockers.append(
+                            _(
+                                "No active technical reviewer authorization for %(user)s on service %(service)s."
+                            )
+                            % {"user": rec.technical_reviewer_id.name, "service": service.name}
+                        )
+                if rec.medical_review_state == "approved" and rec.medical_reviewer_id:
+                    for service in services:
+                        if (rec.medical_reviewer_id.id, service.id, "medical_reviewer") in authorized:
+                            continue
+                        blockers.append(
+                            _("No active medical reviewer authorization for %(user)s on service %(service)s.")
+                            % {"user": rec.medical_reviewer_id.name, "service": service.name}
+                        )
+
+            required_validation_services = services.filtered(lambda s: s.require_method_validation)
+            if required_validation_services:
+                for service in required_validation_services:
+                    if service.id not in validations_by_service:
+                        blockers.append(
+                            _("No active approved method validation found for service %(service)s.")
+                            % {"service": service.name}
+                        )
+                active_validations = self.env["lab.method.validation"].concat(
+                    *(validations_by_service.get(service.id, self.env["lab.method.validation"]) for service in required_validation_services)
                 )
-            stale_validations = active_validations.filtered(
-                lambda v: v.next_review_date and v.next_review_date < fields.Date.today()
-            )
-            for validation in stale_validations:
-                blockers.append(
-                    _("Method validation %(validation)s for service %(service)s is overdue for review.")
-                    % {"validation": validation.name, "service": validation.service_id.name}
+                stale_validations = active_validations.filtered(
+                    lambda v: v.next_review_date and v.next_review_date < today
                 )
+                for validation in stale_validations:
+                    blockers.append(
+                        _("Method validation %(validation)s for service %(service)s is overdue for review.")
+                        % {"validation": validation.name, "service": validation.service_id.name}
+                    )
 
-        open_ncr = self.env["lab.nonconformance"].search_count(
-            [
-                ("sample_id", "=", self.id),
-                ("state", "not in", ("closed", "cancel")),
-            ]
-        )
-        if open_ncr:
-            blockers.append(_("Open nonconformance records exist for this sample."))
+            if rec.id in open_ncr_sample_ids:
+                blockers.append(_("Open nonconformance records exist for this sample."))
 
-        active_changes = self.env["lab.change.control"]._find_active_release_blocking_changes(
-            company=self.company_id,
-            services=analyses.mapped("service_id"),
-            report_template=self.report_template_id,
-        )
-        if active_changes:
-            blockers.append(
-                _("Release is blocked by active change controls: %(changes)s.")
-                % {"changes": ", ".join(active_changes.mapped("name"))}
+            active_changes = blocking_changes._filter_release_blocking(
+                company=rec.company_id,
+                services=services,
+                report_template=rec.report_template_id,
             )
-        return blockers
+            if active_changes:
+                blockers.append(
+                    _("Release is blocked by active change controls: %(changes)s.")
+                    % {"changes": ", ".join(active_changes.mapped("name"))}
+                )
+        return result
 
     def _create_review_log(self, stage, action, note=None):
         self.ensure_one()
@@ -598,54 +614,52 @@ class LabSample(models.Model):
 
     def _create_default_dispatches(self):
         dispatch_obj = self.env["lab.report.dispatch"]
+        existing = set()
+        if self.ids:
+            for row in dispatch_obj.search_read(
+                [
+                    ("sample_id", "in", self.ids),
+                    ("channel", "in", ("portal", "email")),
+                    ("state", "!=", "cancel"),
+                ],
+                ["sample_id", "partner_id", "channel"],
+            ):
+                existing.add((row["sample_id"][0], row["partner_id"][0] if row["partner_id"] else False, row["channel"]))
+        vals_list = []
         for rec in self:
             partners = (rec.patient_id.partner_id | rec.client_id).filtered(lambda p: p)
-            partners = partners.filtered(lambda p: p)
-            if not partners:
-                continue
             for partner in partners:
-                portal_exists = dispatch_obj.search_count(
-                    [
-                        ("sample_id", "=", rec.id),
-                        ("partner_id", "=", partner.id),
-                        ("channel", "=", "portal"),
-                        ("state", "!=", "cancel"),
-                    ]
-                )
-                if not portal_exists:
-                    dispatch_obj.create(
-                        {
-                            "sample_id": rec.id,
-                            "partner_id": partner.id,
-                            "channel": "portal",
-                        }
-                    )
+                if (rec.id, partner.id, "portal") not in existing:
+                    existing.add((rec.id, partner.id, "portal"))
+                    vals_list.append({"sample_id": rec.id, "partner_id": partner.id, "channel": "portal"})
 
                 partner_email = (partner.email or partner.commercial_partner_id.email or "").strip()
                 if not partner_email:
                     continue
-                email_exists = dispatch_obj.search_count(
-                    [
-                        ("sample_id", "=", rec.id),
-                        ("partner_id", "=", partner.id),
-                        ("channel", "=", "email"),
-                        ("state", "!=", "cancel"),
-                    ]
-                )
-                if not email_exists:
-                    dispatch_obj.create(
-                        {
-                            "sample_id": rec.id,
-                            "partner_id": partner.id,
-                            "channel": "email",
-                        }
-                    )
+                if (rec.id, partner.id, "email") not in existing:
+                    existing.add((rec.id, partner.id, "email"))
+                    vals_list.append({"sample_id": rec.id, "partner_id": partner.id, "channel": "email"})
+        if vals_list:
+            dispatch_obj.create(vals_list)
+
+    def _send_release_dispatches(self):
+        self._create_default_dispatches()
+        self.dispatch_ids.filtered(lambda d: d.state == "draft").action_mark_sent()
+
+    @api.model
+    def _release_followup_domain(self):
+        return super()._release_followup_domain() + [("report_publication_state", "=", "active")]
+
+    def _run_release_followups(self):
+        super()._run_release_followups()
+        self._send_release_dispatches()
 
     def action_release_report(self):
+        blockers_by_sample = self._get_iso15189_release_blockers_batch()
         for rec in self:
             if rec.review_required_for_release and not rec.review_release_ready:
                 raise UserError(rec.review_block_reason or _("Dual review is not complete."))
-            blockers = rec._get_iso15189_release_blockers()
+            blockers = blockers_by_sample[rec.id]
             if blockers:
                 raise UserError(
                     _("ISO15189 release gate blocked:\n- %s")
@@ -661,8 +675,8 @@ class LabSample(models.Model):
                 "report_withdraw_input": False,
             }
         )
-        self._create_default_dispatches()
-        self.dispatch_ids.filtered(lambda d: d.state == "draft").action_mark_sent()
+        if not self._defer_release_followups():
+            self._send_release_dispatches()
         return result
 
     def action_withdraw_report(self):
@@ -680,6 +694,7 @@ class LabSample(models.Model):
                     "report_withdrawn_reason": reason,
                     "report_withdrawn_by_id": self.env.user.id,
                     "report_withdrawn_at": fields.Datetime.now(),
+                    "release_followup_pending": False,
                 }
             )
             rec.dispatch_ids.filtered(lambda d: d.state != "cancel").action_cancel_dispatch()
@@ -701,6 +716,7 @@ class LabSample(models.Model):
                     "report_revision": rec.report_revision + 1,
                     "is_amended": True,
                     "report_withdraw_input": False,
+                    "release_followup_pending": False,
                 }
             )
             rec._set_review_pending("technical")
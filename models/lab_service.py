@@ -1,5 +1,18 @@
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+
+AUTO_VERIFY_PROGRAM_FIELDS = {
+    "result_type",
+    "require_qc",
+    "auto_verify_enabled",
+    "auto_verify_allow_out_of_range",
+    "auto_verify_require_qc_pass",
+    "auto_verify_rule_ids",
+}
+REFERENCE_INTERVAL_FIELDS = {"ref_min", "ref_max", "critical_min", "critical_max", "reference_interval_ids"}
+# Sequence values are never handed out twice, even by rolled back transactions.
+RULE_REVISION_SEQUENCE = "lab_service_rule_revision_seq"
 
 
 class LabService(models.Model):
@@ -33,6 +46,23 @@ class LabService(models.Model):
     auto_verify_enabled = fields.Boolean(string="Enable Auto-Verification", default=False)
     auto_verify_allow_out_of_range = fields.Boolean(string="Allow Out-of-Range for Auto-Verification", default=False)
     auto_verify_require_qc_pass = fields.Boolean(string="Require QC Pass for Auto-Verification", default=True)
+    auto_verify_rule_ids = fields.One2many(
+        "lab.auto.verify.rule",
+        "service_id",
+        string="Auto-Verification Rules",
+        context={"active_test": False},
+    )
+    reference_interval_ids = fields.One2many(
+        "lab.service.reference.interval",
+        "service_id",
+        string="Reference Intervals",
+        help="Age-, sex- and specimen-specific intervals. Service bounds apply when no interval matches.",
+    )
+    rule_revision = fields.Integer(
+        readonly=True,
+        copy=False,
+        help="Bumped whenever auto-verification or reference interval settings change; keys the compiled programs.",
+    )
     require_method_validation = fields.Boolean(
         string="Require Approved Method Validation for Release",
         default=False,
@@ -94,7 +124,63 @@ class LabService(models.Model):
 
     def write(self, vals):
         vals = self._map_unit_text_to_unit_id(dict(vals))
-        return super().write(vals)
+        res = super().write(vals)
+        if (AUTO_VERIFY_PROGRAM_FIELDS | REFERENCE_INTERVAL_FIELDS).intersection(vals):
+            self._bump_rule_revision()
+        return res
+
+    def init(self):
+        self.env.cr.execute(SQL("CREATE SEQUENCE IF NOT EXISTS %s", SQL.identifier(RULE_REVISION_SEQUENCE)))
+        self.env.cr.execute(
+            SQL(
+                "SELECT setval(%(seq)s, GREATEST((SELECT last_value FROM %(table)s), MAX(rule_revision))) FROM lab_service",
+                seq=RULE_REVISION_SEQUENCE,
+                table=SQL.identifier(RULE_REVISION_SEQUENCE),
+            )
+        )
+
+    def _bump_rule_revision(self):
+        """Retire the compiled programs of these services without clearing the registry caches.
+
+        The new revision comes from a database sequence rather than an
+        increment: a program compiled inside a transaction that is rolled
+        back stays cached under a revision no committed state will ever get.
+        """
+        ids = [service_id for service_id in self.ids if service_id]
+        if not ids:
+            return
+        self.env.cr.execute(
+            SQL(
+                "UPDATE lab_service SET rule_revision = nextval(%s) WHERE id = ANY(%s)",
+                RULE_REVISION_SEQUENCE,
+                ids,
+            )
+        )
+        self.browse(ids).invalidate_recordset(["rule_revision"])
+
+    def _get_auto_verify_program(self, include_draft=False):
+        """Return the cached auto-verification program of this service."""
+        self.ensure_one()
+        return self._compile_auto_verify_program(self.id, self.rule_revision, bool(include_draft))
+
+    @api.model
+    @tools.ormcache("service_id", "revision", "include_draft")
+    def _compile_auto_verify_program(self, service_id, revision, include_draft):
+        service = self.sudo().with_context(active_test=False).browse(service_id)
+        stages = ("active", "draft") if include_draft else ("active",)
+        rules = service.auto_verify_rule_ids.filtered(lambda r: r.active and r.stage in stages)
+        return self.env["lab.auto.verify.rule"]._build_program(service, rules.sorted(lambda r: (r.sequence, r.id)))
+
+    def _get_reference_interval_index(self):
+        """Return the cached reference interval index of this service."""
+        self.ensure_one()
+        return self._compile_reference_interval_index(self.id, self.rule_revision)
+
+    @api.model
+    @tools.ormcache("service_id", "revision")
+    def _compile_reference_interval_index(self, service_id, revision):
+        service = self.sudo().browse(service_id)
+        return self.env["lab.service.reference.interval"]._build_index(service, service.reference_interval_ids)
 
     @api.constrains("auto_binary_cutoff")
     def _check_auto_binary_cutoff(self):
@@ -633,6 +633,7 @@ class LabTestRequest(models.Model):
                     "collection_date": rec.requested_collection_date,
                     "report_template_id": rec.preferred_template_id.id,
                     "accession_barcode": specimen_barcode or False,
+                    "specimen_sample_type": specimen_sample_type,
                     "note": note,
                     "request_id": rec.id,
                     "analysis_ids": [
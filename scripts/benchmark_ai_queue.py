@@ -0,0 +1,135 @@
+# Benchmark the AI interpretation queue against the bundled mock provider.
+#
+# Run inside an Odoo shell on a staging copy (it regenerates interpretations):
+#
+#   BENCH_SAMPLES=100 BENCH_CONCURRENCY=8 BENCH_LATENCY_MS=1500 \
+#       odoo-bin shell -d lab_staging < scripts/benchmark_ai_queue.py
+#
+# Settings (environment variables):
+#   BENCH_SAMPLES            verified/reported samples to queue (default 50)
+#   BENCH_PROVIDER           openai_compatible | ollama (default openai_compatible)
+#   BENCH_CONCURRENCY        provider calls in flight (default 4)
+#   BENCH_STREAM             1 to use streaming responses (default 0)
+#   BENCH_LATENCY_MS         mock latency per call (default 800)
+#   BENCH_ERROR_RATE         share of 503 answers (default 0.05)
+#   BENCH_THROTTLE_RATE      share of 429 answers (default 0.0)
+#   BENCH_COMPLETION_TOKENS  tokens per answer (default 180)
+#   BENCH_BASE_URL           use an already running mock/provider instead
+#   BENCH_TIMEOUT_SECONDS    stop waiting for the queue after this (default 600)
+import importlib.util
+import math
+import os
+from time import perf_counter, sleep
+
+from odoo import fields
+from odoo.modules.module import get_module_path
+
+SAMPLES = int(os.environ.get('BENCH_SAMPLES', '50'))
+PROVIDER = os.environ.get('BENCH_PROVIDER', 'openai_compatible')
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', '4'))
+STREAM = os.environ.get('BENCH_STREAM', '0') not in ('0', 'false', 'False')
+LATENCY_MS = float(os.environ.get('BENCH_LATENCY_MS', '800'))
+ERROR_RATE = float(os.environ.get('BENCH_ERROR_RATE', '0.05'))
+THROTTLE_RATE = float(os.environ.get('BENCH_THROTTLE_RATE', '0.0'))
+COMPLETION_TOKENS = int(os.environ.get('BENCH_COMPLETION_TOKENS', '180'))
+BASE_URL = os.environ.get('BENCH_BASE_URL')
+TIMEOUT_SECONDS = float(os.environ.get('BENCH_TIMEOUT_SECONDS', '600'))
+
+ENDPOINTS = {
+    'openai_compatible': ('openai_compatible_base_url', '/v1/chat/completions'),
+    'ollama': ('ollama_base_url', '/api/chat'),
+}
+if PROVIDER not in ENDPOINTS:
+    raise SystemExit('BENCH_PROVIDER must be one of %s' % ', '.join(ENDPOINTS))
+
+server = None
+if not BASE_URL:
+    module_path = os.path.join(get_module_path('laboratory_management'), 'scripts', 'mock_ai_provider.py')
+    spec = importlib.util.spec_from_file_location('lab_mock_ai_provider', module_path)
+    mock_ai_provider = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mock_ai_provider)
+    server, BASE_URL = mock_ai_provider.start_in_background(
+        latency_ms=LATENCY_MS,
+        jitter_ms=LATENCY_MS / 4,
+        error_rate=ERROR_RATE,
+        throttle_rate=THROTTLE_RATE,
+        completion_tokens=COMPLETION_TOKENS,
+    )
+url_param, path = ENDPOINTS[PROVIDER]
+
+config = env['ir.config_parameter'].sudo()
+overrides = {
+    'laboratory_management.ai_provider': PROVIDER,
+    'laboratory_management.%s' % url_param: BASE_URL.rstrip('/') + path,
+    'laboratory_management.%s_concurrency' % PROVIDER: str(CONCURRENCY),
+    'laboratory_management.ai_stream_enabled': '1' if STREAM else '0',
+    'laboratory_management.ai_queue_batch_size': str(max(SAMPLES, 1)),
+    'laboratory_management.ai_cache_enabled': '0',
+}
+previous = {key: config.get_param(key) for key in overrides}
+for key, value in overrides.items():
+    config.set_param(key, value)
+
+sample_model = env['lab.sample'].sudo()
+samples = sample_model.search([('state', 'in', ('verified', 'reported'))], limit=SAMPLES, order='id desc')
+print('BENCH_PROVIDER', PROVIDER, BASE_URL, flush=True)
+print('BENCH_SAMPLES', len(samples), flush=True)
+print('BENCH_CONCURRENCY', CONCURRENCY, 'STREAM', STREAM, flush=True)
+
+started_at = fields.Datetime.now()
+samples.action_queue_ai_interpretation(force=True, trigger_source='manual')
+env.cr.commit()
+
+start = perf_counter()
+rounds = 0
+try:
+    while perf_counter() - start < TIMEOUT_SECONDS:
+        pending = sample_model.search_count(
+            [('id', 'in', samples.ids), ('ai_interpretation_state', 'in', ('queued', 'running'))]
+        )
+        if not pending:
+            break
+        if rounds:
+            # Work deferred by the rate limiter waits for capacity to return.
+            sleep(1)
+        sample_model._cron_process_ai_interpretation_queue()
+        env.cr.commit()
+        env.invalidate_all()
+        rounds += 1
+    elapsed = perf_counter() - start
+finally:
+    for key, value in previous.items():
+        config.set_param(key, value or False)
+    env.cr.commit()
+
+history = env['lab.sample.ai.interpretation'].sudo().search_read(
+    [('sample_id', 'in', samples.ids), ('generated_at', '>=', started_at)],
+    ['state', 'duration_ms', 'first_token_ms', 'attempt_count'],
+)
+done = [row for row in history if row['state'] == 'done']
+durations = sorted(row['duration_ms'] or 0 for row in done)
+first_tokens = sorted(row['first_token_ms'] for row in done if row['first_token_ms'])
+
+
+def percentile(values, share):
+    if not values:
+        return 0
+    return values[max(math.ceil(share * len(values)) - 1, 0)]
+
+
+retries = sum(max((row['attempt_count'] or 1) - 1, 0) for row in history)
+still_pending = sample_model.search_count(
+    [('id', 'in', samples.ids), ('ai_interpretation_state', 'in', ('queued', 'running'))]
+)
+print('ROUNDS', rounds, flush=True)
+print('ELAPSED_SECONDS', round(elapsed, 2), flush=True)
+print('DONE', len(done), 'ERRORS', len(history) - len(done), 'STILL_QUEUED', still_pending, flush=True)
+print('THROUGHPUT_PER_MINUTE', round(len(done) * 60.0 / max(elapsed, 0.001), 2), flush=True)
+print('LATENCY_MS_P50', percentile(durations, 0.5), 'P95', percentile(durations, 0.95), flush=True)
+if first_tokens:
+    print('FIRST_TOKEN_MS_P50', percentile(first_tokens, 0.5), 'P95', percentile(first_tokens, 0.95), flush=True)
+print('HTTP_RETRIES', retries, flush=True)
+if server:
+    print('MOCK_STATS', server.stats.snapshot(), flush=True)
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,252 @@
+"""Local stand-in for the AI providers used by lab.sample AI interpretation.
+
+Serves the two endpoints ``request_ai_completion`` talks to:
+
+* ``POST /v1/chat/completions`` -- OpenAI / OpenAI-compatible (JSON or SSE stream)
+* ``POST /api/chat``            -- Ollama (JSON or NDJSON stream)
+
+Run standalone::
+
+    python3 scripts/mock_ai_provider.py --port 8765 --latency-ms 800 --error-rate 0.05
+
+then point ``laboratory_management.openai_compatible_base_url`` at
+``http://127.0.0.1:8765/v1/chat/completions`` (or the Ollama URL at
+``/api/chat``). ``scripts/benchmark_ai_queue.py`` starts it in-process.
+Only the standard library is used.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_OPTIONS = {
+    "latency_ms": 500,
+    "jitter_ms": 200,
+    "error_rate": 0.0,
+    "throttle_rate": 0.0,
+    "completion_tokens": 180,
+    "prompt_tokens": 0,
+    "token_delay_ms": 5,
+    "seed": None,
+}
+
+ANSWER_WORDS = (
+    "Key findings: results are within the reference intervals. "
+    "Abnormal items: none flagged. "
+    "Clinical caution: educational interpretation only, correlate with the clinical picture. "
+    "Recommended follow-up: routine monitoring as advised by the physician."
+).split()
+
+
+class MockProviderStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "throttled": self.throttled,
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "LabMockAI/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def do_POST(self):
+        options = self.server.options
+        stats = self.server.stats
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+        if self.path.rstrip("/").endswith("/chat/completions"):
+            flavour = "openai"
+        elif self.path.rstrip("/").endswith("/api/chat"):
+            flavour = "ollama"
+        else:
+            self._send_json(404, {"error": {"message": "unknown endpoint %s" % self.path}})
+            return
+
+        with stats.lock:
+            stats.requests += 1
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            rng = self.server.rng
+            with self.server.rng_lock:
+                roll = rng.random()
+                delay = max(options["latency_ms"] + rng.uniform(-options["jitter_ms"], options["jitter_ms"]), 0)
+            if roll < options["throttle_rate"]:
+                with stats.lock:
+                    stats.throttled += 1
+                self._send_json(429, {"error": {"message": "rate limited by mock provider"}}, {"Retry-After": "1"})
+                return
+            if roll < options["throttle_rate"] + options["error_rate"]:
+                with stats.lock:
+                    stats.errors += 1
+                time.sleep(delay / 2000.0)
+                self._send_json(503, {"error": {"message": "mock provider unavailable"}})
+                return
+            time.sleep(delay / 1000.0)
+            self._answer(flavour, body)
+        finally:
+            with stats.lock:
+                stats.in_flight -= 1
+
+    def _answer(self, flavour, body):
+        options = self.server.options
+        model = body.get("model") or "mock-model"
+        prompt_text = "".join(message.get("content") or "" for message in body.get("messages") or [])
+        prompt_tokens = options["prompt_tokens"] or max(len(prompt_text) // 4, 1)
+        completion_tokens = options["completion_tokens"]
+        words = [ANSWER_WORDS[i % len(ANSWER_WORDS)] for i in range(completion_tokens)]
+        if body.get("stream"):
+            self._stream(flavour, model, words, prompt_tokens, completion_tokens)
+            return
+        content = " ".join(words)
+        if flavour == "ollama":
+            payload = {
+                "model": model,
+                "message": {"role": "assistant", "content": content},
+                "done": True,
+                "prompt_eval_count": prompt_tokens,
+                "eval_count": completion_tokens,
+            }
+        else:
+            payload = {
+                "id": "mock-%s" % time.time_ns(),
+                "object": "chat.completion",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "total_tokens": prompt_tokens + completion_tokens,
+                },
+            }
+        self._send_json(200, payload)
+
+    def _stream(self, flavour, model, words, prompt_tokens, completion_tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if flavour == "openai" else "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        token_delay = self.server.options["token_delay_ms"] / 1000.0
+        for index, word in enumerate(words):
+            text = word if not index else " " + word
+            if flavour == "ollama":
+                event = {"model": model, "message": {"role": "assistant", "content": text}, "done": False}
+                self._write_chunk(json.dumps(event) + "\n")
+            else:
+                event = {"model": model, "choices": [{"index": 0, "delta": {"content": text}}]}
+                self._write_chunk("data: %s\n\n" % json.dumps(event))
+            if token_delay:
+                time.sleep(token_delay)
+        if flavour == "ollama":
+            final = {"model": model, "done": True, "prompt_eval_count": prompt_tokens, "eval_count": completion_tokens}
+            self._write_chunk(json.dumps(final) + "\n")
+        else:
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            self._write_chunk("data: %s\n\n" % json.dumps({"model": model, "choices": [], "usage": usage}))
+            self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def make_server(host="127.0.0.1", port=0, verbose=False, **options):
+    """Build a mock provider server; ``port=0`` picks a free port."""
+    server = ThreadingHTTPServer((host, port), MockProviderHandler)
+    server.daemon_threads = True
+    server.options = dict(DEFAULT_OPTIONS, **options)
+    server.rng = random.Random(server.options["seed"])
+    server.rng_lock = threading.Lock()
+    server.stats = MockProviderStats()
+    server.verbose = verbose
+    return server
+
+
+def start_in_background(**options):
+    """Start a mock provider on a daemon thread and return ``(server, base_url)``."""
+    server = make_server(**options)
+    thread = threading.Thread(target=server.serve_forever, name="lab-mock-ai", daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, "http://%s:%s" % (host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_OPTIONS["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_OPTIONS["jitter_ms"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_OPTIONS["error_rate"], help="share of 503 answers")
+    parser.add_argument("--throttle-rate", type=float, default=DEFAULT_OPTIONS["throttle_rate"], help="share of 429 answers")
+    parser.add_argument("--completion-tokens", type=int, default=DEFAULT_OPTIONS["completion_tokens"])
+    parser.add_argument("--prompt-tokens", type=int, default=0, help="fixed prompt token count (default: chars / 4)")
+    parser.add_argument("--token-delay-ms", type=float, default=DEFAULT_OPTIONS["token_delay_ms"], help="delay between streamed tokens")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    server = make_server(
+        host=args.host,
+        port=args.port,
+        verbose=args.verbose,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        completion_tokens=args.completion_tokens,
+        prompt_tokens=args.prompt_tokens,
+        token_delay_ms=args.token_delay_ms,
+        seed=args.seed,
+    )
+    print("Mock AI provider listening on http://%s:%s" % server.server_address[:2], flush=True)
+    print("  OpenAI-compatible: /v1/chat/completions   Ollama: /api/chat", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print("STATS", json.dumps(server.stats.snapshot()), flush=True)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
+import os
 from time import perf_counter
 from odoo import fields
 
 BATCH_TAG = 'LOADTEST5000_20260222'
 TOTAL = 5000
 COMMIT_EVERY = 10
+# 'simulated' writes fake AI output; 'queue' queues real generation.
+AI_MODE = os.environ.get('LOADTEST_AI_MODE', 'simulated')
 
 start = perf_counter()
 
@@ -121,47 +124,51 @@ for i in range(1, TOTAL + 1):
         sample.action_release_report()
         req.action_mark_completed()
 
-        # Pressure-test AI mode: persist simulated AI output without external API
-        fake_text = (
-            f"[{BATCH_TAG}] Simulated AI interpretation for {sample.name}.\\n"
-            f"Result summary: {'Positive' if i % 4 == 0 else 'Negative'}.\\n"
-            "This content is generated in load test mode."
-        )
-        sample.write({
-            'ai_interpretation_state': 'done',
-            'ai_interpretation_text': fake_text,
-            'ai_interpretation_error': False,
-            'ai_interpretation_model': 'loadtest-simulated',
-            'ai_interpretation_lang': 'English',
-            'ai_interpretation_prompt': f'{BATCH_TAG} simulated prompt',
-            'ai_interpretation_updated_at': fields.Datetime.now(),
-            'ai_review_state': 'approved',
-            'ai_reviewed_by_id': env.user.id,
-            'ai_reviewed_at': fields.Datetime.now(),
-            'ai_review_note': 'Auto-approved in load test mode',
-        })
-        env['lab.sample.ai.interpretation'].sudo().create({
-            'sample_id': sample.id,
-            'state': 'done',
-            'trigger_source': 'manual',
-            'model_name': 'loadtest-simulated',
-            'output_language': 'English',
-            'duration_ms': 5,
-            'prompt_tokens': 0,
-            'completion_tokens': 0,
-            'total_tokens': 0,
-            'system_prompt': 'loadtest',
-            'user_prompt': BATCH_TAG,
-            'response_text': fake_text,
-            'generated_at': fields.Datetime.now(),
-        })
-        env['lab.sample.ai.review.log'].sudo().create({
-            'sample_id': sample.id,
-            'action': 'approved',
-            'reviewer_id': env.user.id,
-            'note': 'loadtest auto approve',
-            'reviewed_at': fields.Datetime.now(),
-        })
+        if AI_MODE == 'queue':
+            # Real generation through the queue worker (point the provider at scripts/mock_ai_provider.py).
+            sample.action_queue_ai_interpretation(force=True, trigger_source='manual')
+        else:
+            # Pressure-test AI mode: persist simulated AI output without external API
+            fake_text = (
+                f"[{BATCH_TAG}] Simulated AI interpretation for {sample.name}.\\n"
+                f"Result summary: {'Positive' if i % 4 == 0 else 'Negative'}.\\n"
+                "This content is generated in load test mode."
+            )
+            sample.write({
+                'ai_interpretation_state': 'done',
+                'ai_interpretation_text': fake_text,
+                'ai_interpretation_error': False,
+                'ai_interpretation_model': 'loadtest-simulated',
+                'ai_interpretation_lang': 'English',
+                'ai_interpretation_prompt': f'{BATCH_TAG} simulated prompt',
+                'ai_interpretation_updated_at': fields.Datetime.now(),
+                'ai_review_state': 'approved',
+                'ai_reviewed_by_id': env.user.id,
+                'ai_reviewed_at': fields.Datetime.now(),
+                'ai_review_note': 'Auto-approved in load test mode',
+            })
+            env['lab.sample.ai.interpretation'].sudo().create({
+                'sample_id': sample.id,
+                'state': 'done',
+                'trigger_source': 'manual',
+                'model_name': 'loadtest-simulated',
+                'output_language': 'English',
+                'duration_ms': 5,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'total_tokens': 0,
+                'system_prompt': 'loadtest',
+                'user_prompt': BATCH_TAG,
+                'response_text': fake_text,
+                'generated_at': fields.Datetime.now(),
+            })
+            env['lab.sample.ai.review.log'].sudo().create({
+                'sample_id': sample.id,
+                'action': 'approved',
+                'reviewer_id': env.user.id,
+                'note': 'loadtest auto approve',
+                'reviewed_at': fields.Datetime.now(),
+            })
 
         created_request_ids.append(req.id)
         created_sample_ids.append(sample.id)
@@ -0,0 +1,41 @@
+/* Reload the H5 report once a queued AI interpretation has finished. */
+(function () {
+    "use strict";
+
+    const POLL_INTERVAL_MS = 4000;
+    const MAX_POLLS = 90;
+
+    function watch(element) {
+        const url = element.dataset.labAiStatusUrl;
+        let polls = 0;
+        const poll = () => {
+            polls += 1;
+            fetch(url, { credentials: "same-origin", headers: { Accept: "application/json" } })
+                .then((response) => (response.ok ? response.json() : null))
+                .then((status) => {
+                    if (status && !status.pending) {
+                        window.location.reload();
+                    } else if (status && polls < MAX_POLLS) {
+                        window.setTimeout(poll, POLL_INTERVAL_MS);
+                    }
+                })
+                .catch(() => {
+                    if (polls < MAX_POLLS) {
+                        window.setTimeout(poll, POLL_INTERVAL_MS * 2);
+                    }
+                });
+        };
+        window.setTimeout(poll, POLL_INTERVAL_MS);
+    }
+
+    function start() {
+        document.querySelectorAll("[data-lab-ai-status-url]").forEach(watch);
+    }
+
+    // Bundles may load after the document is parsed; DOMContentLoaded has then already fired.
+    if (document.readyState === "loading") {
+        document.addEventListener("DOMContentLoaded", start);
+    } else {
+        start();
+    }
+})();
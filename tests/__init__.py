@@ -12,3 +12,7 @@ from . import test_workstation_governance
 from . import test_binary_interpretation_rule
 from . import test_personnel_competency
 from . import test_training_authorization_template
+from . import test_auto_verify_rules
+from . import test_reference_interval
+from . import test_result_import
+from . import test_qc_engine
@@ -0,0 +1,127 @@
+from odoo.exceptions import ValidationError
+from odoo.tests.common import TransactionCase
+
+
+class TestAutoVerifyRules(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.patient = cls.env["lab.patient"].create({"name": "Auto Verify Patient"})
+        cls.service = cls.env["lab.service"].create(
+            {
+                "name": "AV Glucose",
+                "code": "AV-GLU",
+                "department": "chemistry",
+                "sample_type": "blood",
+                "result_type": "numeric",
+                "ref_min": 3.9,
+                "ref_max": 6.1,
+                "critical_min": 2.2,
+                "critical_max": 25.0,
+                "auto_verify_enabled": True,
+                "auto_verify_allow_out_of_range": True,
+            }
+        )
+
+    def _new_analysis(self, value):
+        sample = self.env["lab.sample"].create(
+            {
+                "patient_id": self.patient.id,
+                "analysis_ids": [(0, 0, {"service_id": self.service.id, "state": "assigned", "result_value": str(value)})],
+            }
+        )
+        return sample.analysis_ids[:1]
+
+    def test_01_base_program_matches_service_flags(self):
+        analysis = self._new_analysis(5.0)
+        analysis.action_mark_done()
+        self.assertTrue(analysis.auto_verified)
+        self.assertEqual(analysis.state, "verified")
+
+    def test_02_active_range_rule_holds_result(self):
+        self.env["lab.auto.verify.rule"].create(
+            {
+                "name": "Glucose window",
+                "service_id": self.service.id,
+                "rule_type": "range",
+                "range_min": 3.0,
+                "range_max": 10.0,
+                "stage": "active",
+            }
+        )
+        analysis = self._new_analysis(12.0)
+        analysis.action_mark_done()
+        self.assertFalse(analysis.auto_verified)
+        self.assertEqual(analysis.manual_review_reason_code, "rule_hold")
+
+    def test_03_draft_rule_only_used_in_simulation(self):
+        self.env["lab.auto.verify.rule"].create(
+            {
+                "name": "High flag hold",
+                "service_id": self.service.id,
+                "rule_type": "flag_combination",
+                "match_result_flags": "high",
+            }
+        )
+        analysis = self._new_analysis(8.0)
+        decisions = analysis._evaluate_auto_verify_batch(qc_runs={})
+        self.assertFalse(decisions[analysis.id][0])
+        decisions = analysis._evaluate_auto_verify_batch(qc_runs={}, include_draft=True)
+        self.assertEqual(decisions[analysis.id][0], "rule_hold")
+
+    def test_04_program_cache_refreshes_on_service_change(self):
+        program = self.service._get_auto_verify_program()
+        self.assertTrue(program.enabled)
+        self.service.auto_verify_enabled = False
+        program = self.service._get_auto_verify_program()
+        self.assertFalse(program.enabled)
+
+    def test_05_simulation_reports_rates(self):
+        for value in (5.0, 8.0):
+            self._new_analysis(value).action_mark_done()
+        self.env["lab.auto.verify.rule"].create(
+            {
+                "name": "High flag hold",
+                "service_id": self.service.id,
+                "rule_type": "flag_combination",
+                "match_result_flags": "high",
+            }
+        )
+        wizard = self.env["lab.auto.verify.simulation.wizard"].create({"service_ids": [(6, 0, self.service.ids)]})
+        wizard.action_simulate()
+        self.assertEqual(wizard.result_count, 2)
+        self.assertEqual(wizard.current_auto_count, 2)
+        self.assertEqual(wizard.simulated_auto_count, 1)
+        self.assertEqual(wizard.line_ids.top_hold_reason, "rule_hold")
+
+    def test_06_zero_critical_limit_and_range_bounds(self):
+        self.service.critical_min = 0.0
+        self.env["lab.auto.verify.rule"].create(
+            {
+                "name": "Near zero",
+                "service_id": self.service.id,
+                "rule_type": "critical",
+                "critical_margin": 0.5,
+                "stage": "active",
+            }
+        )
+        held, passed = self._new_analysis(0.3) | self._new_analysis(5.0)
+        (held | passed).action_mark_done()
+        self.assertEqual(held.manual_review_reason_code, "rule_hold")
+        self.assertTrue(passed.auto_verified)
+        self.assertTrue(held.result_date)
+        with self.assertRaises(ValidationError):
+            self.env["lab.auto.verify.rule"].create(
+                {"name": "Empty window", "service_id": self.service.id, "rule_type": "range"}
+            )
+
+    def test_07_rolled_back_revision_is_never_reused(self):
+        committed_revision = self.service.rule_revision
+        with self.assertRaises(ValidationError), self.env.cr.savepoint():
+            self.service.auto_verify_enabled = False
+            self.assertFalse(self.service._get_auto_verify_program().enabled)
+            raise ValidationError("rollback")
+        self.service.invalidate_recordset(["rule_revision", "auto_verify_enabled"])
+        self.assertEqual(self.service.rule_revision, committed_revision)
+        self.service.auto_verify_allow_out_of_range = False
+        self.assertTrue(self.service._get_auto_verify_program().enabled)
@@ -0,0 +1,292 @@
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import psycopg2
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+from odoo.tools import mute_logger
+
+from ..models.lab_qc_engine import QC_RULE_ORDER, downsample_lttb, rule_window, scan_rule
+
+
+class TestQcEngine(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.service = cls.env["lab.service"].create(
+            {
+                "name": "QC Engine Potassium",
+                "code": "QCE-K",
+                "department": "chemistry",
+                "sample_type": "blood",
+                "result_type": "numeric",
+            }
+        )
+        cls.material = cls.env["lab.qc.material"].create(
+            {
+                "name": "K Level 1",
+                "code": "QCE-K-L1",
+                "service_id": cls.service.id,
+                "target_value": 4.0,
+                "std_dev": 0.1,
+            }
+        )
+        cls.base = datetime(2026, 1, 1, 8, 0, 0)
+
+    def _run(self, hours, value):
+        return self.env["lab.qc.run"].create(
+            {
+                "qc_material_id": self.material.id,
+                "run_date": self.base + timedelta(hours=hours),
+                "result_value": value,
+            }
+        )
+
+    def test_01_incremental_rules_and_moving_stats(self):
+        first = self._run(1, 4.25)
+        second = self._run(2, 4.22)
+        self.assertEqual(first.status, "warning")
+        self.assertAlmostEqual(second.prev_z_score, 2.5)
+        self.assertEqual(second.status, "reject")
+        self.assertIn("22s", second.westgard_rules)
+        self.assertAlmostEqual(second.moving_avg_20, 4.235)
+        self.assertTrue(self.material.qc_state_json)
+
+    def test_02_backdated_run_replays_material_history(self):
+        later = self._run(5, 4.05)
+        self.assertEqual(later.prev_z_score, 0.0)
+        self._run(3, 4.3)
+        self.assertAlmostEqual(later.prev_z_score, 3.0)
+
+    def test_03_material_change_reevaluates_runs(self):
+        run = self._run(1, 4.25)
+        self.assertEqual(run.status, "warning")
+        self.material.std_dev = 0.2
+        self.assertEqual(run.status, "pass")
+        self.assertAlmostEqual(run.z_score, 1.25)
+
+    def test_04_extended_rules_and_cross_level_series(self):
+        rules = self.env["lab.qc.rule.library"].with_context(active_test=False)
+        two_of_three = rules.search([("code", "=", "2of32s"), ("scope", "=", "material")])
+        across = rules.search([("code", "=", "22s"), ("scope", "=", "service")])
+        (two_of_three | across).write({"active": True})
+        level2 = self.env["lab.qc.material"].create(
+            {
+                "name": "K Level 2",
+                "code": "QCE-K-L2",
+                "service_id": self.service.id,
+                "target_value": 6.0,
+                "std_dev": 0.2,
+            }
+        )
+        self._run(1, 4.25)
+        self._run(2, 4.0)
+        third = self._run(3, 4.22)
+        self.assertIn("2of32s", third.westgard_rules)
+        self.assertEqual(third.status, "reject")
+
+        other_level = self.env["lab.qc.run"].create(
+            {"qc_material_id": level2.id, "run_date": self.base + timedelta(hours=4), "result_value": 6.5}
+        )
+        self.assertIn("22s (levels)", other_level.westgard_rules)
+        self.assertEqual(other_level.status, "reject")
+
+    def test_05_scan_matches_point_evaluation(self):
+        series = [0.5, 1.2, 1.4, 1.1, 2.3, -0.4, -2.6, 2.1, 0.3, 0.6, 0.9, 1.3, 1.7, 2.2, 2.4]
+        for code in QC_RULE_ORDER:
+            flags = scan_rule(code, series)
+            window = max(rule_window(code), 2)
+            for idx in range(len(series)):
+                self.assertEqual(flags[idx], scan_rule(code, series[max(0, idx - window + 1) : idx + 1])[-1])
+
+    def test_06_current_status_table_and_lockout(self):
+        status_model = self.env["lab.qc.status"]
+        self.service.require_qc = True
+        rejected = self._run(1, 4.5)
+        self.assertEqual(rejected.status, "reject")
+        row = status_model.search([("service_id", "=", self.service.id), ("instrument_id", "=", False)])
+        self.assertEqual(row.run_id, rejected)
+        self.assertTrue(row.locked)
+        self.assertEqual(status_model._latest_runs(self.service.ids), {self.service.id: rejected})
+
+        patient = self.env["lab.patient"].create({"name": "QC Lockout Patient"})
+        sample = self.env["lab.sample"].create(
+            {"patient_id": patient.id, "analysis_ids": [(0, 0, {"service_id": self.service.id, "state": "assigned"})]}
+        )
+        self.assertTrue(sample.analysis_ids.qc_locked)
+
+        passed = self._run(2, 4.02)
+        row.invalidate_recordset()
+        self.assertEqual(row.run_id, passed)
+        self.assertFalse(row.locked)
+        sample.analysis_ids.invalidate_recordset(["qc_locked"])
+        self.assertFalse(sample.analysis_ids.qc_locked)
+
+    def test_07_snapshots_from_set_queries(self):
+        runs = self._run(1, 4.25) | self._run(2, 4.0) | self._run(3, 3.9)
+        daily = self.env["lab.qc.daily.snapshot"]
+        daily.action_capture_from_runs(runs)
+        snapshot = daily.search([("qc_material_id", "=", self.material.id)])
+        self.assertEqual(len(snapshot), 1)
+        self.assertEqual(snapshot.run_count, 3)
+        self.assertEqual(snapshot.warning_count, 1)
+        self.assertAlmostEqual(snapshot.max_abs_z, 2.5)
+        daily.action_capture_from_runs(runs[0])
+        self.assertEqual(daily.search_count([("qc_material_id", "=", self.material.id)]), 1)
+
+        profile = self.env["lab.qc.trend.profile"].create(
+            {"name": "Engine Trend", "code": "QCE-TREND", "service_ids": [(6, 0, self.service.ids)], "window_size": 2}
+        )
+        trend = self.env["lab.qc.trend.snapshot"].create({"profile_id": profile.id})
+        trend.action_capture()
+        self.assertEqual(len(trend.line_ids), 1)
+        line = trend.line_ids
+        self.assertEqual(line.sample_size, 2)
+        self.assertAlmostEqual(line.latest_value, 3.9)
+        self.assertAlmostEqual(line.mean_value, 3.95)
+        self.assertAlmostEqual(line.std_value, 0.05)
+
+    def test_08_levey_jennings_series_downsampled_and_cached(self):
+        values = [4.0 + 0.01 * ((i % 7) - 3) for i in range(60)]
+        values[30] = 4.35
+        for hours, value in enumerate(values, start=1):
+            self._run(hours, value)
+        series = self.material.get_levey_jennings_data(max_points=12)[0]
+        self.assertEqual(series["total_points"], 60)
+        self.assertEqual(len(series["points"]), 12)
+        self.assertEqual(series["points"][0]["x"], "2026-01-01 09:00:00")
+        self.assertIn("reject", [point["status"] for point in series["points"]])
+
+        self._run(61, 4.0)
+        series = self.material.get_levey_jennings_data(max_points=12)[0]
+        self.assertEqual(series["total_points"], 61)
+        window = self.material.get_levey_jennings_data(date_from="2026-01-03 00:00:00", max_points=100)[0]
+        self.assertEqual(window["total_points"], 61 - 39)
+
+        material_model = type(self.material)
+        with patch.object(
+            material_model, "_levey_jennings_series", autospec=True, side_effect=material_model._levey_jennings_series
+        ) as build:
+            self.material.get_levey_jennings_data()
+            self.material.get_levey_jennings_data()
+            self.assertEqual(build.call_count, 1)
+            self.material.get_levey_jennings_data(max_points=12)
+            self.assertEqual(build.call_count, 2)
+        self.assertEqual(len(json.loads(self.material.trend_json)), 30)
+        self.assertEqual(downsample_lttb([0, 1, 2], [0.0, 1.0, 0.0], 10), [0, 1, 2])
+
+    def test_09_bulk_ingest_and_interface_qc_message(self):
+        self._run(1, 4.0)
+        summary = self.env["lab.qc.run"].ingest_runs(
+            [
+                {"material_code": "QCE-K-L1", "run_date": "2026-01-01 12:00:00", "result": 4.35},
+                {"material_code": "QCE-K-L1", "run_date": "2026-01-01T10:00:00", "result": "4.05"},
+                {"material_code": "QCE-K-L1", "run_date": "2026-01-01 09:00:00", "result": 4.1},
+                {"material_code": "QCE-K-L1", "run_date": "2026-01-01 10:00:00", "result": 4.2},
+                {"material_code": "NOPE", "run_date": "2026-01-01 11:00:00", "result": 4.0},
+                {"qc_material_id": self.material.id, "run_date": "bad", "result": 4.0},
+            ]
+        )
+        self.assertEqual(summary["created"], 2)
+        self.assertEqual(summary["duplicates"], [2, 3])
+        self.assertEqual([error["index"] for error in summary["errors"]], [4, 5])
+        runs = self.env["lab.qc.run"].browse(summary["run_ids"])
+        self.assertEqual(runs.sorted("run_date").mapped("status"), ["pass", "reject"])
+        self.assertEqual(summary["rejected"], 1)
+        self.assertTrue(self.env["lab.nonconformance"].search([("qc_run_id", "in", runs.ids)]))
+
+        endpoint = self.env["lab.interface.endpoint"].create(
+            {
+                "name": "QC Analyzer",
+                "code": "QCE-IF",
+                "system_type": "his",
+                "direction": "inbound",
+                "protocol": "rest",
+            }
+        )
+        job = endpoint.ingest_message(
+            "qc", {"runs": [{"material_code": "QCE-K-L1", "run_date": "2026-01-01 13:00:00", "result": 4.0}]}
+        )
+        self.assertEqual(job.state, "done")
+        self.assertEqual(self.env["lab.qc.run"].search_count([("qc_material_id", "=", self.material.id)]), 4)
+
+    def test_10_rule_change_replays_recent_runs_of_affected_materials(self):
+        rule_12s = self.env.ref("laboratory_management.lab_qc_rule_12s")
+        rule_13s = self.env.ref("laboratory_management.lab_qc_rule_13s")
+        level2, other = self.env["lab.qc.material"].create(
+            [
+                {
+                    "name": "K Level 2",
+                    "code": "QCE-K-L2",
+                    "service_id": self.service.id,
+                    "target_value": 6.0,
+                    "std_dev": 0.2,
+                    "rule_ids": [(6, 0, rule_12s.ids)],
+                },
+                {
+                    "name": "K Level 3",
+                    "code": "QCE-K-L3",
+                    "service_id": self.service.id,
+                    "target_value": 8.0,
+                    "std_dev": 0.2,
+                    "rule_ids": [(6, 0, rule_13s.ids)],
+                },
+            ]
+        )
+        now = fields.Datetime.now()
+        old, recent = self.env["lab.qc.run"].create(
+            [
+                {"qc_material_id": level2.id, "run_date": now - timedelta(days=90), "result_value": 6.5},
+                {"qc_material_id": level2.id, "run_date": now - timedelta(days=1), "result_value": 6.5},
+            ]
+        )
+        self.assertEqual((old | recent).mapped("status"), ["warning", "warning"])
+
+        rule_12s.severity = "reject"
+        self.assertEqual(recent.status, "warning")
+        self.assertTrue(level2.qc_replay_pending)
+        self.assertTrue(self.material.qc_replay_pending)
+        self.assertFalse(other.qc_replay_pending)
+
+        self.env["lab.qc.material"]._cron_replay_qc_rules()
+        self.assertFalse(level2.qc_replay_pending)
+        self.assertEqual(recent.status, "reject")
+        self.assertEqual(old.status, "warning")
+        ncr = self.env["lab.nonconformance"].search([("qc_run_id", "in", (old | recent).ids)])
+        self.assertEqual(ncr.qc_run_id, recent)
+
+    def test_11_status_rows_for_idle_services_and_lockout_enforcement(self):
+        status_model = self.env["lab.qc.status"]
+        with patch.object(type(status_model), "_refresh_services") as refresh:
+            self.assertEqual(status_model._latest_runs(self.service.ids), {})
+        refresh.assert_not_called()
+        self.assertFalse(status_model.search([("service_id", "=", self.service.id)]))
+
+        self.service.require_qc = True
+        rejected = self._run(1, 4.5)
+        patient = self.env["lab.patient"].create({"name": "QC Enforcement Patient"})
+        sample = self.env["lab.sample"].create(
+            {
+                "patient_id": patient.id,
+                "analysis_ids": [(0, 0, {"service_id": self.service.id, "state": "assigned", "result_value": "4.1"})],
+            }
+        )
+        with self.assertRaises(UserError):
+            sample.analysis_ids.action_mark_done()
+
+        # History predating the table is filled by the upgrade backfill, not by lookups.
+        self.env.cr.execute("DELETE FROM lab_qc_status WHERE service_id = %s", [self.service.id])
+        status_model.invalidate_model()
+        self.assertEqual(status_model._latest_runs(self.service.ids), {})
+        status_model._refresh_all()
+        self.assertEqual(status_model._latest_runs(self.service.ids), {self.service.id: rejected})
+        with self.assertRaises(psycopg2.IntegrityError), mute_logger("odoo.sql_db"), self.env.cr.savepoint():
+            status_model.create({"service_id": self.service.id})
+            status_model.flush_model()
+
+        rejected.unlink()
+        self.assertFalse(status_model.search([("service_id", "=", self.service.id)]))
+        self.assertFalse(status_model._locked_service_ids(self.service.ids))
@@ -0,0 +1,82 @@
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+
+class TestReferenceInterval(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.service = cls.env["lab.service"].create(
+            {
+                "name": "RI Hemoglobin",
+                "code": "RI-HGB",
+                "department": "hematology",
+                "sample_type": "blood",
+                "result_type": "numeric",
+                "ref_min": 110,
+                "ref_max": 160,
+                "critical_min": 60,
+                "critical_max": 200,
+                "reference_interval_ids": [
+                    (0, 0, {"gender": "male", "age_min": 18, "ref_min": 130, "ref_max": 175}),
+                    (0, 0, {"gender": "female", "age_min": 18, "ref_min": 120, "ref_max": 155}),
+                    (0, 0, {"gender": "any", "age_min": 0, "age_max": 18, "ref_min": 105, "ref_max": 145}),
+                ],
+            }
+        )
+        cls.male = cls.env["lab.patient"].create({"name": "RI Male", "gender": "male", "birthdate": date(1980, 1, 1)})
+        cls.child = cls.env["lab.patient"].create(
+            {"name": "RI Child", "gender": "female", "birthdate": date.today() - relativedelta(years=6)}
+        )
+        cls.unknown = cls.env["lab.patient"].create({"name": "RI Unknown"})
+
+    def _new_analysis(self, patient, value):
+        sample = self.env["lab.sample"].create(
+            {
+                "patient_id": patient.id,
+                "analysis_ids": [(0, 0, {"service_id": self.service.id, "state": "assigned", "result_value": str(value)})],
+            }
+        )
+        return sample.analysis_ids[:1]
+
+    def test_01_sex_and_age_specific_interval(self):
+        analysis = self._new_analysis(self.male, 125)
+        self.assertEqual(analysis.ref_min, 130)
+        self.assertEqual(analysis.result_flag, "low")
+        child_analysis = self._new_analysis(self.child, 125)
+        self.assertEqual(child_analysis.ref_max, 145)
+        self.assertEqual(child_analysis.result_flag, "normal")
+
+    def test_02_service_bounds_are_fallback(self):
+        analysis = self._new_analysis(self.unknown, 165)
+        self.assertFalse(analysis.reference_interval_id)
+        self.assertEqual(analysis.ref_max, 160)
+        self.assertTrue(analysis.is_out_of_range)
+        self.assertEqual(analysis.critical_min, 60)
+
+    def test_03_interval_change_reflags_lines(self):
+        analysis = self._new_analysis(self.male, 125)
+        self.service.reference_interval_ids.filtered(lambda r: r.gender == "male").ref_min = 120
+        analysis._recompute_result_flags()
+        self.assertEqual(analysis.result_flag, "normal")
+
+    def test_04_interval_without_criticals_keeps_service_criticals(self):
+        analysis = self._new_analysis(self.male, 250)
+        self.assertTrue(analysis.reference_interval_id)
+        self.assertEqual(analysis.critical_min, 60)
+        self.assertEqual(analysis.critical_max, 200)
+        self.assertTrue(analysis.is_critical)
+        self.assertTrue(self._new_analysis(self.male, 40).is_critical)
+
+    def test_05_rolled_back_interval_change_does_not_stay_cached(self):
+        male_interval = self.service.reference_interval_ids.filtered(lambda r: r.gender == "male")
+        with self.assertRaises(UserError), self.env.cr.savepoint():
+            male_interval.ref_min = 100
+            self.assertEqual(self._new_analysis(self.male, 125).result_flag, "normal")
+            raise UserError("rollback")
+        self.service.write({"critical_max": 210})
+        self.assertEqual(self._new_analysis(self.male, 125).result_flag, "low")
@@ -0,0 +1,230 @@
+import base64
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+from ..models.lab_import_job import IMPORT_MAX_ATTEMPTS
+
+
+class TestResultImport(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.patient = cls.env["lab.patient"].create({"name": "Import Patient"})
+        cls.service = cls.env["lab.service"].create(
+            {
+                "name": "Import Sodium",
+                "code": "IMP-NA",
+                "department": "chemistry",
+                "sample_type": "blood",
+                "result_type": "numeric",
+                "ref_min": 135.0,
+                "ref_max": 145.0,
+            }
+        )
+        cls.instrument = cls.env["lab.instrument"].create(
+            {
+                "name": "Import Analyzer",
+                "code": "IMP-AN1",
+                "mapping_ids": [(0, 0, {"instrument_test_code": "NA", "service_id": cls.service.id})],
+            }
+        )
+        cls.samples = cls.env["lab.sample"].create(
+            [
+                {
+                    "patient_id": cls.patient.id,
+                    "analysis_ids": [(0, 0, {"service_id": cls.service.id, "state": "assigned"})],
+                }
+                for _i in range(3)
+            ]
+        )
+
+    def _enqueue(self, import_type, content):
+        return self.env["lab.import.job"]._enqueue_file_import(
+            import_type, base64.b64encode(content.encode()), "results.csv", ",", True
+        )
+
+    def test_01_instrument_import_is_chunked_and_resumable(self):
+        self.env["ir.config_parameter"].sudo().set_param("laboratory_management.import_chunk_size", "2")
+        rows = ["accession,instrument_code,test_code,result,remark"]
+        rows += ["%s,IMP-AN1,NA,140," % sample.name for sample in self.samples]
+        rows.append("UNKNOWN,IMP-AN1,NA,140,")
+        job = self._enqueue("instrument_csv", "\n".join(rows) + "\n")
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(job.total_rows, 4)
+
+        job._process_import()
+        self.assertEqual(job.processed_rows, 4)
+        self.assertEqual(job.success_rows, 3)
+        self.assertEqual(job.failed_rows, 1)
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(len(job.line_ids), 4)
+        analyses = self.samples.mapped("analysis_ids")
+        self.assertEqual(set(analyses.mapped("result_value")), {"140"})
+        self.assertFalse(analyses.filtered(lambda x: x.state in ("pending", "assigned")))
+        self.assertEqual(job.line_ids.filtered(lambda x: x.status == "failed").message, "Sample not found")
+
+    def test_02_manual_import_resumes_after_committed_rows(self):
+        rows = ["accession,service_code,result"]
+        rows += ["%s,imp-na,%s" % (sample.name, 136 + idx) for idx, sample in enumerate(self.samples)]
+        job = self._enqueue("manual_csv", "\n".join(rows))
+        job.processed_rows = 1
+        job._process_import()
+        self.assertEqual(job.processed_rows, 3)
+        self.assertEqual(job.success_rows, 2)
+        self.assertEqual(job.status, "done")
+        self.assertFalse(self.samples[0].analysis_ids.result_value)
+        self.assertEqual(self.samples[2].analysis_ids.result_value, "138")
+
+    def test_03_native_fixed_width_and_xml_parsers(self):
+        self.instrument.write(
+            {
+                "import_parser": "fixed_width",
+                "import_encoding": "latin-1",
+                "import_header_lines_skip": 1,
+                "import_layout": "accession=0,20\ntest_code=20,4\nresult=24,8",
+            }
+        )
+        lines = ["ANALYZER EXPORT \xb5mol/L"]
+        lines += ["%-20s%-4s%-8s" % (sample.name, "NA", "141") for sample in self.samples]
+        job = self.env["lab.import.job"]._enqueue_file_import(
+            "instrument_csv",
+            base64.b64encode("\n".join(lines).encode("latin-1")),
+            "export.txt",
+            ",",
+            False,
+            instrument=self.instrument,
+        )
+        self.assertEqual(job.total_rows, 3)
+        job._process_import()
+        self.assertEqual(job.success_rows, 3)
+        self.assertEqual(set(self.samples.mapped("analysis_ids.result_value")), {"141"})
+
+        self.instrument.write(
+            {
+                "import_parser": "xml",
+                "import_encoding": "utf-8-sig",
+                "import_record_tag": "Result",
+                "import_column_map": "accession=@sid\ntest_code=Assay\nresult=Value",
+            }
+        )
+        records = "".join(
+            '<Result sid="%s"><Assay>NA</Assay><Value>142</Value></Result>' % sample.name for sample in self.samples
+        )
+        job = self.env["lab.import.job"]._enqueue_file_import(
+            "instrument_csv",
+            base64.b64encode(("<?xml version='1.0'?><Export>%s</Export>" % records).encode()),
+            "export.xml",
+            ",",
+            False,
+            instrument=self.instrument,
+        )
+        self.assertEqual(job.total_rows, 3)
+        job._process_import()
+        self.assertEqual(job.success_rows, 3)
+        self.assertEqual(set(self.samples.mapped("analysis_ids.result_value")), {"142"})
+
+    def test_04_validate_only_then_apply_reuses_resolution(self):
+        rows = ["accession,service_code,result"]
+        rows.append("%s,IMP-NA,139" % self.samples[0].name)
+        rows.append("%s,IMP-NA,high" % self.samples[1].name)
+        rows.append("%s,IMP-NA,137" % self.samples[2].name)
+        job = self.env["lab.import.job"]._enqueue_file_import(
+            "manual_csv", base64.b64encode("\n".join(rows).encode()), "results.csv", ",", True, validate_only=True
+        )
+        job._process_import()
+        self.assertEqual(job.status, "validated")
+        self.assertEqual((job.success_rows, job.failed_rows), (2, 1))
+        self.assertFalse(any(self.samples.mapped("analysis_ids.result_value")))
+        invalid = job.line_ids.filtered(lambda x: x.status == "failed")
+        self.assertIn("Numeric result expected", invalid.message)
+
+        self.samples[2].analysis_ids.state = "verified"
+        job.action_apply_validated()
+        job._process_import()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual((job.success_rows, job.failed_rows), (1, 2))
+        self.assertEqual(self.samples[0].analysis_ids.result_value, "139")
+        self.assertFalse(self.samples[2].analysis_ids.result_value)
+        self.assertFalse(job.line_ids.filtered(lambda x: x.status == "valid"))
+
+    def test_05_crashing_job_fails_without_blocking_the_queue(self):
+        rows = "accession,service_code,result\n%s,IMP-NA,140\n" % self.samples[0].name
+        poison = self._enqueue("manual_csv", rows)
+        healthy = self._enqueue("manual_csv", rows)
+        job_model = type(self.env["lab.import.job"])
+        original = job_model._resolve_chunk
+
+        def resolve(job, chunk, lookup):
+            if job == poison:
+                raise KeyError("result")
+            return original(job, chunk, lookup)
+
+        with patch.object(job_model, "_resolve_chunk", resolve):
+            self.env["lab.import.job"]._cron_process_import_jobs()
+        self.assertEqual(poison.status, "failed")
+        self.assertIn("KeyError", poison.note)
+        self.assertEqual(healthy.status, "done")
+
+        stuck = self._enqueue("manual_csv", rows)
+        stuck.write({"status": "running", "attempt_count": IMPORT_MAX_ATTEMPTS})
+        stuck._process_import()
+        self.assertEqual(stuck.status, "failed")
+
+    def test_06_xml_file_missing_required_column_is_refused(self):
+        self.instrument.write(
+            {
+                "import_parser": "xml",
+                "import_record_tag": "Result",
+                "import_column_map": "accession=@sid\ntest_code=Assay\nresult=Value",
+            }
+        )
+        with self.assertRaises(UserError):
+            self.env["lab.import.job"]._enqueue_file_import(
+                "instrument_csv",
+                base64.b64encode(b"<Export><Result sid='X'><Assay>NA</Assay></Result></Export>"),
+                "export.xml",
+                ",",
+                False,
+                instrument=self.instrument,
+            )
+
+    def test_07_cron_imports_as_the_queueing_user_in_the_job_company(self):
+        manager = self.env["res.users"].create(
+            {
+                "name": "Import Manager",
+                "login": "import_manager",
+                "group_ids": [(6, 0, [self.env.ref("laboratory_management.group_lab_manager").id])],
+            }
+        )
+        rows = "accession,service_code,result\n%s,IMP-NA,140\n" % self.samples[0].name
+        job = self.env["lab.import.job"].with_user(manager)._enqueue_file_import(
+            "manual_csv", base64.b64encode(rows.encode()), "results.csv", ",", True
+        )
+        self.assertEqual(job.company_id, manager.company_id)
+        self.env["lab.import.job"]._cron_process_import_jobs()
+        self.assertEqual(job.status, "done")
+        analysis = self.samples[0].analysis_ids
+        self.assertEqual(analysis.result_value, "140")
+        self.assertEqual(analysis.write_uid, manager)
+
+    def test_08_validated_rows_are_applied_as_the_confirming_user(self):
+        manager = self.env["res.users"].create(
+            {
+                "name": "Import Approver",
+                "login": "import_approver",
+                "group_ids": [(6, 0, [self.env.ref("laboratory_management.group_lab_manager").id])],
+            }
+        )
+        rows = "accession,service_code,result\n%s,IMP-NA,141\n" % self.samples[1].name
+        job = self.env["lab.import.job"]._enqueue_file_import(
+            "manual_csv", base64.b64encode(rows.encode()), "results.csv", ",", True, validate_only=True
+        )
+        job._process_import()
+        self.assertEqual(job.status, "validated")
+        job.with_user(manager).action_apply_validated()
+        self.assertEqual(job.applied_by_id, manager)
+        self.env["lab.import.job"]._cron_process_import_jobs()
+        self.assertEqual(job.status, "done")
+        self.assertEqual(self.samples[1].analysis_ids.write_uid, manager)
@@ -1,7 +1,24 @@
+import base64
+import importlib.util
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
 from odoo import fields
 from odoo.exceptions import UserError
 from odoo.tests.common import TransactionCase
 
+from ..controllers import portal as portal_controller
+from ..models import lab_sample_ai
+from ..models.lab_report_archive import iter_zip_stream
+from ..models.lab_portal_counter import PORTAL_COUNTER_CACHE
+
 
 class TestSampleReleaseReview(TransactionCase):
     @classmethod
@@ -472,3 +489,558 @@ class TestSampleReleaseReview(TransactionCase):
             "laboratory_management.iso15189_personnel_authorization_enabled", "0"
         )
         self.env["ir.config_parameter"].sudo().set_param("laboratory_management.iso15189_release_gate_enabled", "0")
+
+    def test_17_batch_gate_matches_per_sample_blockers(self):
+        self.env["ir.config_parameter"].sudo().set_param("laboratory_management.iso15189_release_gate_enabled", "1")
+        self.env["ir.config_parameter"].sudo().set_param(
+            "laboratory_management.iso15189_personnel_authorization_enabled", "1"
+        )
+        samples = self.env["lab.sample"]
+        for analyst in (self.analyst_user, self.tech_reviewer_user):
+            samples |= self.env["lab.sample"].create(
+                {
+                    "patient_id": self.partner_patient.id,
+                    "analysis_ids": [
+                        (
+                            0,
+                            0,
+                            {
+                                "service_id": self.service.id,
+                                "state": "verified",
+                                "result_value": "9.5",
+                                "analyst_id": analyst.id,
+                            },
+                        )
+                    ],
+                    "state": "verified",
+                    "technical_review_state": "approved",
+                    "technical_reviewer_id": self.tech_reviewer_user.id,
+                    "technical_reviewed_at": fields.Datetime.now(),
+                }
+            )
+        self.env["lab.service.authorization"].create(
+            {
+                "user_id": self.analyst_user.id,
+                "role": "analyst",
+                "service_id": self.service.id,
+                "state": "approved",
+            }
+        )
+        batch = samples._get_iso15189_release_blockers_batch()
+        for sample in samples:
+            self.assertEqual(batch[sample.id], sample._get_iso15189_release_blockers())
+        first, second = samples
+        self.assertFalse(any("analyst authorization" in msg for msg in batch[first.id]))
+        self.assertTrue(any("analyst authorization" in msg for msg in batch[second.id]))
+        self.assertTrue(any("Technical reviewer" in msg for msg in batch[second.id]))
+
+        # The gate is a non-stored compute: reading it must not write QC status rows.
+        self.service.require_qc = True
+        status_model = type(self.env["lab.qc.status"])
+        with patch.object(status_model, "_refresh_services") as refresh, patch.object(status_model, "create") as create:
+            samples.invalidate_recordset(["iso_release_ready", "iso_release_block_reason"])
+            samples.mapped("iso_release_ready")
+        refresh.assert_not_called()
+        create.assert_not_called()
+        self.env["ir.config_parameter"].sudo().set_param(
+            "laboratory_management.iso15189_personnel_authorization_enabled", "0"
+        )
+        self.env["ir.config_parameter"].sudo().set_param("laboratory_management.iso15189_release_gate_enabled", "0")
+
+    def test_18_bulk_release_defers_followups_to_worker(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample()
+        samples.action_release_report_bulk()
+        self.assertEqual(set(samples.mapped("state")), {"reported"})
+        self.assertTrue(all(samples.mapped("release_followup_pending")))
+        self.assertFalse(samples.mapped("dispatch_ids"))
+
+        self.env["lab.sample"]._cron_process_release_followups()
+        self.assertFalse(any(samples.mapped("release_followup_pending")))
+        for sample in samples:
+            self.assertEqual(len(sample.dispatch_ids), 2)
+            self.assertEqual(set(sample.dispatch_ids.mapped("state")), {"sent"})
+
+    def test_19_batch_pdf_rendering_stores_one_attachment_per_sample(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample() | self._prepare_verified_sample()
+        samples.action_release_report()
+        self.env["ir.config_parameter"].sudo().set_param("laboratory_management.report_pdf_batch_size", "2")
+
+        def render(action, report_ref, data, res_ids=None):
+            return {res_id: {"stream": io.BytesIO(b"%%PDF-1.4 sample %d" % res_id)} for res_id in res_ids}
+
+        report_model = type(self.env["ir.actions.report"])
+        with patch.object(report_model, "_render_qweb_pdf_prepare_streams", autospec=True, side_effect=render) as engine:
+            with patch.object(type(samples), "_generate_report_pdf_attachment") as single:
+                attachments = samples._generate_report_pdf_attachments(force=True, suppress_error=True)
+        self.assertEqual(engine.call_count, 2)
+        self.assertEqual([len(call.kwargs["res_ids"]) for call in engine.call_args_list], [2, 1])
+        single.assert_not_called()
+        self.assertEqual(len(attachments), 3)
+        for sample in samples:
+            self.assertEqual(sample.report_pdf_attachment_id.res_id, sample.id)
+            self.assertTrue(sample.report_pdf_attachment_id.name.startswith(sample.name))
+            self.assertEqual(sample.report_pdf_attachment_id.raw, b"%%PDF-1.4 sample %d" % sample.id)
+
+    def test_20_report_archive_prepared_in_background_and_streamed(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample()
+        samples.action_release_report()
+        samples.write({"report_pdf_attachment_id": False})
+        archive_obj = self.env["lab.report.archive"]
+        archive = archive_obj._queue_for_user(samples)
+        self.assertEqual(archive.state, "queued")
+        self.assertEqual(archive_obj._queue_for_user(samples), archive)
+        self.assertNotEqual(archive_obj._queue_for_user(samples[:1]), archive)
+
+        archive_obj._cron_prepare_archives()
+        self.assertEqual(archive.state, "ready")
+        self.assertTrue(all(samples.mapped("report_pdf_attachment_id")))
+        self.assertEqual(archive_obj._queue_for_user(samples), archive)
+
+        self.env.cr.execute(
+            "UPDATE lab_report_archive SET create_date = create_date - INTERVAL '30 days' WHERE id = %s", [archive.id]
+        )
+        archive.invalidate_recordset(["create_date"])
+        archive_obj._cron_purge_archives()
+        self.assertFalse(archive.exists())
+
+        content = b"".join(iter_zip_stream(archive_obj._zip_entries(samples)))
+        with zipfile.ZipFile(io.BytesIO(content)) as package:
+            self.assertEqual(sorted(package.namelist()), sorted("%s.pdf" % name for name in samples.mapped("name")))
+            self.assertIsNone(package.testzip())
+
+    def test_21_ai_queue_calls_provider_concurrently(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample() | self._prepare_verified_sample()
+        samples.action_queue_ai_interpretation(force=True, trigger_source="manual")
+        self.env["ir.config_parameter"].sudo().set_param("laboratory_management.ai_provider", "openai_compatible")
+        self.env["ir.config_parameter"].sudo().set_param("laboratory_management.openai_compatible_concurrency", "3")
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def fake_completion(settings, *, prompt, system_prompt, temperature):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+            if "%s" % samples[2].name in prompt:
+                raise UserError("provider unavailable")
+            return "Interpretation", settings["model"], {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+
+        with patch.object(lab_sample_ai, "request_ai_completion", side_effect=fake_completion):
+            self.env["lab.sample"]._cron_process_ai_interpretation_queue()
+
+        self.assertGreater(state["peak"], 1)
+        self.assertEqual(samples[:2].mapped("ai_interpretation_state"), ["done", "done"])
+        self.assertEqual(samples[2].ai_interpretation_state, "error")
+        self.assertIn("provider unavailable", samples[2].ai_interpretation_error)
+        history = samples[2].ai_interpretation_history_ids
+        self.assertEqual(history.mapped("trigger_source"), ["queue"])
+
+    def test_22_identical_ai_prompts_served_from_cache(self):
+        template = self.env["lab.report.template"].create(
+            {
+                "name": "Cached Panel",
+                "code": "CACHED_PANEL",
+                "ai_user_prompt_template": "Results:\n{analysis_lines}\nOutput language: {output_language}.",
+            }
+        )
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample() | self._prepare_verified_sample()
+        samples.write({"report_template_id": template.id})
+        usage = {"prompt_tokens": 40, "completion_tokens": 20, "total_tokens": 60}
+
+        with patch.object(
+            lab_sample_ai, "request_ai_completion", return_value=("Normal panel", "gpt-4.1-mini", usage)
+        ) as provider:
+            samples[0].action_generate_ai_interpretation()
+            samples[1].action_generate_ai_interpretation()
+            self.assertEqual(provider.call_count, 1)
+            template.ai_cache_enabled = False
+            samples[2].action_generate_ai_interpretation()
+            self.assertEqual(provider.call_count, 2)
+
+        self.assertEqual(samples[1].ai_interpretation_text, "Normal panel")
+        cached_history = samples[1].ai_interpretation_history_ids
+        self.assertTrue(cached_history.cache_hit)
+        self.assertEqual(cached_history.total_tokens, 0)
+        self.assertFalse(samples[2].ai_interpretation_history_ids.cache_hit)
+        self.assertEqual(self.env["lab.ai.response.cache"].search([]).hit_count, 1)
+
+    def test_23_streamed_ai_answer_retries_and_records_first_token(self):
+        sample = self._prepare_verified_sample()
+        config = self.env["ir.config_parameter"].sudo()
+        config.set_param("laboratory_management.ai_provider", "openai_compatible")
+        config.set_param("laboratory_management.ai_stream_enabled", "1")
+        events = [{"choices": [{"delta": {"content": word}}]} for word in ("Results ", "are normal.")]
+        events.append({"choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": 4, "total_tokens": 16}})
+        lines = [("data: %s" % json.dumps(event)).encode() for event in events] + [b"data: [DONE]"]
+
+        class FakeResponse:
+            def __init__(self, status_code, lines=()):
+                self.status_code = status_code
+                self.headers = {"Retry-After": "0"} if status_code == 429 else {}
+                self.text = ""
+                self._lines = lines
+
+            def iter_lines(self):
+                return iter(self._lines)
+
+            def close(self):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                self.close()
+
+        session = type("FakeSession", (), {})()
+        responses = [FakeResponse(429), FakeResponse(200, lines)]
+        session.post = lambda *args, **kwargs: responses.pop(0)
+        with patch.object(lab_sample_ai, "_provider_session", return_value=session):
+            sample.action_generate_ai_interpretation()
+
+        self.assertEqual(sample.ai_interpretation_text, "Results are normal.")
+        self.assertFalse(sample.ai_interpretation_partial)
+        history = sample.ai_interpretation_history_ids
+        self.assertEqual(history.attempt_count, 2)
+        self.assertEqual(history.total_tokens, 16)
+        self.assertTrue(history.first_token_ms is not False)
+
+    def test_24_ai_rate_limit_defers_instead_of_failing(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample()
+        config = self.env["ir.config_parameter"].sudo()
+        config.set_param("laboratory_management.ai_provider", "openai_compatible")
+        config.set_param("laboratory_management.ai_requests_per_minute", "1")
+        usage = {"prompt_tokens": 30, "completion_tokens": 10, "total_tokens": 40}
+
+        with patch.object(lab_sample_ai, "request_ai_completion", return_value=("Summary", "gpt-4.1-mini", usage)) as provider:
+            samples.action_generate_ai_interpretation()
+            self.assertEqual(provider.call_count, 1)
+        self.assertEqual(samples[0].ai_interpretation_state, "done")
+        self.assertEqual(samples[1].ai_interpretation_state, "queued")
+        self.assertFalse(samples[1].ai_interpretation_history_ids)
+        bucket = self.env["lab.ai.rate.limit"].search([("provider", "=", "openai_compatible")])
+        self.assertEqual(bucket.deferred_count, 1)
+
+        config.set_param("laboratory_management.ai_requests_per_minute", "0")
+        config.set_param("laboratory_management.ai_daily_token_budget", "50")
+        with patch.object(lab_sample_ai, "request_ai_completion", return_value=("Summary", "gpt-4.1-mini", usage)) as provider:
+            self.env["lab.sample"]._cron_process_ai_interpretation_queue()
+            self.assertFalse(provider.called)
+        self.assertEqual(samples[1].ai_interpretation_state, "queued")
+
+    def test_25_ai_history_bodies_stored_once(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample()
+        self.env["ir.config_parameter"].sudo().set_param("laboratory_management.ai_provider", "openai_compatible")
+        usage = {"prompt_tokens": 30, "completion_tokens": 10, "total_tokens": 40}
+        with patch.object(lab_sample_ai, "request_ai_completion", return_value=("Shared answer", "gpt-4.1-mini", usage)):
+            samples.action_generate_ai_interpretation()
+
+        first, second = (sample.ai_interpretation_history_ids for sample in samples)
+        self.assertEqual(first.system_prompt_blob_id, second.system_prompt_blob_id)
+        self.assertEqual(first.response_blob_id, second.response_blob_id)
+        self.assertNotEqual(first.user_prompt_blob_id, second.user_prompt_blob_id)
+        self.assertEqual(first.response_text, "Shared answer")
+        self.assertIn(samples[0].name, samples[0].ai_interpretation_prompt)
+
+        summary = json.loads(samples[0]._dump_ai_history_json())
+        self.assertEqual(summary[0]["total_tokens"], 40)
+        self.assertNotIn("response_text", summary[0])
+        detailed = json.loads(samples[0]._dump_ai_history_json(include_bodies=True))
+        self.assertEqual(detailed[0]["response_text"], "Shared answer")
+        self.assertEqual(detailed[0]["user_prompt"], samples[0].ai_interpretation_prompt)
+
+        # Bodies written directly are moved into the store as well.
+        samples[0].ai_interpretation_history_ids.write({"response_text": "Edited"})
+        self.assertNotEqual(first.response_blob_id, second.response_blob_id)
+
+    def test_26_ai_queue_against_bundled_mock_provider(self):
+        module_path = os.path.join(os.path.dirname(__file__), "..", "scripts", "mock_ai_provider.py")
+        spec = importlib.util.spec_from_file_location("lab_mock_ai_provider", module_path)
+        mock_ai_provider = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mock_ai_provider)
+        server, base_url = mock_ai_provider.start_in_background(latency_ms=20, jitter_ms=0, completion_tokens=12)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        config = self.env["ir.config_parameter"].sudo()
+        config.set_param("laboratory_management.ai_provider", "ollama")
+        config.set_param("laboratory_management.ollama_base_url", base_url + "/api/chat")
+        config.set_param("laboratory_management.ollama_concurrency", "2")
+        config.set_param("laboratory_management.ai_stream_enabled", "1")
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample()
+        samples.action_queue_ai_interpretation(force=True, trigger_source="manual")
+        self.env["lab.sample"]._cron_process_ai_interpretation_queue()
+
+        self.assertEqual(samples.mapped("ai_interpretation_state"), ["done", "done"])
+        self.assertEqual(server.stats.snapshot()["requests"], 2)
+        for history in samples.ai_interpretation_history_ids:
+            self.assertEqual(history.completion_tokens, 12)
+            self.assertEqual(history.attempt_count, 1)
+
+    def test_27_portal_ai_requests_are_coalesced_and_prioritised(self):
+        routine, portal = self._prepare_verified_sample() | self._prepare_verified_sample()
+        config = self.env["ir.config_parameter"].sudo()
+        config.set_param("laboratory_management.ai_provider", "openai_compatible")
+        config.set_param("laboratory_management.ai_queue_batch_size", "1")
+        routine.action_queue_ai_interpretation(force=True)
+        portal.action_queue_ai_interpretation(force=True, trigger_source="portal", priority=lab_sample_ai.AI_PORTAL_PRIORITY)
+        queued_at = portal.ai_interpretation_updated_at
+        portal.action_queue_ai_interpretation(force=True, trigger_source="portal", priority=lab_sample_ai.AI_PORTAL_PRIORITY)
+        self.assertEqual(portal.ai_interpretation_updated_at, queued_at)
+
+        usage = {"prompt_tokens": 20, "completion_tokens": 10, "total_tokens": 30}
+        with patch.object(lab_sample_ai, "request_ai_completion", return_value=("Summary", "gpt-4.1-mini", usage)) as provider:
+            self.env["lab.sample"]._cron_process_ai_interpretation_queue()
+            self.assertEqual(provider.call_count, 1)
+        self.assertEqual(portal.ai_interpretation_state, "done")
+        self.assertEqual(portal.ai_interpretation_history_ids.trigger_source, "portal")
+        self.assertEqual(routine.ai_interpretation_state, "queued")
+
+    def test_28_portal_access_table_matches_child_of_domain(self):
+        sample = self._create_request().sample_ids[:1]
+        hospital = self.env["res.partner"].create({"name": "Regional Hospital", "is_company": True})
+        Sample = self.env["lab.sample"]
+
+        def by_access(partner):
+            return Sample.search([("portal_access_ids.partner_id", "=", partner.id)])
+
+        def by_child_of(partner):
+            return Sample.search(
+                ["|", ("request_id.requester_partner_id", "child_of", partner.id), ("client_id", "child_of", partner.id)]
+            )
+
+        for partner in (self.partner_patient, self.partner_client, hospital):
+            self.assertEqual(by_access(partner), by_child_of(partner))
+        self.assertIn(sample, by_access(self.partner_client))
+        self.assertNotIn(sample, by_access(hospital))
+
+        # Moving the requester under the hospital grants it the requester's samples.
+        self.partner_patient.parent_id = hospital
+        self.assertIn(sample, by_access(hospital))
+        self.partner_patient.parent_id = False
+        self.assertNotIn(sample, by_access(hospital))
+
+        sample.client_id = hospital
+        for partner in (self.partner_patient, self.partner_client, hospital):
+            self.assertEqual(by_access(partner), by_child_of(partner))
+
+    def test_29_portal_counters_grouped_and_invalidated_on_state_change(self):
+        sample = self._create_request().sample_ids[:1]
+        self.env.cr.postcommit.run()
+        counter = self.env["lab.portal.counter"]
+        domain = [("portal_access_ids.partner_id", "=", self.partner_client.id)]
+        buckets = {
+            "draft": {"state": "draft"},
+            "received": {"state": "received"},
+            "open": {"state": ("received", "in_progress")},
+        }
+        counts = counter._grouped_counts("lab.sample", domain, buckets, partner_id=self.partner_client.id, cache_key="test")
+        Sample = self.env["lab.sample"]
+        self.assertEqual(counts["all"], Sample.search_count(domain))
+        self.assertEqual(counts["draft"], Sample.search_count(domain + [("state", "=", "draft")]))
+        self.assertEqual(counts["open"], Sample.search_count(domain + [("state", "in", ("received", "in_progress"))]))
+
+        other = self.env["res.partner"].create({"name": "Unrelated Clinic", "is_company": True})
+        self.env.cr.postcommit.run()
+        counter._grouped_counts("lab.sample", [("client_id", "=", other.id)], {}, partner_id=other.id, cache_key="test")
+        received = counts["received"]
+        cache_entry = (self.env.cr.dbname, self.partner_client.id, "lab.sample", "test")
+        other_entry = (self.env.cr.dbname, other.id, "lab.sample", "test")
+        self.assertIn(cache_entry, PORTAL_COUNTER_CACHE)
+        sample.action_receive()
+        counts = counter._grouped_counts("lab.sample", domain, buckets, partner_id=self.partner_client.id, cache_key="test")
+        self.assertEqual(counts["received"], received + 1)
+        self.assertIn(cache_entry, PORTAL_COUNTER_CACHE)
+        self.env.cr.postcommit.run()
+        self.assertNotIn(cache_entry, PORTAL_COUNTER_CACHE)
+        self.assertIn(other_entry, PORTAL_COUNTER_CACHE)
+
+    def test_30_keyset_pages_match_offset_pages(self):
+        for _index in range(5):
+            self._create_request()
+        paging = self.env["lab.keyset.pagination"]
+        domain = [("portal_access_ids.partner_id", "=", self.partner_client.id)]
+        for order in ("id desc", "state asc, id desc", "report_date desc, id desc", "name asc"):
+            expected = self.env["lab.sample"].search(domain, order=order if "id" in order else order + ", id asc")
+            seen, cursor = self.env["lab.sample"], None
+            while True:
+                records, previous_cursor, cursor = paging._keyset_search("lab.sample", domain, order, 2, after=cursor)
+                if seen:
+                    back, _prev, _next = paging._keyset_search("lab.sample", domain, order, 2, before=previous_cursor)
+                    self.assertEqual(back, seen[-2:])
+                seen |= records
+                if not cursor:
+                    break
+            self.assertEqual(seen.ids, expected.ids, order)
+
+        total, exact = paging._approximate_count("lab.sample", domain)
+        self.assertTrue(exact)
+        self.assertEqual(total, len(expected))
+        self.assertIsNone(paging._keyset_search("lab.sample", domain, "id desc", 2, after="not-a-cursor"))
+        keys = paging._keyset_order("lab.sample", "report_date desc, id desc")
+        for crafted in ([{"x": 1}, 5], ["not a date", 5], [None, "5"], [None, True], ["2026-01-01 10:00:00", 5]):
+            token = base64.urlsafe_b64encode(json.dumps(crafted).encode()).decode()
+            valid = crafted == ["2026-01-01 10:00:00", 5]
+            self.assertEqual(paging._decode_cursor(token, keys, "lab.sample") is not None, valid, crafted)
+            if not valid:
+                self.assertIsNone(paging._keyset_search("lab.sample", domain, "report_date desc, id desc", 2, after=token))
+
+    def test_31_stale_running_ai_generation_is_requeued(self):
+        stale, fresh = self._prepare_verified_sample() | self._prepare_verified_sample()
+        now = fields.Datetime.now()
+        stale.write({"ai_interpretation_state": "running", "ai_interpretation_updated_at": now - timedelta(days=1)})
+        fresh.write({"ai_interpretation_state": "running", "ai_interpretation_updated_at": now})
+        reaped = self.env["lab.sample"]._reap_stale_ai_running()
+        self.assertEqual(reaped, stale)
+        self.assertEqual(stale.ai_interpretation_state, "queued")
+        self.assertEqual(fresh.ai_interpretation_state, "running")
+
+    def test_32_regenerate_and_rejection_bypass_ai_cache(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample()
+        usage = {"prompt_tokens": 40, "completion_tokens": 20, "total_tokens": 60}
+        cache = self.env["lab.ai.response.cache"]
+        with patch.object(
+            lab_sample_ai, "request_ai_completion", return_value=("Rejected text", "gpt-4.1-mini", usage)
+        ) as provider:
+            samples[0].action_generate_ai_interpretation()
+            samples[0].with_context(force_ai_regenerate=True).action_generate_ai_interpretation()
+            self.assertEqual(provider.call_count, 2)
+        self.assertTrue(cache.search([("response_text", "=", "Rejected text")]))
+
+        samples[0].ai_review_note = "Wrong emphasis"
+        samples[0].action_reject_ai_interpretation()
+        self.assertFalse(cache.search([("response_text", "=", "Rejected text")]))
+        with patch.object(
+            lab_sample_ai, "request_ai_completion", return_value=("Better text", "gpt-4.1-mini", usage)
+        ) as provider:
+            samples[1].action_generate_ai_interpretation()
+            self.assertEqual(provider.call_count, 1)
+        self.assertEqual(samples[1].ai_interpretation_text, "Better text")
+
+    def test_33_bulk_release_skips_blocked_samples_and_isolates_followups(self):
+        broken, healthy = self._prepare_verified_sample() | self._prepare_verified_sample()
+        blocked = self._prepare_verified_sample()
+        blocked.state = "to_verify"
+        action = (broken | healthy | blocked).action_release_report_bulk()
+        self.assertEqual(action["tag"], "display_notification")
+        self.assertIn(blocked.name, action["params"]["message"])
+        self.assertEqual(blocked.state, "to_verify")
+        self.assertEqual(set((broken | healthy).mapped("state")), {"reported"})
+        with self.assertRaises(UserError):
+            blocked.action_release_report_bulk()
+
+        sample_model = type(self.env["lab.sample"])
+        original = sample_model._run_release_followups
+
+        def run_followups(samples):
+            if broken in samples:
+                raise ValueError("renderer crashed")
+            return original(samples)
+
+        with patch.object(sample_model, "_run_release_followups", run_followups):
+            self.env["lab.sample"]._cron_process_release_followups()
+        self.assertFalse(broken.release_followup_pending)
+        self.assertIn("renderer crashed", broken.release_followup_error)
+        self.assertFalse(healthy.release_followup_pending)
+        self.assertEqual(set(healthy.dispatch_ids.mapped("state")), {"sent"})
+
+    def test_34_ai_daily_budget_counts_reservations_and_configured_model(self):
+        sample = self._prepare_verified_sample()
+        config = self.env["ir.config_parameter"].sudo()
+        config.set_param("laboratory_management.ai_provider", "openai_compatible")
+        usage = {"prompt_tokens": 30, "completion_tokens": 10, "total_tokens": 40}
+        with patch.object(
+            lab_sample_ai, "request_ai_completion", return_value=("Summary", "gpt-4.1-mini-2025-04-14", usage)
+        ):
+            sample.action_generate_ai_interpretation()
+        limiter = self.env["lab.ai.rate.limit"]
+        self.assertEqual(limiter._tokens_used_today("gpt-4.1-mini"), 40)
+
+        config.set_param("laboratory_management.ai_daily_token_budget", "200")
+        self.assertEqual(limiter._acquire("openai_compatible", "gpt-4.1-mini", 100), 0)
+        self.assertTrue(limiter._acquire("openai_compatible", "gpt-4.1-mini", 100))
+        limiter._settle("openai_compatible", "gpt-4.1-mini", 100, 0)
+        self.assertEqual(limiter._acquire("openai_compatible", "gpt-4.1-mini", 100), 0)
+
+    def test_35_ai_queue_drains_several_samples_from_the_model(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample()
+        samples.action_queue_ai_interpretation(force=True, trigger_source="manual")
+        self.env["ir.config_parameter"].sudo().set_param("laboratory_management.ai_provider", "openai_compatible")
+        self.assertFalse(self.env["lab.sample"]._reap_stale_ai_running())
+        usage = {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+        with patch.object(lab_sample_ai, "request_ai_completion", return_value=("Drained", "gpt-4.1-mini", usage)):
+            samples._drain_ai_queue()
+        self.assertEqual(samples.mapped("ai_interpretation_state"), ["done", "done"])
+        self.assertEqual(samples.mapped("ai_interpretation_text"), ["Drained", "Drained"])
+
+    def test_36_release_followups_skip_withdrawn_reports_and_act_as_releaser(self):
+        kept, withdrawn = self._prepare_verified_sample() | self._prepare_verified_sample()
+        (kept | withdrawn).action_release_report_bulk()
+        self.assertEqual((kept | withdrawn).release_followup_user_id, self.env.user)
+        (kept | withdrawn).write({"release_followup_user_id": self.med_reviewer_user.id})
+        withdrawn.report_withdraw_input = "Wrong patient"
+        withdrawn.action_withdraw_report()
+        self.assertFalse(withdrawn.release_followup_pending)
+
+        self.env["lab.sample"]._cron_process_release_followups()
+        self.assertFalse(withdrawn.dispatch_ids)
+        self.assertFalse(kept.release_followup_pending)
+        self.assertTrue(kept.dispatch_ids)
+        self.assertEqual(kept.dispatch_ids.create_uid, self.med_reviewer_user)
+
+    def test_37_stale_portal_access_rows_do_not_authorize(self):
+        sample = self._create_request().sample_ids[:1]
+        hospital = self.env["res.partner"].create({"name": "Regional Hospital", "is_company": True})
+        # A row the refresh never got to remove, e.g. after a partner merge.
+        self.env["lab.sample.portal.access"].create({"partner_id": hospital.id, "sample_id": sample.id})
+        portal = portal_controller.LaboratoryPortal()
+        Sample = self.env["lab.sample"]
+        with patch.object(portal_controller, "request", SimpleNamespace(env=self.env)):
+            with patch.object(type(portal), "_current_commercial_partner", return_value=hospital):
+                self.assertIsNone(portal._get_authorized_sample(sample.id))
+                self.assertNotIn(sample, Sample.search(portal._sample_listing_domain_for_current_user()))
+            with patch.object(type(portal), "_current_commercial_partner", return_value=self.partner_client):
+                self.assertEqual(portal._get_authorized_sample(sample.id), sample)
+                self.assertIn(sample, Sample.search(portal._sample_listing_domain_for_current_user()))
+
+    def test_38_shipped_ai_templates_keep_identifiers_out_of_the_prompt(self):
+        samples = self._prepare_verified_sample() | self._prepare_verified_sample()
+        samples.write({"report_template_id": self.env.ref("laboratory_management.report_template_classic").id})
+        usage = {"prompt_tokens": 40, "completion_tokens": 20, "total_tokens": 60}
+        with patch.object(
+            lab_sample_ai, "request_ai_completion", return_value=("Normal panel", "gpt-4.1-mini", usage)
+        ) as provider:
+            samples[0].action_generate_ai_interpretation()
+            samples[1].action_generate_ai_interpretation()
+        self.assertEqual(provider.call_count, 1)
+        prompt = provider.call_args.kwargs["prompt"]
+        for sample in samples:
+            self.assertNotIn(sample.name, prompt)
+            self.assertNotIn(sample.patient_id.name, prompt)
+        self.assertTrue(samples[1].ai_interpretation_history_ids.cache_hit)
+
+    def test_39_ai_reservation_settled_when_storing_the_answer_fails(self):
+        sample = self._prepare_verified_sample()
+        limiter = self.env["lab.ai.rate.limit"]
+        usage = {"prompt_tokens": 30, "completion_tokens": 10, "total_tokens": 40}
+        with patch.object(lab_sample_ai, "request_ai_completion", return_value=("Summary", "gpt-4.1-mini", usage)):
+            with patch.object(type(sample), "_apply_ai_result", side_effect=UserError("storage failed")):
+                with patch.object(type(limiter), "_settle") as settle, self.assertRaises(UserError):
+                    sample._generate_ai_interpretation_internal()
+        settle.assert_called_once()
+        self.assertEqual(settle.call_args.args[-1], 40)
+
+    def test_40_ai_blob_garbage_collection_spares_recent_bodies(self):
+        blobs = self.env["lab.ai.content.blob"]
+        ids = blobs._intern(["orphan body", "fresh body"])
+        blobs._cron_collect_garbage()
+        self.assertEqual(len(blobs.browse(list(ids.values())).exists()), 2)
+        self.env.cr.execute(
+            "UPDATE lab_ai_content_blob SET create_date = create_date - INTERVAL '2 days' WHERE id = %s",
+            [ids["orphan body"]],
+        )
+        blobs._cron_collect_garbage()
+        self.assertFalse(blobs.browse(ids["orphan body"]).exists())
+        self.assertTrue(blobs.browse(ids["fresh body"]).exists())
@@ -11,3 +11,4 @@ from . import lab_workbench_wizard
 from . import lab_kpi_dashboard_wizard
 from . import lab_test_request_attachment_wizard
 from . import lab_qc_material_batch_wizard
+from . import lab_auto_verify_simulation_wizard
@@ -0,0 +1,152 @@
+from bisect import bisect_right
+
+from odoo import _, fields, models
+from odoo.exceptions import UserError
+
+from ..models.lab_auto_verify import MANUAL_REVIEW_REASON_SELECTION
+
+
+class LabAutoVerifySimulationWizard(models.TransientModel):
+    _name = "lab.auto.verify.simulation.wizard"
+    _description = "Auto-Verification Rule Simulation"
+
+    service_ids = fields.Many2many(
+        "lab.service",
+        "lab_auto_verify_sim_wizard_service_rel",
+        "wizard_id",
+        "service_id",
+        string="Services",
+        help="Leave empty to simulate every service that has auto-verification rules.",
+    )
+    days = fields.Integer(string="Replay Last N Days", default=30, required=True)
+    include_draft_rules = fields.Boolean(
+        default=True,
+        help="Replay with draft rules as if they were already active.",
+    )
+
+    result_count = fields.Integer(readonly=True)
+    current_auto_count = fields.Integer(readonly=True)
+    current_auto_rate = fields.Float(readonly=True)
+    simulated_auto_count = fields.Integer(readonly=True)
+    simulated_auto_rate = fields.Float(readonly=True)
+    line_ids = fields.One2many("lab.auto.verify.simulation.line", "wizard_id", readonly=True)
+
+    def _target_services(self):
+        self.ensure_one()
+        if self.service_ids:
+            return self.service_ids
+        rules = self.env["lab.auto.verify.rule"].search([])
+        return rules.mapped("service_id")
+
+    def _qc_status_lookup(self, services):
+        """Index QC history per service so each result gets the QC status in force at that time."""
+        runs = self.env["lab.qc.run"].search_read(
+            [("service_id", "in", services.ids), ("run_date", "<=", fields.Datetime.now())],
+            ["service_id", "run_date", "status"],
+            order="service_id, run_date asc, id asc",
+        )
+        history = {}
+        for run in runs:
+            dates, statuses = history.setdefault(run["service_id"][0], ([], []))
+            dates.append(run["run_date"])
+            statuses.append(run["status"])
+
+        def lookup(service_id, when):
+            dates, statuses = history.get(service_id, ((), ()))
+            pos = bisect_right(dates, when)
+            return statuses[pos - 1] if pos else False
+
+        return lookup
+
+    def action_simulate(self):
+        self.ensure_one()
+        if self.days <= 0:
+            raise UserError(_("Replay window must be at least one day."))
+        services = self._target_services()
+        if not services:
+            raise UserError(_("No service with auto-verification rules to simulate."))
+        date_from = fields.Datetime.add(fields.Datetime.now(), days=-self.days)
+        analyses = self.env["lab.sample.analysis"].search(
+            [
+                ("service_id", "in", services.ids),
+                ("state", "in", ("done", "verified")),
+                ("result_date", ">=", date_from),
+            ]
+        )
+        qc_status_at = self._qc_status_lookup(services)
+
+        lines = [(5, 0, 0)]
+        total = current_total = simulated_total = 0
+        for service in services:
+            rows = analyses.filtered(lambda x, s=service: x.service_id == s)
+            if not rows:
+                continue
+            facts = [row._auto_verify_facts(qc_status_at(service.id, row.result_date)) for row in rows]
+            current = service._get_auto_verify_program().evaluate_batch(facts)
+            simulated = service._get_auto_verify_program(include_draft=self.include_draft_rules).evaluate_batch(facts)
+            current_count = len([1 for reason, _manual in current if not reason])
+            simulated_count = len([1 for reason, _manual in simulated if not reason])
+            reasons = {}
+            for reason, _manual in simulated:
+                if reason:
+                    reasons[reason] = reasons.get(reason, 0) + 1
+            top_reason = max(reasons.items(), key=lambda item: item[1])[0] if reasons else False
+            lines.append(
+                (
+                    0,
+                    0,
+                    {
+                        "service_id": service.id,
+                        "result_count": len(rows),
+                        "current_auto_count": current_count,
+                        "simulated_auto_count": simulated_count,
+                        "current_auto_rate": 100.0 * current_count / len(rows),
+                        "simulated_auto_rate": 100.0 * simulated_count / len(rows),
+                        "top_hold_reason": top_reason,
+                    },
+                )
+            )
+            total += len(rows)
+            current_total += current_count
+            simulated_total += simulated_count
+
+        self.write(
+            {
+                "result_count": total,
+                "current_auto_count": current_total,
+                "current_auto_rate": (100.0 * current_total / total) if total else 0.0,
+                "simulated_auto_count": simulated_total,
+                "simulated_auto_rate": (100.0 * simulated_total / total) if total else 0.0,
+                "line_ids": lines,
+            }
+        )
+        return {
+            "type": "ir.actions.act_window",
+            "res_model": self._name,
+            "res_id": self.id,
+            "view_mode": "form",
+            "target": "new",
+        }
+
+    def action_activate_draft_rules(self):
+        self.ensure_one()
+        rules = self.env["lab.auto.verify.rule"].search(
+            [("service_id", "in", self._target_services().ids), ("stage", "=", "draft")]
+        )
+        rules.action_activate()
+        return self.action_simulate()
+
+
+class LabAutoVerifySimulationLine(models.TransientModel):
+    _name = "lab.auto.verify.simulation.line"
+    _description = "Auto-Verification Simulation Line"
+    _order = "service_id"
+
+    wizard_id = fields.Many2one("lab.auto.verify.simulation.wizard", required=True, ondelete="cascade")
+    service_id = fields.Many2one("lab.service", readonly=True)
+    result_count = fields.Integer(readonly=True)
+    current_auto_count = fields.Integer(readonly=True)
+    current_auto_rate = fields.Float(readonly=True)
+    simulated_auto_count = fields.Integer(readonly=True)
+    simulated_auto_rate = fields.Float(readonly=True)
+    top_hold_reason = fields.Selection(MANUAL_REVIEW_REASON_SELECTION, readonly=True)
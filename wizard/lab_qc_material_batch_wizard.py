@@ -91,34 +91,33 @@ class LabQcMaterialBatchWizard(models.TransientModel):
             raise UserError(_("Please select at least one service directly or through selected panels."))
 
         qc_material_obj = self.env["lab.qc.material"]
-        created = self.env["lab.qc.material"]
-        skipped = 0
-
-        for service in services:
-            if self.skip_existing:
-                exists = qc_material_obj.search_count(
+        existing_service_ids = set()
+        if self.skip_existing:
+            existing_service_ids = set(
+                qc_material_obj.search(
                     [
-                        ("service_id", "=", service.id),
+                        ("service_id", "in", services.ids),
                         ("lot_number", "=", self.lot_number),
                     ]
-                )
-                if exists:
-                    skipped += 1
-                    continue
-
-            material_vals = {
-                "name": "%s - %s" % (self.name_template, service.name),
-                "code": "%s-%s" % (self.code_prefix, service.code),
-                "service_id": service.id,
-                "lot_number": self.lot_number,
-                "target_value": self.target_value,
-                "std_dev": self.std_dev,
-                "note": self.note,
-            }
-            material = qc_material_obj.create(material_vals)
-            if self.rule_ids:
-                material.rule_ids = [(6, 0, self.rule_ids.ids)]
-            created |= material
+                ).mapped("service_id").ids
+            )
+        targets = services.filtered(lambda s: s.id not in existing_service_ids)
+        skipped = len(services) - len(targets)
+        created = qc_material_obj.create(
+            [
+                {
+                    "name": "%s - %s" % (self.name_template, service.name),
+                    "code": "%s-%s" % (self.code_prefix, service.code),
+                    "service_id": service.id,
+                    "lot_number": self.lot_number,
+                    "target_value": self.target_value,
+                    "std_dev": self.std_dev,
+                    "note": self.note,
+                    "rule_ids": [(6, 0, self.rule_ids.ids)],
+                }
+                for service in targets
+            ]
+        )
 
         message = _(
             "QC material batch creation completed. Created: %(created)s, Skipped: %(skipped)s, Total target services: %(total)s."